@@ -0,0 +1,76 @@
+"""
+Дневная статистика бригад за период — общая для исполнителей и техники.
+
+Строки дня (DailyExecutor или DailyEquipmentUsage) читаются одним запросом
+вместе со справочником (Employee / Equipment), нормы по внесённым объёмам
+(трудозатраты или машиночасы) — одним сгруппированным запросом. Записи
+объекта выбираются через его бригады, объёмы — через задачи объекта.
+"""
+from datetime import date
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from . import models
+
+
+def collect(
+    db: Session,
+    model,
+    catalog,
+    catalog_key,
+    rate,
+    rate_field: str,
+    empty: Callable[[date, Optional[int]], dict],
+    add: Callable[[dict, object, object], None],
+    date_from: date,
+    date_to: date,
+    project_id: Optional[int],
+    brigade_ids: Optional[List[int]],
+    by_brigade: bool,
+) -> List[dict]:
+    """
+    Статистика по датам (и бригадам, если by_brigade).
+
+    - model, catalog, catalog_key: строки дня, справочник и столбец связи с ним
+    - rate, rate_field: норма задачи на единицу объёма и поле, куда пишется её сумма
+    - empty(date, brigade_id): пустая запись статистики
+    - add(entry, row, catalog_row): учесть строку дня в записи
+    """
+    Work, Task = models.DailyWork, models.Task
+    stats = {}
+
+    def item(work_date, brigade_id):
+        key = (work_date, brigade_id if by_brigade else None)
+        if key not in stats:
+            stats[key] = empty(*key)
+        return stats[key]
+
+    rows = db.query(model, catalog).outerjoin(
+        catalog, catalog.id == catalog_key
+    ).filter(model.date >= date_from, model.date <= date_to)
+    if project_id is not None:
+        rows = rows.filter(model.brigade_id.in_(
+            select(models.Brigade.id).where(models.Brigade.project_id == project_id)
+        ))
+    if brigade_ids:
+        rows = rows.filter(model.brigade_id.in_(brigade_ids))
+
+    for row, catalog_row in rows.order_by(model.date, model.id).all():
+        add(item(row.date, row.brigade_id), row, catalog_row)
+
+    keys = (Work.date, Work.brigade_id) if by_brigade else (Work.date,)
+    totals = db.query(
+        *keys, func.sum(Work.volume * func.coalesce(rate, 0))
+    ).join(Task, Task.id == Work.task_id).filter(
+        Work.date >= date_from, Work.date <= date_to
+    )
+    if project_id is not None:
+        totals = totals.filter(Task.project_id == project_id)
+    if brigade_ids:
+        totals = totals.filter(Work.brigade_id.in_(brigade_ids))
+
+    for total in totals.group_by(*keys).all():
+        item(total[0], total[1] if by_brigade else None)[rate_field] = total[-1] or 0
+
+    # Дни по порядку, внутри дня — бригады по id, записи без бригады последними
+    return [stats[key] for key in sorted(stats, key=lambda k: (k[0], k[1] is None, k[1] or 0))]
@@ -0,0 +1,191 @@
+"""
+Иерархия задач графика (closure table task_closure).
+
+Для каждой задачи хранится пара (предок, потомок, глубина) со всеми её
+предками, включая саму задачу с depth=0. Поэтому «все потомки X»,
+«все предки X» и «сколько строк в разделе» — один индексный запрос,
+без обхода parent_code по всему объекту.
+
+Источник истины — Task.parent_code; функции ниже держат таблицу
+в согласованном состоянии при создании, изменении, перемещении,
+импорте и удалении задач.
+"""
+from sqlalchemy.orm import Session, aliased, join
+from sqlalchemy import select, insert, func, true, and_, or_
+from typing import Iterable, List, Optional
+from . import models
+
+Closure = models.TaskClosure
+
+
+def _find_parent(db: Session, task: models.Task) -> Optional[int]:
+    if not task.parent_code:
+        return None
+    return db.query(models.Task.id).filter(
+        models.Task.project_id == task.project_id,
+        models.Task.code == task.parent_code
+    ).scalar()
+
+
+def creates_cycle(db: Session, task: models.Task) -> bool:
+    """
+    Замыкается ли цепочка parent_code от задачи на неё саму.
+    Вызывать после flush правки: новый parent_code задачи или её новый code
+    (на который уже ссылаются подчинённые строки) могли сделать раздел
+    потомком самого себя — task_closure такое не выражает.
+    """
+    seen = {task.id}
+    current = task
+    while True:
+        parent_id = _find_parent(db, current)
+        if parent_id is None:
+            return False
+        if parent_id in seen:
+            return True
+        seen.add(parent_id)
+        current = db.get(models.Task, parent_id)
+
+
+def _detach(db: Session, task_id: int):
+    """Отрезать поддерево task_id от всех его предков (связи внутри поддерева остаются)."""
+    subtree = select(Closure.descendant_id).where(Closure.ancestor_id == task_id)
+    db.query(Closure).filter(
+        Closure.descendant_id.in_(subtree),
+        ~Closure.ancestor_id.in_(subtree)
+    ).delete(synchronize_session=False)
+
+
+def _attach(db: Session, task_id: int, parent_id: int):
+    """Подвесить поддерево task_id под parent_id: каждый предок родителя × каждый потомок."""
+    in_subtree = db.query(Closure.ancestor_id).filter(
+        Closure.ancestor_id == task_id,
+        Closure.descendant_id == parent_id
+    ).first()
+    if in_subtree:
+        # parent_code указывает внутрь собственного поддерева — цикл не строим
+        return
+    above = aliased(Closure)
+    below = aliased(Closure)
+    db.execute(insert(Closure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select(
+            above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+        ).select_from(join(above, below, true())).where(
+            above.descendant_id == parent_id,
+            below.ancestor_id == task_id
+        )
+    ))
+
+
+def link_task(db: Session, task: models.Task):
+    """Новая задача (id уже получен через flush): своя строка, родитель и «осиротевшие» дети."""
+    db.add(Closure(ancestor_id=task.id, descendant_id=task.id, depth=0))
+    db.flush()
+    parent_id = _find_parent(db, task)
+    if parent_id:
+        _attach(db, task.id, parent_id)
+    if task.code:
+        children = db.query(models.Task.id).filter(
+            models.Task.project_id == task.project_id,
+            models.Task.parent_code == task.code,
+            models.Task.id != task.id
+        ).all()
+        for (child_id,) in children:
+            _attach(db, child_id, task.id)
+
+
+def relink_task(db: Session, task: models.Task):
+    """Сменился parent_code: перевесить поддерево задачи под нового родителя."""
+    db.flush()
+    _detach(db, task.id)
+    parent_id = _find_parent(db, task)
+    if parent_id:
+        _attach(db, task.id, parent_id)
+
+
+def code_dependents(db: Session, task: models.Task) -> List[models.Task]:
+    """
+    Сменился code задачи: строки, чья связь с родителем от этого зависит —
+    бывшие дети (висят под задачей, но parent_code на неё уже не указывает)
+    и строки, чей parent_code совпал с новым кодом. Их нужно перевесить relink_task.
+    """
+    db.flush()
+    Task = models.Task
+    children = select(Closure.descendant_id).where(
+        Closure.ancestor_id == task.id,
+        Closure.depth == 1
+    )
+    if not task.code:
+        return db.query(Task).filter(Task.id.in_(children)).all()
+    return db.query(Task).filter(
+        or_(
+            and_(Task.id.in_(children), or_(Task.parent_code == None, Task.parent_code != task.code)),
+            and_(Task.project_id == task.project_id, Task.parent_code == task.code, Task.id != task.id)
+        )
+    ).all()
+
+
+def unlink_tasks(db: Session, task_ids: Iterable[int]):
+    """Перед удалением задач: отрезать их поддеревья и убрать их собственные строки."""
+    task_ids = list(task_ids)
+    for task_id in task_ids:
+        _detach(db, task_id)
+    db.query(Closure).filter(
+        (Closure.ancestor_id.in_(task_ids)) | (Closure.descendant_id.in_(task_ids))
+    ).delete(synchronize_session=False)
+
+
+def rebuild_hierarchy(db: Session, project_id: Optional[int]):
+    """Полная пересборка иерархии объекта по parent_code (импорт)."""
+    db.flush()
+    rows = db.query(models.Task.id, models.Task.code, models.Task.parent_code).filter(
+        models.Task.project_id == project_id
+    ).all()
+    project_tasks = select(models.Task.id).where(models.Task.project_id == project_id)
+    db.query(Closure).filter(
+        Closure.descendant_id.in_(project_tasks)
+    ).delete(synchronize_session=False)
+
+    id_by_code = {row.code: row.id for row in rows}
+    parent_of = {row.id: id_by_code.get(row.parent_code) for row in rows}
+    mappings = []
+    for row in rows:
+        ancestor_id, depth, seen = row.id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            mappings.append({"ancestor_id": ancestor_id, "descendant_id": row.id, "depth": depth})
+            seen.add(ancestor_id)
+            ancestor_id = parent_of.get(ancestor_id)
+            depth += 1
+    db.bulk_insert_mappings(Closure, mappings)
+
+
+def descendants_query(db: Session, task_id: int, include_self: bool = True):
+    """id потомков задачи (подзапрос для фильтров и JOIN)."""
+    query = db.query(Closure.descendant_id).filter(Closure.ancestor_id == task_id)
+    if not include_self:
+        query = query.filter(Closure.depth > 0)
+    return query
+
+
+def ancestor_ids(db: Session, task_ids: Iterable[int]) -> List[int]:
+    """Все предки набора задач (без самих задач), одним запросом."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return []
+    rows = db.query(Closure.ancestor_id).filter(
+        Closure.descendant_id.in_(task_ids),
+        Closure.depth > 0
+    ).distinct().all()
+    return [ancestor_id for (ancestor_id,) in rows]
+
+
+def subtree_counts(db: Session, project_id: int):
+    """Число потомков каждого раздела объекта: [(section_id, count), ...]."""
+    return db.query(
+        Closure.ancestor_id, func.count(Closure.descendant_id) - 1
+    ).join(
+        models.Task, models.Task.id == Closure.ancestor_id
+    ).filter(
+        models.Task.project_id == project_id,
+        models.Task.is_section == True
+    ).group_by(Closure.ancestor_id).all()
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Boolean, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Boolean, Text, UniqueConstraint, Index
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -13,6 +14,8 @@ class Project(Base):
     description = Column(String, nullable=True)
     address = Column(String, nullable=True)
     is_archived = Column(Boolean, default=False, nullable=False)
+    # Счётчик изменений графика объекта (лента GET /schedule/tasks/changes)
+    revision = Column(Integer, default=0, server_default='0', nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -42,6 +45,14 @@ class Task(Base):
     __tablename__ = "tasks"
     __table_args__ = (
         UniqueConstraint('project_id', 'code', name='uq_tasks_project_code'),
+        # Порядок строк графика и keyset-пагинация GET /schedule/tasks
+        Index('ix_tasks_project_sort', 'project_id', 'sort_order', 'rank', 'id'),
+        Index('ix_tasks_project_revision', 'project_id', 'revision'),
+        # Фильтры GET /schedule/tasks/query: исполнитель и просрочка
+        Index('ix_tasks_project_executor', 'project_id', 'executor'),
+        Index('ix_tasks_project_end_plan', 'project_id', 'end_date_plan'),
+        # «Работы, активные в периоде» (app/periods.py); в PostgreSQL ещё GiST ix_tasks_plan_period
+        Index('ix_tasks_project_plan_dates', 'project_id', 'start_date_plan', 'end_date_plan'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -64,6 +75,11 @@ class Task(Base):
     parent_code = Column(String, nullable=True)
     is_custom = Column(Boolean, default=False, nullable=False)
     sort_order = Column(Integer, default=0, server_default='0', nullable=False)
+    # Дробный ключ порядка внутри одинакового sort_order (строки из a–z).
+    # Вставка между соседями меняет только новую строку, без перенумерации.
+    rank = Column(String, default='n', server_default='n', nullable=False)
+    # Ревизия объекта, в которой задача менялась последний раз
+    revision = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Чек-лист статусы (серый по умолчанию)
@@ -81,6 +97,48 @@ class Task(Base):
     daily_headcounts = relationship("DailyHeadcount", back_populates="task", cascade="all, delete-orphan")
 
 
+class TaskTombstone(Base):
+    """Отметка об удалённой задаче — чтобы лента изменений могла сообщить об удалении"""
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index('ix_task_tombstones_project_revision', 'project_id', 'revision'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TaskClosure(Base):
+    """Иерархия задач (closure table): предок — потомок — глубина, включая саму задачу с depth=0"""
+    __tablename__ = "task_closure"
+    __table_args__ = (
+        Index('ix_task_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+    ancestor_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+
+class SectionRollup(Base):
+    """Итоги раздела по всем подчинённым работам (поддерживаются приращениями, см. rollups.py)"""
+    __tablename__ = "section_rollups"
+
+    section_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True, index=True)
+    cost_plan = Column(Float, default=0, nullable=False)
+    cost_fact = Column(Float, default=0, nullable=False)
+    labor_plan = Column(Float, default=0, nullable=False)
+    labor_fact = Column(Float, default=0, nullable=False)
+    machine_hours_plan = Column(Float, default=0, nullable=False)
+    machine_hours_fact = Column(Float, default=0, nullable=False)
+    min_start_date_plan = Column(Date, nullable=True)
+    max_end_date_plan = Column(Date, nullable=True)
+
+
 class MonthlyTask(Base):
     __tablename__ = "monthly_tasks"
     id = Column(Integer, primary_key=True, index=True)
@@ -108,6 +166,12 @@ class Brigade(Base):
 
 class DailyWork(Base):
     __tablename__ = "daily_works"
+    __table_args__ = (
+        # Сумма факта по задаче (сверка volume_fact) читается по индексу
+        Index('ix_daily_works_task', 'task_id', 'is_ancillary'),
+        # Журнал работ за день / период
+        Index('ix_daily_works_date', 'date'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
     date = Column(Date, nullable=False)
@@ -136,6 +200,15 @@ class Employee(Base):
 class DailyExecutor(Base):
     """Исполнитель работ за конкретный день"""
     __tablename__ = "daily_executors"
+    __table_args__ = (
+        # Сотрудник — один раз в бригаде на дату; ответственный — один на бригаду и дату.
+        # coalesce: исполнители без бригады тоже не должны дублироваться (NULL != NULL)
+        Index('uq_daily_executors_employee',
+              'date', text('coalesce(brigade_id, 0)'), 'employee_id', unique=True),
+        Index('uq_daily_executors_responsible',
+              'date', text('coalesce(brigade_id, 0)'), unique=True,
+              postgresql_where=text('is_responsible'), sqlite_where=text('is_responsible')),
+    )
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False)
@@ -156,14 +229,37 @@ class Equipment(Base):
     model = Column(String, nullable=False)
     registration_number = Column(String, nullable=False, unique=True)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Счётчики машиночасов — меняются на разницу при каждой записи daily_equipment_usage
+    total_machine_hours = Column(Float, nullable=False, default=0.0)
+    hours_since_service = Column(Float, nullable=False, default=0.0)
+    # Межсервисный интервал, ч (None — ТО не отслеживается)
+    service_interval_hours = Column(Float, nullable=True)
+    last_service_date = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     daily_equipment_usage = relationship("DailyEquipmentUsage", back_populates="equipment")
 
+    @property
+    def hours_until_service(self):
+        if self.service_interval_hours is None:
+            return None
+        return self.service_interval_hours - (self.hours_since_service or 0)
+
+
+# Остаток до ТО: GET /equipment/due-for-service фильтрует и сортирует по этому выражению
+Index(
+    'ix_equipment_service_remaining',
+    Equipment.service_interval_hours - Equipment.hours_since_service
+)
+
 
 class DailyEquipmentUsage(Base):
     """Использование техники за конкретный день"""
     __tablename__ = "daily_equipment_usage"
+    __table_args__ = (
+        # Одна единица техники — один раз на дату
+        Index('uq_daily_equipment_usage_date_equipment', 'date', 'equipment_id', unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False, index=True)
     equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False)
@@ -180,6 +276,8 @@ class DailyHeadcount(Base):
     __tablename__ = "daily_headcount"
     __table_args__ = (
         UniqueConstraint('task_id', 'date', name='uq_daily_headcount_task_date'),
+        # МСГ читает и очищает назначения объекта за месяц — диапазон по date
+        Index('ix_daily_headcount_project_date', 'project_id', 'date'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
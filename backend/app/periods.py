@@ -0,0 +1,72 @@
+"""
+Выборка задач по плановым срокам: «работы, активные в периоде [date_from, date_to]».
+
+Общая для МСГ (экспорт и экран месячного графика), фильтра графика и аналитики.
+Работа активна, если обе плановые даты заданы и отрезок
+[start_date_plan, end_date_plan] пересекается с периодом.
+
+PostgreSQL: условие записано через daterange && — его обслуживает GiST-индекс
+ix_tasks_plan_period (migrations/add_task_period_index.py), и стоимость запроса
+зависит от числа найденных работ, а не от размера объекта.
+Остальные СУБД: B-tree (project_id, start_date_plan, end_date_plan).
+"""
+import calendar
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, or_, literal_column
+from . import models
+
+Task = models.Task
+
+# Выражение совпадает с индексом ix_tasks_plan_period; least/greatest защищают
+# от строк с перепутанными датами (daterange с lower > upper — ошибка)
+def _plan_range():
+    return func.daterange(
+        func.least(Task.start_date_plan, Task.end_date_plan),
+        func.greatest(Task.start_date_plan, Task.end_date_plan),
+        literal_column("'[]'")
+    )
+
+
+def month_bounds(year: int, month: int):
+    """Первый и последний день месяца."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def plan_overlaps(db: Session, date_from: date, date_to: date):
+    """Условие: плановые сроки работы пересекают [date_from, date_to]."""
+    has_dates = and_(Task.start_date_plan != None, Task.end_date_plan != None)
+    if db.get_bind().dialect.name == "postgresql":
+        period = func.daterange(date_from, date_to, literal_column("'[]'"))
+        return and_(has_dates, _plan_range().op("&&")(period))
+    return and_(has_dates, Task.start_date_plan <= date_to, Task.end_date_plan >= date_from)
+
+
+def active_work_ids(db: Session, project_id: int, date_from: date, date_to: date,
+                    include_undated_custom: bool = False):
+    """
+    Подзапрос id работ объекта, активных в периоде.
+    include_undated_custom — ручные строки без дат тоже считаются активными (так в МСГ).
+    """
+    active = plan_overlaps(db, date_from, date_to)
+    if include_undated_custom:
+        active = or_(active, and_(
+            Task.is_custom == True,
+            Task.start_date_plan == None,
+            Task.end_date_plan == None
+        ))
+    return select(Task.id).where(
+        Task.project_id == project_id,
+        Task.is_section == False,
+        active
+    )
+
+
+def window_condition(db: Session, project_id: int, date_from: date, date_to: date):
+    """Условие для строк МСГ: активные работы периода и их разделы-предки."""
+    works = active_work_ids(db, project_id, date_from, date_to, include_undated_custom=True)
+    sections = select(models.TaskClosure.ancestor_id).where(
+        models.TaskClosure.descendant_id.in_(works),
+        models.TaskClosure.depth > 0
+    )
+    return or_(Task.id.in_(works), Task.id.in_(sections))
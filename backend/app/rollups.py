@@ -0,0 +1,202 @@
+"""
+Итоги разделов графика (таблица section_rollups).
+
+Для каждого раздела хранятся суммы по всем подчинённым работам: стоимость,
+трудозатраты и машиночасы (план/факт), а также самая ранняя дата начала
+и самая поздняя дата окончания по плану.
+
+Изменение работы не пересчитывает разделы заново: разница вклада работы
+прибавляется ко всем её предкам одним UPDATE по task_closure. Полный
+пересчёт (recompute_sections / recompute_project) нужен только при смене
+структуры — перемещении, удалении раздела, импорте.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case
+from typing import Iterable, Optional
+from . import models
+
+Closure = models.TaskClosure
+Rollup = models.SectionRollup
+
+ROLLUP_SUMS = (
+    "cost_plan", "cost_fact",
+    "labor_plan", "labor_fact",
+    "machine_hours_plan", "machine_hours_fact",
+)
+ROLLUP_FIELDS = ROLLUP_SUMS + ("min_start_date_plan", "max_end_date_plan")
+# Поля задачи, после изменения которых меняется структура иерархии
+STRUCTURE_FIELDS = {"code", "parent_code", "is_section"}
+# snapshot «пустой» задачи — для новых работ
+EMPTY = (dict.fromkeys(ROLLUP_SUMS, 0.0), None, None)
+
+
+def contribution(task: models.Task) -> dict:
+    """Вклад задачи в итоги её разделов (у самих разделов вклада нет)."""
+    if task.is_section:
+        return dict.fromkeys(ROLLUP_SUMS, 0.0)
+    plan = task.volume_plan or 0
+    fact = task.volume_fact or 0
+    price = task.unit_price or 0
+    labor = task.labor_per_unit or 0
+    machine = task.machine_hours_per_unit or 0
+    return {
+        "cost_plan": plan * price,
+        "cost_fact": fact * price,
+        "labor_plan": plan * labor,
+        "labor_fact": fact * labor,
+        "machine_hours_plan": plan * machine,
+        "machine_hours_fact": fact * machine,
+    }
+
+
+def snapshot(task: models.Task):
+    """Состояние задачи до изменения — передаётся потом в apply_delta."""
+    if task.is_section:
+        return contribution(task), None, None
+    return contribution(task), task.start_date_plan, task.end_date_plan
+
+
+def _ancestors(task_id: int):
+    return select(Closure.ancestor_id).where(
+        Closure.descendant_id == task_id,
+        Closure.depth > 0
+    )
+
+
+def apply_delta(db: Session, task: models.Task, before):
+    """
+    Перенести изменение работы в итоги всех её разделов.
+    before — snapshot(task) до изменения. Стоимость на запрос не зависит
+    от размера объекта: одна строка итогов на каждый уровень вложенности.
+    """
+    old, old_start, old_end = before
+    new = contribution(task)
+    delta = {key: new[key] - old[key] for key in ROLLUP_SUMS if new[key] != old[key]}
+    start, end = (None, None) if task.is_section else (task.start_date_plan, task.end_date_plan)
+    if not delta and (old_start, old_end) == (start, end):
+        return
+
+    ancestors = _ancestors(task.id)
+    shrinks = (old_start is not None and (start is None or start > old_start)) or \
+              (old_end is not None and (end is None or end < old_end))
+    if shrinks:
+        # Граница могла сдвинуться внутрь — min/max нужно посчитать заново
+        db.flush()
+        recompute_sections(db, [row for (row,) in db.execute(ancestors).all()])
+        return
+
+    values = {getattr(Rollup, key): getattr(Rollup, key) + value for key, value in delta.items()}
+    if start is not None:
+        values[Rollup.min_start_date_plan] = case(
+            (Rollup.min_start_date_plan == None, start),
+            (Rollup.min_start_date_plan > start, start),
+            else_=Rollup.min_start_date_plan
+        )
+    if end is not None:
+        values[Rollup.max_end_date_plan] = case(
+            (Rollup.max_end_date_plan == None, end),
+            (Rollup.max_end_date_plan < end, end),
+            else_=Rollup.max_end_date_plan
+        )
+    db.query(Rollup).filter(
+        Rollup.section_id.in_(ancestors)
+    ).update(values, synchronize_session=False)
+
+
+def task_added(db: Session, task: models.Task):
+    """Новая задача уже связана в task_closure: работа — приращение, раздел — пересчёт."""
+    if task.is_section:
+        recompute_sections(db, ancestor_section_ids(db, [task.id]))
+    else:
+        apply_delta(db, task, EMPTY)
+
+
+def ancestor_section_ids(db: Session, task_ids: Iterable[int]):
+    """Разделы-предки задач (и сами задачи) — кого пересчитывать при смене структуры."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    rows = db.query(Closure.ancestor_id).filter(
+        Closure.descendant_id.in_(task_ids)
+    ).distinct().all()
+    return {ancestor_id for (ancestor_id,) in rows}
+
+
+def recompute_sections(db: Session, section_ids: Iterable[int]):
+    """Пересчитать итоги указанных разделов одним сгруппированным запросом."""
+    section_ids = set(section_ids)
+    if not section_ids:
+        return
+    db.flush()
+    Task = models.Task
+    totals = {
+        row[0]: row[1:] for row in db.query(
+            Closure.ancestor_id,
+            *[func.coalesce(func.sum(expr), 0) for expr in sum_expressions()],
+            func.min(Task.start_date_plan),
+            func.max(Task.end_date_plan),
+        ).join(
+            Task, Task.id == Closure.descendant_id
+        ).filter(
+            Closure.ancestor_id.in_(section_ids),
+            Closure.depth > 0,
+            Task.is_section == False
+        ).group_by(Closure.ancestor_id).all()
+    }
+    sections = db.query(Task.id, Task.project_id).filter(
+        Task.id.in_(section_ids),
+        Task.is_section == True
+    ).all()
+    existing = {
+        r.section_id: r for r in db.query(Rollup).filter(Rollup.section_id.in_(section_ids)).all()
+    }
+
+    live = set()
+    for section_id, project_id in sections:
+        live.add(section_id)
+        values = totals.get(section_id)
+        rollup = existing.get(section_id)
+        if rollup is None:
+            rollup = Rollup(section_id=section_id)
+            db.add(rollup)
+        rollup.project_id = project_id
+        for key, value in zip(ROLLUP_SUMS, values or (0.0,) * len(ROLLUP_SUMS)):
+            setattr(rollup, key, value)
+        rollup.min_start_date_plan = values[-2] if values else None
+        rollup.max_end_date_plan = values[-1] if values else None
+
+    # Строка перестала быть разделом или удалена
+    for section_id, rollup in existing.items():
+        if section_id not in live:
+            db.delete(rollup)
+
+
+def recompute_project(db: Session, project_id: Optional[int]):
+    """Пересчитать итоги всех разделов объекта (импорт, массовые изменения)."""
+    db.flush()
+    section_ids = [
+        section_id for (section_id,) in db.query(models.Task.id).filter(
+            models.Task.project_id == project_id,
+            models.Task.is_section == True
+        ).all()
+    ]
+    db.query(Rollup).filter(
+        Rollup.project_id == project_id,
+        ~Rollup.section_id.in_(section_ids)
+    ).delete(synchronize_session=False)
+    recompute_sections(db, section_ids)
+
+
+def sum_expressions():
+    """SQL-выражения вклада работы в порядке ROLLUP_SUMS."""
+    Task = models.Task
+    plan = func.coalesce(Task.volume_plan, 0)
+    fact = func.coalesce(Task.volume_fact, 0)
+    price = func.coalesce(Task.unit_price, 0)
+    labor = func.coalesce(Task.labor_per_unit, 0)
+    machine = func.coalesce(Task.machine_hours_per_unit, 0)
+    return (
+        plan * price, fact * price,
+        plan * labor, fact * labor,
+        plan * machine, fact * machine,
+    )
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models
+from typing import Optional
+from .. import models, volumes
 from ..database import get_db
 from ..dependencies import get_current_admin_user
 
@@ -9,42 +9,27 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.post("/recalculate-volumes")
 def recalculate_volumes(
+    project_id: Optional[int] = Query(None),
+    dry_run: bool = Query(False),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
     """
-    Пересчитать volume_fact для всех задач на основе DailyWork.
+    Сверить volume_fact задач с журналом выполненных работ (без сопутствующих).
     Доступно только администраторам.
+
+    - project_id: только один объект; без него — все объекты по очереди
+    - dry_run: показать расхождения, ничего не меняя
     """
-    
-    tasks = db.query(models.Task).all()
-    updated_count = 0
-    results = []
-    
-    for task in tasks:
-        # Считаем сумму всех DailyWork для этой задачи
-        total_volume = db.query(func.sum(models.DailyWork.volume)).filter(
-            models.DailyWork.task_id == task.id
-        ).scalar() or 0
-        
-        old_fact = task.volume_fact
-        
-        if old_fact != total_volume:
-            task.volume_fact = total_volume
-            updated_count += 1
-            results.append({
-                "code": task.code,
-                "name": task.name,
-                "old_fact": old_fact,
-                "new_fact": total_volume
-            })
-    
-    db.commit()
-    
+    checked, diffs = volumes.reconcile_volume_facts(
+        db, project_id=project_id, dry_run=dry_run, all_projects=project_id is None
+    )
+    verb = "Найдено расхождений" if dry_run else "Пересчитано"
     return {
         "success": True,
-        "message": f"Пересчитано {updated_count} задач из {len(tasks)}",
-        "total_tasks": len(tasks),
-        "updated_tasks": updated_count,
-        "details": results
+        "dry_run": dry_run,
+        "message": f"{verb}: {len(diffs)} задач из {checked}",
+        "total_tasks": checked,
+        "updated_tasks": 0 if dry_run else len(diffs),
+        "details": diffs
     }
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import func, case
 from datetime import date
 from typing import Optional
-from .. import models, schemas
+from .. import models, schemas, rollups, periods
 from ..database import get_db
 
 router = APIRouter()
@@ -11,34 +12,39 @@ router = APIRouter()
 @router.get("/", response_model=schemas.Analytics)
 def get_analytics(
     project_id: Optional[int] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Task).filter(models.Task.is_section == False)
+    """
+    Сводка по работам объекта. С date_from/date_to — только по работам,
+    плановые сроки которых пересекают период.
+    """
+    # Агрегаты считаются в БД одним запросом, без загрузки всех работ
+    query = db.query(
+        func.coalesce(func.sum(models.Task.volume_plan), 0),
+        func.coalesce(func.sum(models.Task.volume_fact), 0),
+        *[func.coalesce(func.sum(expr), 0) for expr in rollups.sum_expressions()],
+        func.min(case((models.Task.end_date_plan != None, models.Task.start_date_plan))),
+        func.max(case((models.Task.start_date_plan != None, models.Task.end_date_plan))),
+    ).filter(models.Task.is_section == False)
     if project_id is not None:
         query = query.filter(models.Task.project_id == project_id)
-    works = query.all()
+    if date_from or date_to:
+        query = query.filter(periods.plan_overlaps(db, date_from or date.min, date_to or date.max))
+    (total_plan, total_fact,
+     cost_plan, cost_fact, labor_plan, labor_fact, machine_hours_plan, machine_hours_fact,
+     earliest_start, latest_end) = query.one()
 
-    total_plan = sum(w.volume_plan or 0 for w in works)
-    total_fact = sum(w.volume_fact or 0 for w in works)
     total_progress = (total_fact / total_plan * 100) if total_plan > 0 else 0
 
-    works_with_dates = [w for w in works if w.start_date_plan and w.end_date_plan]
-    if works_with_dates:
-        earliest_start = min(w.start_date_plan for w in works_with_dates)
-        latest_end = max(w.end_date_plan for w in works_with_dates)
+    if earliest_start and latest_end:
         total_days = (latest_end - earliest_start).days
         days_passed = (date.today() - earliest_start).days
         time_progress = (days_passed / total_days * 100) if total_days > 0 else 0
     else:
         time_progress = 0
 
-    labor_plan = sum((w.labor_per_unit or 0) * (w.volume_plan or 0) for w in works)
-    labor_fact = sum((w.labor_per_unit or 0) * (w.volume_fact or 0) for w in works)
-    machine_hours_plan = sum((w.machine_hours_per_unit or 0) * (w.volume_plan or 0) for w in works)
-    machine_hours_fact = sum((w.machine_hours_per_unit or 0) * (w.volume_fact or 0) for w in works)
-    cost_plan = sum((w.unit_price or 0) * (w.volume_plan or 0) for w in works)
-    cost_fact = sum((w.unit_price or 0) * (w.volume_fact or 0) for w in works)
-
     return {
         "total_progress_percent": round(total_progress, 2),
         "time_progress_percent": round(time_progress, 2),
@@ -1,16 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import date
+import csv
+import io
+import openpyxl
+from openpyxl.styles import Font
 from .. import models, schemas
 from ..database import get_db
 from ..dependencies import get_current_user
 from ..websocket_manager import manager
 from .projects import touch_project
+from .daily import lock_tasks, adjust_volume_fact
+from .equipment_usage import adjust_meters
 
 router = APIRouter()
 
+# Итоги дня — суммы одноимённых полей BrigadeStats
+DAY_TOTAL_KEYS = (
+    "executors_count", "total_hours_worked", "total_labor_hours",
+    "equipment_count", "total_machine_hours", "total_ancillary_hours",
+)
+
 
 @router.get("/", response_model=List[schemas.Brigade])
 def get_brigades(
@@ -52,6 +66,168 @@ async def create_brigade(
     return db_brigade
 
 
+@router.post("/clone", response_model=schemas.BrigadeCloneResult)
+async def clone_brigades(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    project_id: Optional[int] = Query(None),
+    include_volumes: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Скопировать бригады объекта с даты from на дату to: состав, технику
+    и (include_volumes) объёмы работ — одной транзакцией.
+
+    Сотрудник или техника, уже занятые на дату to (или неактивные), не
+    копируются и попадают в conflicts; остальное копируется. Бригада, в которую
+    ничего не попало, не создаётся. Если на дату to уже есть бригада с тем же
+    названием — 409: повторное копирование не плодит бригады.
+    """
+    if from_date == to_date:
+        raise HTTPException(status_code=400, detail="Даты from и to совпадают")
+    sources = db.query(models.Brigade).filter(
+        models.Brigade.date == from_date,
+        models.Brigade.project_id == project_id
+    ).order_by(models.Brigade.order).all()
+    if not sources:
+        raise HTTPException(status_code=404, detail="На исходную дату бригад нет")
+    # Бригада с тем же названием на дату to — день уже скопирован
+    copied = sorted({
+        name for (name,) in db.query(models.Brigade.name).filter(
+            models.Brigade.date == to_date,
+            models.Brigade.project_id == project_id,
+            models.Brigade.name.in_({src.name for src in sources})
+        ).all()
+    })
+    if copied:
+        raise HTTPException(
+            status_code=409,
+            detail=f"На {to_date.strftime('%d.%m.%Y')} уже есть бригады: {', '.join(copied)}"
+        )
+    source_ids = [b.id for b in sources]
+
+    executors = db.query(models.DailyExecutor, models.Employee).join(
+        models.Employee, models.Employee.id == models.DailyExecutor.employee_id
+    ).filter(models.DailyExecutor.brigade_id.in_(source_ids)).order_by(models.DailyExecutor.id).all()
+    usages = db.query(models.DailyEquipmentUsage, models.Equipment).join(
+        models.Equipment, models.Equipment.id == models.DailyEquipmentUsage.equipment_id
+    ).filter(models.DailyEquipmentUsage.brigade_id.in_(source_ids)).order_by(models.DailyEquipmentUsage.id).all()
+    works = db.query(models.DailyWork).filter(
+        models.DailyWork.brigade_id.in_(source_ids)
+    ).order_by(models.DailyWork.id).all() if include_volumes else []
+
+    # Кто и что уже занято на целевую дату — двумя запросами
+    busy_employees = {
+        employee_id for (employee_id,) in db.query(models.DailyExecutor.employee_id).filter(
+            models.DailyExecutor.date == to_date
+        ).all()
+    }
+    busy_equipment = {
+        equipment_id for (equipment_id,) in db.query(models.DailyEquipmentUsage.equipment_id).filter(
+            models.DailyEquipmentUsage.date == to_date
+        ).all()
+    }
+
+    names = {src.id: src.name for src in sources}
+
+    # Строки копии собираются с id исходной бригады — бригады на дату to
+    # создаются потом и только те, в которые что-то попало
+    conflicts = []
+    executor_rows = []
+    for ex, emp in executors:
+        reason = None
+        if not emp.is_active:
+            reason = "Сотрудник неактивен"
+        elif emp.id in busy_employees:
+            reason = "Сотрудник уже назначен в бригаду на эту дату"
+        if reason:
+            conflicts.append({"brigade": names[ex.brigade_id], "kind": "executor",
+                              "name": emp.full_name, "reason": reason})
+            continue
+        busy_employees.add(emp.id)
+        executor_rows.append((ex.brigade_id, models.DailyExecutor(
+            date=to_date, employee_id=ex.employee_id, hours_worked=ex.hours_worked,
+            is_responsible=ex.is_responsible
+        )))
+
+    usage_rows = []
+    for eu, eq in usages:
+        reason = None
+        if not eq.is_active:
+            reason = "Техника неактивна"
+        elif eq.id in busy_equipment:
+            reason = "Техника уже добавлена на эту дату"
+        if reason:
+            conflicts.append({"brigade": names[eu.brigade_id], "kind": "equipment",
+                              "name": f"{eq.equipment_type} {eq.model} ({eq.registration_number})",
+                              "reason": reason})
+            continue
+        busy_equipment.add(eq.id)
+        usage_rows.append((eu.brigade_id, models.DailyEquipmentUsage(
+            date=to_date, equipment_id=eu.equipment_id, machine_hours=eu.machine_hours
+        )))
+
+    work_rows = []
+    volumes = {}
+    for w in works:
+        work_rows.append((w.brigade_id, models.DailyWork(
+            task_id=w.task_id, date=to_date, volume=w.volume, description=w.description,
+            is_ancillary=w.is_ancillary
+        )))
+        if not w.is_ancillary and w.task_id:
+            volumes[w.task_id] = volumes.get(w.task_id, 0) + w.volume
+
+    # Бригада, у которой все люди и техника в конфликтах, не копируется
+    staffed = {source_id for source_id, _ in executor_rows + usage_rows + work_rows}
+    max_order = db.query(func.max(models.Brigade.order)).filter(
+        models.Brigade.date == to_date,
+        models.Brigade.project_id == project_id
+    ).scalar() or 0
+    clones = {
+        src.id: models.Brigade(date=to_date, name=src.name, order=max_order + i, project_id=project_id)
+        for i, src in enumerate([src for src in sources if src.id in staffed], 1)
+    }
+    db.add_all(clones.values())
+    db.flush()
+
+    new_rows = []
+    for source_id, row in executor_rows + usage_rows + work_rows:
+        row.brigade_id = clones[source_id].id
+        new_rows.append(row)
+    executors_count = len(executor_rows)
+    equipment_count = len(usage_rows)
+    adjust_meters(db, [(row.equipment_id, to_date, row.machine_hours) for _, row in usage_rows])
+    db.add_all(new_rows)
+    tasks = lock_tasks(db, volumes)
+    for task_id, task in tasks.items():
+        adjust_volume_fact(db, task, volumes[task_id])
+
+    result = {
+        "brigades": [schemas.Brigade.model_validate(b) for b in clones.values()],
+        "executors": executors_count,
+        "equipment": equipment_count,
+        "works": len(works),
+        "conflicts": conflicts,
+    }
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Исполнители или техника на целевую дату изменились во время копирования — повторите"
+        )
+    touch_project(project_id, db)
+    await manager.broadcast(
+        {"type": "brigades_cloned", "event": "brigades",
+         "data": {"project_id": project_id, "date": to_date.isoformat(),
+                  "ids": [b.id for b in result["brigades"]]}},
+        event_type="brigades"
+    )
+    return result
+
+
 @router.put("/{brigade_id}", response_model=schemas.Brigade)
 async def update_brigade(
     brigade_id: int,
@@ -85,9 +261,31 @@ async def delete_brigade(
         raise HTTPException(status_code=404, detail="Бригада не найдена")
     project_id = db_brigade.project_id
 
+    # Объёмы бригады вычитаются из volume_fact задач в той же транзакции
+    volumes = dict(db.query(
+        models.DailyWork.task_id, func.sum(models.DailyWork.volume)
+    ).filter(
+        models.DailyWork.brigade_id == brigade_id,
+        models.DailyWork.is_ancillary == False,
+        models.DailyWork.task_id != None
+    ).group_by(models.DailyWork.task_id).all())
+    tasks = lock_tasks(db, volumes)
+    for task_id, task in tasks.items():
+        adjust_volume_fact(db, task, -volumes[task_id])
+    changed = [
+        {"id": task.id, "project_id": task.project_id, "revision": task.revision,
+         "changes": {"volume_fact": task.volume_fact}}
+        for task in tasks.values()
+    ]
+
     # Удаляем все связанные записи за этот день у этой бригады
     db.query(models.DailyWork).filter(models.DailyWork.brigade_id == brigade_id).delete()
     db.query(models.DailyExecutor).filter(models.DailyExecutor.brigade_id == brigade_id).delete()
+    usages = db.query(
+        models.DailyEquipmentUsage.equipment_id, models.DailyEquipmentUsage.date,
+        models.DailyEquipmentUsage.machine_hours
+    ).filter(models.DailyEquipmentUsage.brigade_id == brigade_id).all()
+    adjust_meters(db, [(equipment_id, usage_date, -hours) for equipment_id, usage_date, hours in usages])
     db.query(models.DailyEquipmentUsage).filter(models.DailyEquipmentUsage.brigade_id == brigade_id).delete()
 
     db.delete(db_brigade)
@@ -97,6 +295,11 @@ async def delete_brigade(
         {"type": "brigade_deleted", "event": "brigades", "data": {"id": brigade_id}},
         event_type="brigades"
     )
+    if changed:
+        await manager.broadcast(
+            {"type": "tasks_batch_updated", "event": "tasks", "data": {"items": changed}},
+            event_type="tasks"
+        )
     return {"message": "Бригада и все связанные данные удалены", "id": brigade_id}
 
 
@@ -110,89 +313,284 @@ def get_brigades_stats(
     if project_id is not None:
         query = query.filter(models.Brigade.project_id == project_id)
     brigades = query.order_by(models.Brigade.order).all()
-    return [_build_brigade_stats(b, db) for b in brigades]
-
-
-def _build_brigade_stats(brigade: models.Brigade, db: Session) -> dict:
-    executors = db.query(models.DailyExecutor).filter(
-        models.DailyExecutor.brigade_id == brigade.id
-    ).all()
-    executors_with_employees = []
-    responsible = None
-    total_hours = 0.0
-    for ex in executors:
-        emp = db.query(models.Employee).filter(models.Employee.id == ex.employee_id).first()
-        if emp:
-            executors_with_employees.append({
-                "id": ex.id, "date": ex.date, "employee_id": ex.employee_id,
-                "hours_worked": ex.hours_worked, "is_responsible": ex.is_responsible,
-                "brigade_id": ex.brigade_id, "created_at": ex.created_at, "employee": emp
-            })
-            if ex.is_responsible:
-                responsible = emp
-            else:
-                total_hours += ex.hours_worked
+    return _build_brigades_stats(brigades, db)
+
 
-    all_works = db.query(models.DailyWork).filter(
-        models.DailyWork.brigade_id == brigade.id
-    ).all()
+@router.get("/day", response_model=schemas.BrigadeDay)
+def get_brigades_day(
+    work_date: date,
+    project_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Всё для экрана «Наряды» за день одним запросом: бригады с исполнителями,
+    работами и техникой плюс итоги дня по всем бригадам. Число SQL-запросов
+    не зависит от количества бригад и записей.
+    """
+    brigades = get_brigades_stats(work_date, project_id, db)
+    totals = {key: sum(b[key] for b in brigades) for key in DAY_TOTAL_KEYS}
+    return {"date": work_date, "project_id": project_id, "brigades": brigades, "totals": totals}
+
+
+@router.get("/report")
+def get_brigades_report(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    project_id: Optional[int] = Query(None),
+    group_by: str = Query("day", pattern="^(day|week|month|brigade)$"),
+    format: str = Query("json", pattern="^(json|csv|xlsx)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    Выработка бригад за период, сгруппированная по дню, неделе, месяцу или
+    названию бригады (бригады создаются на каждый день, поэтому «бригада» —
+    это все бригады с одинаковым названием).
 
-    works_details = []
-    total_labor_hours = 0.0
-    ancillary_works = []
-    total_ancillary_hours = 0.0
+    Для группы: отработанные часы исполнителей (без ответственного),
+    трудозатраты и машиночасы по объёмам (объём × норма задачи), машиночасы
+    техники, часы сопутствующих работ и объёмы по задачам. Каждый показатель —
+    один сгруппированный запрос. format=csv|xlsx — файл вместо JSON.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="Дата to раньше from")
 
-    for w in all_works:
+    def scoped(query, table):
+        query = query.join(models.Brigade, models.Brigade.id == table.brigade_id).filter(
+            table.date >= from_date,
+            table.date <= to_date
+        )
+        if project_id is not None:
+            query = query.filter(models.Brigade.project_id == project_id)
+        return query
+
+    def key(table):
+        if group_by == "brigade":
+            return models.Brigade.name
+        return _period_start(db, table.date, group_by)
+
+    groups = {}
+
+    def group(value):
+        value = _group_label(value)
+        if value not in groups:
+            groups[value] = {
+                "group": value,
+                "hours_worked": 0.0, "labor_hours": 0.0,
+                "machine_hours": 0.0, "work_machine_hours": 0.0,
+                "ancillary_hours": 0.0, "tasks": [],
+            }
+        return groups[value]
+
+    Executor, Work, Usage, Task = (
+        models.DailyExecutor, models.DailyWork, models.DailyEquipmentUsage, models.Task
+    )
+    k = key(Executor)
+    for value, hours in scoped(db.query(k, func.sum(Executor.hours_worked)), Executor).filter(
+        Executor.is_responsible == False
+    ).group_by(k).all():
+        group(value)["hours_worked"] = hours or 0
+
+    k = key(Usage)
+    for value, hours in scoped(db.query(k, func.sum(Usage.machine_hours)), Usage).group_by(k).all():
+        group(value)["machine_hours"] = hours or 0
+
+    k = key(Work)
+    ancillary = func.sum(case((Work.is_ancillary == True, Work.volume), else_=0))
+    for value, ancillary_hours in scoped(db.query(k, ancillary), Work).group_by(k).all():
+        group(value)["ancillary_hours"] = ancillary_hours or 0
+
+    for value, task_id, code, name, unit, volume, labor, machine in scoped(db.query(
+        k, Task.id, Task.code, Task.name, Task.unit,
+        func.sum(Work.volume),
+        func.sum(Work.volume * func.coalesce(Task.labor_per_unit, 0)),
+        func.sum(Work.volume * func.coalesce(Task.machine_hours_per_unit, 0)),
+    ).join(Task, Task.id == Work.task_id), Work).filter(
+        Work.is_ancillary == False
+    ).group_by(k, Task.id, Task.code, Task.name, Task.unit).order_by(Task.code).all():
+        item = group(value)
+        item["labor_hours"] += labor or 0
+        item["work_machine_hours"] += machine or 0
+        item["tasks"].append({"task_id": task_id, "code": code, "name": name, "unit": unit, "volume": volume})
+
+    rows = [groups[value] for value in sorted(groups)]
+    if format == "json":
+        return {
+            "from": from_date, "to": to_date, "project_id": project_id,
+            "group_by": group_by, "rows": rows,
+        }
+
+    filename = f"brigades_{group_by}_{from_date.isoformat()}_{to_date.isoformat()}"
+    if format == "csv":
+        return StreamingResponse(
+            _report_csv(rows, group_by),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
+        )
+    return StreamingResponse(
+        _report_xlsx(rows, group_by),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename={filename}.xlsx"}
+    )
+
+
+REPORT_COLUMNS = (
+    ("hours_worked", "Отработано, ч"),
+    ("labor_hours", "Трудозатраты по объёмам, ч"),
+    ("machine_hours", "Машиночасы техники"),
+    ("work_machine_hours", "Машиночасы по объёмам"),
+    ("ancillary_hours", "Сопутствующие, ч/ч"),
+)
+REPORT_GROUP_TITLES = {"day": "День", "week": "Неделя с", "month": "Месяц", "brigade": "Бригада"}
+REPORT_VOLUME_HEADER = {
+    key: [title, "Код", "Наименование", "Ед.изм.", "Объём"] for key, title in REPORT_GROUP_TITLES.items()
+}
+
+
+def _period_start(db: Session, column, group_by: str):
+    """Начало дня / недели (понедельник) / месяца для группировки в SQL."""
+    if group_by == "day":
+        return column
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.date_trunc(group_by, column))
+    if group_by == "week":
+        return func.date(column, "-6 days", "weekday 1")
+    return func.date(column, "start of month")
+
+
+def _group_label(value) -> str:
+    return value.isoformat()[:10] if hasattr(value, "isoformat") else str(value)
+
+
+def _report_csv(rows, group_by: str):
+    """
+    CSV построчно (разделитель ';' и BOM — для Excel с русской локалью).
+    Две таблицы через пустую строку: итоги групп и объёмы по задачам —
+    как листы «Выработка» и «Объёмы» в XLSX.
+    """
+    def line(values):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=";").writerow(values)
+        return buffer.getvalue()
+
+    yield "\ufeff" + line([REPORT_GROUP_TITLES[group_by]] + [title for _, title in REPORT_COLUMNS])
+    for row in rows:
+        yield line([row["group"]] + [round(row[key], 2) for key, _ in REPORT_COLUMNS])
+
+    yield line([])
+    yield line(REPORT_VOLUME_HEADER[group_by])
+    for row in rows:
+        for task in row["tasks"]:
+            yield line([row["group"], task["code"], task["name"], task["unit"], task["volume"]])
+
+
+def _report_xlsx(rows, group_by: str) -> io.BytesIO:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Выработка"
+    header_font = Font(bold=True)
+    ws.append([REPORT_GROUP_TITLES[group_by]] + [title for _, title in REPORT_COLUMNS])
+    for row in rows:
+        ws.append([row["group"]] + [round(row[key], 2) for key, _ in REPORT_COLUMNS])
+
+    volumes = wb.create_sheet("Объёмы")
+    volumes.append(REPORT_VOLUME_HEADER[group_by])
+    for row in rows:
+        for task in row["tasks"]:
+            volumes.append([row["group"], task["code"], task["name"], task["unit"], task["volume"]])
+    for sheet in (ws, volumes):
+        for cell in sheet[1]:
+            cell.font = header_font
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def _build_brigades_stats(brigades: List[models.Brigade], db: Session) -> List[dict]:
+    """
+    Статистика бригад: три запроса на все бригады сразу (исполнители с сотрудниками,
+    работы с задачами, техника со справочником), дальше — один проход в Python.
+    """
+    stats = {
+        b.id: {
+            "brigade": b,
+            "executors_count": 0,
+            "total_hours_worked": 0.0,
+            "total_labor_hours": 0.0,
+            "responsible": None,
+            "executors": [],
+            "equipment_count": 0,
+            "total_machine_hours": 0.0,
+            "equipment_usage": [],
+            "works": [],
+            "ancillary_works": [],
+            "total_ancillary_hours": 0.0,
+        }
+        for b in brigades
+    }
+    if not stats:
+        return []
+    brigade_ids = list(stats)
+
+    executors = db.query(models.DailyExecutor, models.Employee).outerjoin(
+        models.Employee, models.Employee.id == models.DailyExecutor.employee_id
+    ).filter(models.DailyExecutor.brigade_id.in_(brigade_ids)).all()
+    for ex, emp in executors:
+        item = stats[ex.brigade_id]
+        if not ex.is_responsible:
+            item["executors_count"] += 1
+        if not emp:
+            continue
+        item["executors"].append({
+            "id": ex.id, "date": ex.date, "employee_id": ex.employee_id,
+            "hours_worked": ex.hours_worked, "is_responsible": ex.is_responsible,
+            "brigade_id": ex.brigade_id, "created_at": ex.created_at, "employee": emp
+        })
+        if ex.is_responsible:
+            item["responsible"] = emp
+        else:
+            item["total_hours_worked"] += ex.hours_worked
+
+    works = db.query(models.DailyWork, models.Task).outerjoin(
+        models.Task, models.Task.id == models.DailyWork.task_id
+    ).filter(models.DailyWork.brigade_id.in_(brigade_ids)).all()
+    for w, task in works:
+        item = stats[w.brigade_id]
         if w.is_ancillary:
-            ancillary_works.append({
+            item["ancillary_works"].append({
                 "id": w.id, "task_id": None,
                 "date": w.date.isoformat() if w.date else None,
                 "volume": w.volume, "description": w.description,
                 "brigade_id": w.brigade_id, "is_ancillary": True,
             })
-            total_ancillary_hours += w.volume
-        else:
-            task = db.query(models.Task).filter(models.Task.id == w.task_id).first()
-            if task:
-                if task.labor_per_unit:
-                    total_labor_hours += w.volume * task.labor_per_unit
-                works_details.append({
-                    "id": w.id, "task_id": w.task_id,
-                    "date": w.date.isoformat() if w.date else None,
-                    "volume": w.volume, "description": w.description,
-                    "brigade_id": w.brigade_id, "is_ancillary": False,
-                    "code": task.code, "name": task.name, "unit": task.unit,
-                    "unit_price": task.unit_price, "labor_per_unit": task.labor_per_unit,
-                    "machine_hours_per_unit": task.machine_hours_per_unit,
-                    "executor": task.executor,
-                })
-
-    equipment_usages = db.query(models.DailyEquipmentUsage).filter(
-        models.DailyEquipmentUsage.brigade_id == brigade.id
-    ).all()
-    equipment_with_details = []
-    total_machine_hours = 0.0
-    for eu in equipment_usages:
-        eq = db.query(models.Equipment).filter(models.Equipment.id == eu.equipment_id).first()
+            item["total_ancillary_hours"] += w.volume
+        elif task:
+            if task.labor_per_unit:
+                item["total_labor_hours"] += w.volume * task.labor_per_unit
+            item["works"].append({
+                "id": w.id, "task_id": w.task_id,
+                "date": w.date.isoformat() if w.date else None,
+                "volume": w.volume, "description": w.description,
+                "brigade_id": w.brigade_id, "is_ancillary": False,
+                "code": task.code, "name": task.name, "unit": task.unit,
+                "unit_price": task.unit_price, "labor_per_unit": task.labor_per_unit,
+                "machine_hours_per_unit": task.machine_hours_per_unit,
+                "executor": task.executor,
+            })
+
+    usages = db.query(models.DailyEquipmentUsage, models.Equipment).outerjoin(
+        models.Equipment, models.Equipment.id == models.DailyEquipmentUsage.equipment_id
+    ).filter(models.DailyEquipmentUsage.brigade_id.in_(brigade_ids)).all()
+    for eu, eq in usages:
+        item = stats[eu.brigade_id]
+        item["equipment_count"] += 1
         if eq:
-            equipment_with_details.append({
+            item["equipment_usage"].append({
                 "id": eu.id, "date": eu.date, "equipment_id": eu.equipment_id,
                 "machine_hours": eu.machine_hours, "brigade_id": eu.brigade_id,
                 "created_at": eu.created_at, "equipment": eq
             })
-            total_machine_hours += eu.machine_hours
-
-    return {
-        "brigade": brigade,
-        "executors_count": len([e for e in executors if not e.is_responsible]),
-        "total_hours_worked": total_hours,
-        "total_labor_hours": total_labor_hours,
-        "responsible": responsible,
-        "executors": executors_with_employees,
-        "equipment_count": len(equipment_usages),
-        "total_machine_hours": total_machine_hours,
-        "equipment_usage": equipment_with_details,
-        "works": works_details,
-        "ancillary_works": ancillary_works,
-        "total_ancillary_hours": total_ancillary_hours,
-    }
+            item["total_machine_hours"] += eu.machine_hours
+
+    return list(stats.values())
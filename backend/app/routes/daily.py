@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional
 from datetime import date
-from .. import models, schemas
+from .. import models, schemas, rollups
 from ..database import get_db
+from ..dependencies import get_current_user
 from ..websocket_manager import manager
+from .projects import touch_project, next_revision
+from .equipment_usage import adjust_meters
 
 router = APIRouter()
 
@@ -58,7 +62,8 @@ async def create_daily_work(work: schemas.DailyWorkCreate, db: Session = Depends
     if not work.task_id:
         raise HTTPException(status_code=400, detail="task_id обязателен для обычных работ")
 
-    task = db.query(models.Task).filter(models.Task.id == work.task_id).first()
+    tasks = lock_tasks(db, [work.task_id])
+    task = tasks.get(work.task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
@@ -71,16 +76,10 @@ async def create_daily_work(work: schemas.DailyWorkCreate, db: Session = Depends
         is_ancillary=False,
     )
     db.add(db_work)
+    # volume_fact меняется на объём записи — без пересчёта SUM по всей истории задачи
+    adjust_volume_fact(db, task, work.volume)
     db.commit()
     db.refresh(db_work)
-
-    # Пересчитываем volume_fact только для обычных работ
-    total_volume = db.query(func.sum(models.DailyWork.volume)).filter(
-        models.DailyWork.task_id == work.task_id,
-        models.DailyWork.is_ancillary == False
-    ).scalar() or 0
-    task.volume_fact = total_volume
-    db.commit()
     db.refresh(task)
 
     await manager.broadcast({
@@ -95,7 +94,301 @@ async def create_daily_work(work: schemas.DailyWorkCreate, db: Session = Depends
             "is_ancillary": False,
         }
     }, event_type="daily_works")
+    await _broadcast_task(task)
+
+    return db_work
+
+
+@router.put("/works/{work_id}")
+async def update_daily_work(
+    work_id: int,
+    changes: schemas.DailyWorkUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Исправить запись о выполненной работе.
+    volume_fact задач меняется на разницу объёмов в той же транзакции; при смене
+    task_id объём списывается со старой задачи и добавляется новой.
+    """
+    db_work = db.query(models.DailyWork).filter(
+        models.DailyWork.id == work_id
+    ).with_for_update().first()
+    if not db_work:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+
+    data = changes.dict(exclude_unset=True)
+    if db_work.is_ancillary and data.get("task_id"):
+        raise HTTPException(status_code=400, detail="Сопутствующие работы не привязываются к задаче")
+    if not db_work.is_ancillary and "task_id" in data and not data["task_id"]:
+        raise HTTPException(status_code=400, detail="task_id обязателен для обычных работ")
+    if any(key in data and data[key] is None for key in ("date", "volume")):
+        raise HTTPException(status_code=400, detail="Дата и объём не могут быть пустыми")
+
+    old_task_id, old_volume = db_work.task_id, db_work.volume
+    for key, value in data.items():
+        setattr(db_work, key, value)
+
+    # Задачи блокируются, только если меняется их volume_fact: правка даты или
+    # описания не трогает график. Запись удалённой задачи (task_id = NULL)
+    # можно править — списывать объём не с чего
+    tasks = {}
+    task_changed = old_task_id != db_work.task_id
+    if not db_work.is_ancillary and (task_changed or db_work.volume != old_volume):
+        tasks = lock_tasks(db, [old_task_id, db_work.task_id])
+        if task_changed:
+            if db_work.task_id not in tasks:
+                raise HTTPException(status_code=404, detail="Задача не найдена")
+            if old_task_id in tasks:
+                adjust_volume_fact(db, tasks[old_task_id], -old_volume)
+            adjust_volume_fact(db, tasks[db_work.task_id], db_work.volume)
+        elif db_work.task_id in tasks:
+            adjust_volume_fact(db, tasks[db_work.task_id], db_work.volume - old_volume)
+    db.commit()
+    db.refresh(db_work)
+
+    await manager.broadcast({
+        "type": "daily_work_updated",
+        "event": "daily_works",
+        "data": {
+            "id": db_work.id,
+            "task_id": db_work.task_id,
+            "date": db_work.date.isoformat(),
+            "volume": db_work.volume,
+            "description": db_work.description,
+            "is_ancillary": db_work.is_ancillary,
+        }
+    }, event_type="daily_works")
+    for task in tasks.values():
+        db.refresh(task)
+        await _broadcast_task(task)
+
+    return db_work
+
+
+@router.delete("/works/{work_id}")
+async def delete_daily_work(
+    work_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Удалить запись; её объём вычитается из volume_fact задачи в той же транзакции."""
+    db_work = db.query(models.DailyWork).filter(
+        models.DailyWork.id == work_id
+    ).with_for_update().first()
+    if not db_work:
+        raise HTTPException(status_code=404, detail="Запись не найдена")
+
+    task = None
+    if not db_work.is_ancillary and db_work.task_id:
+        task = lock_tasks(db, [db_work.task_id]).get(db_work.task_id)
+        if task:
+            adjust_volume_fact(db, task, -db_work.volume)
+    db.delete(db_work)
+    db.commit()
+
+    await manager.broadcast({
+        "type": "daily_work_deleted",
+        "event": "daily_works",
+        "data": {"id": work_id},
+    }, event_type="daily_works")
+    if task:
+        db.refresh(task)
+        await _broadcast_task(task)
+
+    return {"message": "Запись удалена", "id": work_id}
+
+
+@router.post("/reports", response_model=schemas.DailyReportResult)
+async def submit_daily_report(
+    report: schemas.DailyReportCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Дневной отчёт бригады одним запросом: работы, сопутствующие работы,
+    исполнители и техника на дату бригады.
+
+    Проверки те же, что у поштучного ввода, но каждая — одним запросом на весь
+    отчёт; при любой ошибке ничего не сохраняется, в detail — все ошибки сразу.
+    volume_fact каждой задачи меняется один раз на сумму её объёмов в отчёте.
+    """
+    brigade = db.query(models.Brigade).filter(models.Brigade.id == report.brigade_id).first()
+    if not brigade:
+        raise HTTPException(status_code=404, detail="Бригада не найдена")
+    work_date = brigade.date
+    errors = []
+
+    # Работы: задачи одного объекта с бригадой
+    task_ids = {w.task_id for w in report.works}
+    known_tasks = dict(db.query(models.Task.id, models.Task.project_id).filter(
+        models.Task.id.in_(task_ids)
+    ).all()) if task_ids else {}
+    for task_id in sorted(task_ids):
+        if task_id not in known_tasks:
+            errors.append(f"Задача id={task_id} не найдена")
+        elif brigade.project_id is not None and known_tasks[task_id] != brigade.project_id:
+            errors.append(f"Задача id={task_id} относится к другому объекту")
+
+    # Исполнители: справочник, повторы в отчёте и в бригаде, один ответственный
+    employee_ids = [e.employee_id for e in report.executors]
+    employees = {
+        emp.id: emp for emp in db.query(models.Employee).filter(
+            models.Employee.id.in_(employee_ids)
+        ).all()
+    } if employee_ids else {}
+    already_in_brigade = {
+        employee_id for (employee_id,) in db.query(models.DailyExecutor.employee_id).filter(
+            models.DailyExecutor.brigade_id == brigade.id,
+            models.DailyExecutor.date == work_date,
+            models.DailyExecutor.employee_id.in_(employee_ids)
+        ).all()
+    } if employee_ids else set()
+    seen = set()
+    for executor in report.executors:
+        employee = employees.get(executor.employee_id)
+        if not employee:
+            errors.append(f"Сотрудник id={executor.employee_id} не найден")
+            continue
+        if executor.employee_id in seen:
+            errors.append(f"Сотрудник '{employee.full_name}' указан в отчёте дважды")
+        elif executor.employee_id in already_in_brigade:
+            errors.append(f"Сотрудник '{employee.full_name}' уже добавлен в эту бригаду на эту дату")
+        seen.add(executor.employee_id)
+    new_responsible = sum(1 for e in report.executors if e.is_responsible)
+    if new_responsible:
+        has_responsible = db.query(models.DailyExecutor.id).filter(
+            models.DailyExecutor.brigade_id == brigade.id,
+            models.DailyExecutor.date == work_date,
+            models.DailyExecutor.is_responsible == True
+        ).first()
+        if has_responsible or new_responsible > 1:
+            errors.append("В бригаде может быть только один ответственный")
+
+    # Техника: справочник, активность, одна единица — один раз на дату
+    equipment_ids = [u.equipment_id for u in report.equipment]
+    equipment = {
+        eq.id: eq for eq in db.query(models.Equipment).filter(
+            models.Equipment.id.in_(equipment_ids)
+        ).all()
+    } if equipment_ids else {}
+    busy = {
+        equipment_id for (equipment_id,) in db.query(models.DailyEquipmentUsage.equipment_id).filter(
+            models.DailyEquipmentUsage.date == work_date,
+            models.DailyEquipmentUsage.equipment_id.in_(equipment_ids)
+        ).all()
+    } if equipment_ids else set()
+    seen = set()
+    for usage in report.equipment:
+        eq = equipment.get(usage.equipment_id)
+        if not eq:
+            errors.append(f"Техника id={usage.equipment_id} не найдена")
+            continue
+        label = f"{eq.equipment_type} {eq.model} ({eq.registration_number})"
+        if not eq.is_active:
+            errors.append(f"Техника '{label}' неактивна")
+        elif usage.equipment_id in seen:
+            errors.append(f"Техника '{label}' указана в отчёте дважды")
+        elif usage.equipment_id in busy:
+            errors.append(f"Техника '{label}' уже добавлена на эту дату")
+        seen.add(usage.equipment_id)
+
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+
+    db.add_all([
+        models.DailyWork(task_id=w.task_id, date=work_date, volume=w.volume,
+                         description=w.description, brigade_id=brigade.id, is_ancillary=False)
+        for w in report.works
+    ] + [
+        models.DailyWork(task_id=None, date=work_date, volume=w.volume,
+                         description=w.description, brigade_id=brigade.id, is_ancillary=True)
+        for w in report.ancillary_works
+    ] + [
+        models.DailyExecutor(date=work_date, employee_id=e.employee_id, hours_worked=e.hours_worked,
+                             is_responsible=e.is_responsible, brigade_id=brigade.id)
+        for e in report.executors
+    ] + [
+        models.DailyEquipmentUsage(date=work_date, equipment_id=u.equipment_id,
+                                   machine_hours=u.machine_hours, brigade_id=brigade.id)
+        for u in report.equipment
+    ])
+
+    adjust_meters(db, [(u.equipment_id, work_date, u.machine_hours) for u in report.equipment])
+
+    volumes = {}
+    for w in report.works:
+        volumes[w.task_id] = volumes.get(w.task_id, 0) + w.volume
+    tasks = lock_tasks(db, volumes)
+    for task_id, volume in volumes.items():
+        adjust_volume_fact(db, tasks[task_id], volume)
+    # Значения фиксируем до commit — после него ORM перечитывал бы каждую задачу
+    summary = {
+        "brigade_id": brigade.id,
+        "project_id": brigade.project_id,
+        "date": work_date,
+        "works": len(report.works),
+        "ancillary_works": len(report.ancillary_works),
+        "executors": len(report.executors),
+        "equipment": len(report.equipment),
+        "tasks": [
+            {"id": task.id, "volume_fact": task.volume_fact, "revision": task.revision}
+            for task in tasks.values()
+        ],
+    }
+    try:
+        db.commit()
+    except IntegrityError:
+        # Параллельный ввод успел занять сотрудника, ответственного или технику
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Исполнители или техника бригады изменились во время сохранения — обновите данные и повторите"
+        )
+    touch_project(summary["project_id"], db)
+
+    await manager.broadcast({
+        "type": "daily_report_submitted",
+        "event": "daily_works",
+        "data": {**summary, "date": work_date.isoformat()},
+    }, event_type="daily_works")
+    return summary
 
+
+def lock_tasks(db: Session, task_ids) -> Dict[int, models.Task]:
+    """
+    Заблокировать задачи (SELECT ... FOR UPDATE) перед изменением volume_fact.
+    Сначала берётся ревизия объекта — тот же порядок блокировок (объект, затем
+    задачи), что и в остальных операциях с графиком; задачи — по возрастанию id.
+    """
+    task_ids = sorted({task_id for task_id in task_ids if task_id})
+    if not task_ids:
+        return {}
+    project_ids = sorted(
+        project_id for (project_id,) in db.query(models.Task.project_id).filter(
+            models.Task.id.in_(task_ids),
+            models.Task.project_id != None
+        ).distinct().all()
+    )
+    revisions = {project_id: next_revision(project_id, db) for project_id in project_ids}
+    tasks = db.query(models.Task).filter(
+        models.Task.id.in_(task_ids)
+    ).order_by(models.Task.id).with_for_update().populate_existing().all()
+    for task in tasks:
+        task.revision = revisions.get(task.project_id) or task.revision
+    return {task.id: task for task in tasks}
+
+
+def adjust_volume_fact(db: Session, task: models.Task, delta: float):
+    """Изменить volume_fact заблокированной задачи на delta и перенести разницу в итоги разделов."""
+    if not delta:
+        return
+    before = rollups.snapshot(task)
+    task.volume_fact = (task.volume_fact or 0) + delta
+    rollups.apply_delta(db, task, before)
+
+
+async def _broadcast_task(task: models.Task):
     await manager.broadcast({
         "type": "task_updated",
         "event": "tasks",
@@ -107,46 +400,65 @@ async def create_daily_work(work: schemas.DailyWorkCreate, db: Session = Depends
             "volume_plan": task.volume_plan,
             "volume_fact": task.volume_fact,
             "start_date_plan": task.start_date_plan.isoformat() if task.start_date_plan else None,
-            "end_date_plan": task.end_date_plan.isoformat() if task.end_date_plan else None
+            "end_date_plan": task.end_date_plan.isoformat() if task.end_date_plan else None,
+            "revision": task.revision,
         }
     }, event_type="tasks")
 
-    return db_work
-
 
 @router.get("/works/with-details")
-def get_daily_works_with_details(work_date: date, db: Session = Depends(get_db)):
-    daily_works = db.query(models.DailyWork).filter(
-        models.DailyWork.date == work_date
-    ).all()
+def get_daily_works_with_details(
+    work_date: date,
+    project_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    return _works_with_details(db, work_date, work_date, project_id)
 
-    result = []
-    for dw in daily_works:
-        if dw.is_ancillary:
-            result.append({
-                "id": dw.id,
-                "task_id": None,
-                "is_ancillary": True,
-                "code": None,
-                "name": "Сопутствующие работы",
-                "unit": "ч/ч",
-                "volume": dw.volume,
-                "description": dw.description,
-                "brigade_id": dw.brigade_id,
-            })
-        else:
-            task = db.query(models.Task).filter(models.Task.id == dw.task_id).first()
-            if task:
-                result.append({
-                    "id": dw.id,
-                    "task_id": dw.task_id,
-                    "is_ancillary": False,
-                    "code": task.code,
-                    "name": task.name,
-                    "unit": task.unit,
-                    "volume": dw.volume,
-                    "description": dw.description,
-                    "brigade_id": dw.brigade_id,
-                })
 
+@router.get("/works/details")
+def get_daily_works_details(
+    project_id: int = Query(...),
+    date_from: date = Query(...),
+    date_to: Optional[date] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Выполненные работы объекта за период [date_from, date_to] (по умолчанию — один день)
+    с кодом, названием и единицей задачи и названием бригады. Один запрос
+    независимо от числа записей.
+    """
+    date_to = date_to or date_from
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to раньше date_from")
+    return _works_with_details(db, date_from, date_to, project_id)
+
+
+def _works_with_details(db: Session, date_from: date, date_to: date, project_id: Optional[int]):
+    """DailyWork + Task + Brigade одним запросом с LEFT JOIN."""
+    DailyWork, Task, Brigade = models.DailyWork, models.Task, models.Brigade
+    query = db.query(
+        DailyWork.id, DailyWork.date, DailyWork.task_id, DailyWork.is_ancillary,
+        DailyWork.volume, DailyWork.description, DailyWork.brigade_id,
+        Brigade.name.label("brigade_name"),
+        Task.code, Task.name, Task.unit,
+    ).outerjoin(
+        Task, Task.id == DailyWork.task_id
+    ).outerjoin(
+        Brigade, Brigade.id == DailyWork.brigade_id
+    ).filter(
+        DailyWork.date >= date_from,
+        DailyWork.date <= date_to,
+        # Работы удалённых задач не показываем — как и раньше
+        or_(DailyWork.is_ancillary == True, Task.id != None)
+    )
+    if project_id is not None:
+        # Сопутствующие работы без задачи относятся к объекту через бригаду
+        query = query.filter(or_(Task.project_id == project_id, Brigade.project_id == project_id))
+
+    result = []
+    for row in query.order_by(DailyWork.date, DailyWork.brigade_id, DailyWork.id).all():
+        item = row._asdict()
+        if row.is_ancillary:
+            item.update(task_id=None, code=None, name="Сопутствующие работы", unit="ч/ч")
+        result.append(item)
     return result
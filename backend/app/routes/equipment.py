@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import func, case
+from typing import List, Optional
+from datetime import date
 from .. import models, schemas
 from ..database import get_db
 from ..dependencies import get_current_user
 
 router = APIRouter()
 
+# Календарь загрузки — не больше квартала с запасом
+CALENDAR_MAX_DAYS = 186
+
 @router.get("/", response_model=List[schemas.Equipment])
 def get_equipment(
     skip: int = 0, 
@@ -29,6 +34,114 @@ def get_equipment(
     equipment_list = query.order_by(models.Equipment.equipment_type, models.Equipment.model).offset(skip).limit(limit).all()
     return equipment_list
 
+@router.get("/calendar", response_model=schemas.EquipmentCalendar)
+def get_equipment_calendar(
+    date_from: date,
+    date_to: date,
+    equipment_type: Optional[str] = Query(None),
+    project_id: Optional[int] = Query(None),
+    free_on: Optional[List[date]] = Query(None),
+    active_only: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Календарь загрузки техники: техника × день за период (до CALENDAR_MAX_DAYS дней).
+
+    - hours: машиночасы по дням (с project_id — только на бригадах объекта)
+    - booked: строка из '0'/'1' по дням — занята ли техника (на любом объекте)
+    - free_on: оставить только технику, свободную во все указанные дни
+
+    Использование за период читается одним сгруппированным запросом
+    по индексу (date, equipment_id).
+    """
+    days = (date_to - date_from).days + 1
+    if days < 1:
+        raise HTTPException(status_code=400, detail="Дата date_to раньше date_from")
+    if days > CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Период не может быть длиннее {CALENDAR_MAX_DAYS} дней")
+    free_mask = 0
+    for day in free_on or []:
+        if not date_from <= day <= date_to:
+            raise HTTPException(status_code=400, detail=f"Дата {day.isoformat()} вне периода")
+        free_mask |= 1 << (day - date_from).days
+
+    equipment_query = db.query(models.Equipment)
+    if active_only:
+        equipment_query = equipment_query.filter(models.Equipment.is_active == True)
+    if equipment_type:
+        equipment_query = equipment_query.filter(models.Equipment.equipment_type == equipment_type)
+    equipment_list = equipment_query.order_by(
+        models.Equipment.equipment_type, models.Equipment.model, models.Equipment.id
+    ).all()
+
+    Usage = models.DailyEquipmentUsage
+    hours = func.sum(Usage.machine_hours)
+    if project_id is not None:
+        hours = func.sum(case((models.Brigade.project_id == project_id, Usage.machine_hours), else_=0))
+    usage_query = db.query(Usage.equipment_id, Usage.date, hours).filter(
+        Usage.date >= date_from,
+        Usage.date <= date_to
+    )
+    if project_id is not None:
+        usage_query = usage_query.outerjoin(models.Brigade, models.Brigade.id == Usage.brigade_id)
+    if equipment_type or active_only:
+        usage_query = usage_query.filter(Usage.equipment_id.in_([eq.id for eq in equipment_list]))
+
+    # Занятость — битовая маска (бит i — день date_from + i), часы — массив по дням
+    booked = {eq.id: 0 for eq in equipment_list}
+    day_hours = {eq.id: [0.0] * days for eq in equipment_list}
+    for equipment_id, usage_date, machine_hours in usage_query.group_by(Usage.equipment_id, Usage.date).all():
+        if equipment_id not in booked:
+            continue
+        index = (usage_date - date_from).days
+        booked[equipment_id] |= 1 << index
+        day_hours[equipment_id][index] = machine_hours or 0
+
+    rows = []
+    for eq in equipment_list:
+        bits = booked[eq.id]
+        if bits & free_mask:
+            continue
+        booked_days = bin(bits).count("1")
+        rows.append({
+            "equipment_id": eq.id,
+            "equipment_type": eq.equipment_type,
+            "model": eq.model,
+            "registration_number": eq.registration_number,
+            "hours": day_hours[eq.id],
+            "booked": "".join("1" if bits >> i & 1 else "0" for i in range(days)),
+            "booked_days": booked_days,
+            "total_hours": sum(day_hours[eq.id]),
+            "utilization": booked_days / days,
+        })
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "days": days,
+        "project_id": project_id,
+        "equipment": rows,
+    }
+
+
+@router.get("/due-for-service", response_model=List[schemas.Equipment])
+def get_equipment_due_for_service(
+    within_hours: float = Query(0, ge=0),
+    active_only: bool = True,
+    db: Session = Depends(get_db)
+):
+    """
+    Техника, которой пора на ТО: до конца межсервисного интервала осталось
+    не больше within_hours машиночасов (0 — интервал уже выработан).
+    Читается по индексу ix_equipment_service_remaining, без суммирования журнала.
+    """
+    remaining = models.Equipment.service_interval_hours - models.Equipment.hours_since_service
+    query = db.query(models.Equipment).filter(remaining <= within_hours)
+    if active_only:
+        query = query.filter(models.Equipment.is_active == True)
+    return query.order_by(remaining, models.Equipment.id).all()
+
+
 @router.get("/{equipment_id}", response_model=schemas.Equipment)
 def get_equipment_by_id(
     equipment_id: int,
@@ -143,6 +256,37 @@ def delete_equipment(
     
     return {"message": "Техника успешно удалена", "id": equipment_id}
 
+@router.post("/{equipment_id}/service", response_model=schemas.Equipment)
+def record_equipment_service(
+    equipment_id: int,
+    service_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Отметить проведённое ТО (по умолчанию — сегодня).
+    Счётчик «после ТО» пересчитывается по записям после даты ТО —
+    ТО можно внести задним числом.
+    """
+    db_equipment = db.query(models.Equipment).filter(
+        models.Equipment.id == equipment_id
+    ).with_for_update().first()
+    if not db_equipment:
+        raise HTTPException(status_code=404, detail="Техника не найдена")
+
+    service_date = service_date or date.today()
+    db_equipment.last_service_date = service_date
+    db_equipment.hours_since_service = db.query(
+        func.coalesce(func.sum(models.DailyEquipmentUsage.machine_hours), 0)
+    ).filter(
+        models.DailyEquipmentUsage.equipment_id == equipment_id,
+        models.DailyEquipmentUsage.date > service_date
+    ).scalar()
+    db.commit()
+    db.refresh(db_equipment)
+
+    return db_equipment
+
 @router.patch("/{equipment_id}/deactivate")
 def deactivate_equipment(
     equipment_id: int,
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import case, or_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from datetime import date
-from .. import models, schemas
+from .. import models, schemas, brigade_stats
 from ..database import get_db
 from ..dependencies import get_current_user
 from ..websocket_manager import manager
@@ -46,64 +47,85 @@ def get_daily_equipment_usage(
 @router.get("/stats", response_model=schemas.DailyEquipmentStats)
 def get_daily_equipment_stats(
     work_date: date,
+    brigade_id: Optional[int] = None,
+    project_id: Optional[int] = Query(None),
     db: Session = Depends(get_db)
 ):
     """
     Получить статистику по технике за день
     
+    - brigade_id: только техника и объёмы этой бригады
+    - project_id: только бригады и работы объекта
+    
     Возвращает:
     - total_machine_hours: суммарные отработанные машиночасы
     - total_work_machine_hours: суммарные машиночасы по внесенным объемам
     - equipment_count: количество единиц техники
     - equipment_usage: список всей техники
     """
-    # Получаем всю технику за день
-    equipment_usage_list = db.query(models.DailyEquipmentUsage).filter(
-        models.DailyEquipmentUsage.date == work_date
-    ).all()
-    
-    # Считаем суммарные отработанные машиночасы
-    total_machine_hours = sum(e.machine_hours for e in equipment_usage_list)
-    
-    # Считаем машиночасы по внесенным объемам
-    daily_works = db.query(models.DailyWork).filter(
-        models.DailyWork.date == work_date
-    ).all()
-    
-    total_work_machine_hours = 0
-    for work in daily_works:
-        task = db.query(models.Task).filter(models.Task.id == work.task_id).first()
-        if task and task.machine_hours_per_unit:
-            total_work_machine_hours += work.volume * task.machine_hours_per_unit
-    
-    # Формируем список техники с полной информацией
-    equipment_usage_with_details = []
-    for usage in equipment_usage_list:
-        equipment = db.query(models.Equipment).filter(
-            models.Equipment.id == usage.equipment_id
-        ).first()
-        
-        if equipment:
-            equipment_usage_with_details.append({
-                "id": usage.id,
-                "date": usage.date,
-                "equipment_id": usage.equipment_id,
-                "machine_hours": usage.machine_hours,
-                "created_at": usage.created_at,
-                "equipment": equipment
-            })
-    
-    # Количество единиц техники
-    equipment_count = len(equipment_usage_list)
-    
+    stats = _equipment_stats(
+        db, work_date, work_date, project_id,
+        [brigade_id] if brigade_id is not None else None, by_brigade=False
+    )
+    result = stats[0] if stats else _empty_stats(work_date, None)
+    result["brigade_id"] = brigade_id
+    return result
+
+@router.get("/stats/bulk", response_model=List[schemas.DailyEquipmentStats])
+def get_daily_equipment_stats_bulk(
+    date_from: date,
+    date_to: date,
+    project_id: Optional[int] = Query(None),
+    brigade_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Статистика по технике за период — отдельно по каждой паре (дата, бригада).
+    Число запросов не зависит от числа дней и бригад.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="Дата date_to раньше date_from")
+    return _equipment_stats(db, date_from, date_to, project_id, brigade_id, by_brigade=True)
+
+def _empty_stats(work_date: date, brigade_id: Optional[int]) -> dict:
     return {
         "date": work_date,
-        "total_machine_hours": total_machine_hours,
-        "total_work_machine_hours": total_work_machine_hours,
-        "equipment_count": equipment_count,
-        "equipment_usage": equipment_usage_with_details
+        "brigade_id": brigade_id,
+        "total_machine_hours": 0.0,
+        "total_work_machine_hours": 0.0,
+        "equipment_count": 0,
+        "equipment_usage": []
     }
 
+def _add_usage(entry: dict, usage: models.DailyEquipmentUsage, equipment: Optional[models.Equipment]):
+    entry["total_machine_hours"] += usage.machine_hours
+    entry["equipment_count"] += 1
+    if equipment:
+        entry["equipment_usage"].append({
+            "id": usage.id,
+            "date": usage.date,
+            "equipment_id": usage.equipment_id,
+            "machine_hours": usage.machine_hours,
+            "brigade_id": usage.brigade_id,
+            "created_at": usage.created_at,
+            "equipment": equipment
+        })
+
+def _equipment_stats(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    project_id: Optional[int],
+    brigade_ids: Optional[List[int]],
+    by_brigade: bool
+) -> List[dict]:
+    """Техника со справочником и машиночасы по объёмам (machine_hours_per_unit)."""
+    return brigade_stats.collect(
+        db, models.DailyEquipmentUsage, models.Equipment, models.DailyEquipmentUsage.equipment_id,
+        models.Task.machine_hours_per_unit, "total_work_machine_hours", _empty_stats, _add_usage,
+        date_from, date_to, project_id, brigade_ids, by_brigade
+    )
+
 @router.post("/", response_model=schemas.DailyEquipmentUsage)
 async def create_daily_equipment_usage(
     usage: schemas.DailyEquipmentUsageCreate,
@@ -130,22 +152,19 @@ async def create_daily_equipment_usage(
             detail=f"Техника '{equipment.equipment_type} {equipment.model}' неактивна"
         )
     
-    # Проверяем, нет ли уже этой техники в этот день
-    existing = db.query(models.DailyEquipmentUsage).filter(
-        models.DailyEquipmentUsage.date == usage.date,
-        models.DailyEquipmentUsage.equipment_id == usage.equipment_id
-    ).first()
-    
-    if existing:
+    # Создаем запись; повтор техники на дату отсекает уникальный индекс
+    # uq_daily_equipment_usage_date_equipment
+    db_usage = models.DailyEquipmentUsage(**usage.dict())
+    db.add(db_usage)
+    adjust_meters(db, [(usage.equipment_id, usage.date, usage.machine_hours)])
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Техника '{equipment.equipment_type} {equipment.model} ({equipment.registration_number})' уже добавлена на эту дату"
         )
-    
-    # Создаем запись
-    db_usage = models.DailyEquipmentUsage(**usage.dict())
-    db.add(db_usage)
-    db.commit()
     db.refresh(db_usage)
     
     # Отправляем уведомление через WebSocket
@@ -181,10 +200,12 @@ async def update_daily_equipment_usage(
     
     # Обновляем только переданные поля
     update_data = usage.dict(exclude_unset=True)
+    old_hours = db_usage.machine_hours
     
     for key, value in update_data.items():
         setattr(db_usage, key, value)
     
+    adjust_meters(db, [(db_usage.equipment_id, db_usage.date, db_usage.machine_hours - old_hours)])
     db.commit()
     db.refresh(db_usage)
     
@@ -224,6 +245,7 @@ async def delete_daily_equipment_usage(
         "equipment_id": db_usage.equipment_id
     }
     
+    adjust_meters(db, [(db_usage.equipment_id, db_usage.date, -db_usage.machine_hours)])
     db.delete(db_usage)
     db.commit()
     
@@ -235,3 +257,25 @@ async def delete_daily_equipment_usage(
     }, event_type="equipment_usage")
     
     return {"message": "Техника успешно удалена из дня", "id": usage_id}
+
+def adjust_meters(db: Session, changes):
+    """
+    Изменить счётчики машиночасов техники на разницу.
+    changes — [(equipment_id, date, delta), ...]. Часы до последнего ТО
+    в hours_since_service не попадают. UPDATE атомарный (счётчик + delta),
+    поэтому параллельные записи не теряют друг друга.
+    """
+    totals = {}
+    for equipment_id, usage_date, delta in changes:
+        if delta:
+            key = (equipment_id, usage_date)
+            totals[key] = totals.get(key, 0) + delta
+    Equipment = models.Equipment
+    for (equipment_id, usage_date), delta in totals.items():
+        db.query(Equipment).filter(Equipment.id == equipment_id).update({
+            Equipment.total_machine_hours: Equipment.total_machine_hours + delta,
+            Equipment.hours_since_service: Equipment.hours_since_service + case(
+                (or_(Equipment.last_service_date == None, Equipment.last_service_date < usage_date), delta),
+                else_=0
+            ),
+        }, synchronize_session=False)
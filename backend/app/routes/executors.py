@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import date
-from .. import models, schemas
+import io
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from .. import models, schemas, periods, brigade_stats
 from ..database import get_db
 from ..dependencies import get_current_user
 from ..websocket_manager import manager
@@ -46,127 +52,203 @@ def get_daily_executors(
 def get_daily_executor_stats(
     work_date: date,
     brigade_id: Optional[int] = None,
+    project_id: Optional[int] = Query(None),
     db: Session = Depends(get_db)
 ):
     """
     Статистика по исполнителям за день.
-    Если передан brigade_id — возвращает только исполнителей этой бригады.
+    Если передан brigade_id — возвращает только исполнителей этой бригады,
+    project_id — только бригады и работы объекта.
     """
-    query = db.query(models.DailyExecutor).filter(
-        models.DailyExecutor.date == work_date
+    stats = _executor_stats(
+        db, work_date, work_date, project_id,
+        [brigade_id] if brigade_id is not None else None, by_brigade=False
     )
-    if brigade_id is not None:
-        query = query.filter(models.DailyExecutor.brigade_id == brigade_id)
+    result = stats[0] if stats else _empty_stats(work_date, None)
+    result["brigade_id"] = brigade_id
+    return result
 
-    executors = query.all()
 
-    total_hours_worked = sum(e.hours_worked for e in executors if not e.is_responsible)
+@router.get("/stats/bulk", response_model=List[schemas.DailyExecutorStats])
+def get_daily_executor_stats_bulk(
+    date_from: date,
+    date_to: date,
+    project_id: Optional[int] = Query(None),
+    brigade_id: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Статистика по исполнителям за период — отдельно по каждой паре (дата, бригада).
+    Число запросов не зависит от числа дней и бригад.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="Дата date_to раньше date_from")
+    return _executor_stats(db, date_from, date_to, project_id, brigade_id, by_brigade=True)
 
-    responsible_executor = next((e for e in executors if e.is_responsible), None)
-    responsible = None
-    if responsible_executor:
-        responsible = db.query(models.Employee).filter(
-            models.Employee.id == responsible_executor.employee_id
-        ).first()
 
-    # Трудозатраты по работам бригады
-    works_query = db.query(models.DailyWork).filter(
-        models.DailyWork.date == work_date
+@router.get("/timesheet", response_model=schemas.Timesheet)
+def get_timesheet(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    project_id: Optional[int] = Query(None),
+    format: str = Query("json", pattern="^(json|xlsx)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    Табель за месяц: часы каждого сотрудника по дням (сотрудник × день).
+    Без project_id — по всем объектам. Часы считаются одним сгруппированным
+    запросом; format=xlsx — тот же табель файлом Excel.
+    """
+    timesheet = _build_timesheet(db, year, month, project_id)
+    if format == "json":
+        return timesheet
+    return StreamingResponse(
+        _timesheet_xlsx(timesheet),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename=timesheet_{year}_{month:02d}.xlsx"}
     )
-    if brigade_id is not None:
-        works_query = works_query.filter(models.DailyWork.brigade_id == brigade_id)
-    daily_works = works_query.all()
 
-    total_labor_hours = 0
-    for work in daily_works:
-        task = db.query(models.Task).filter(models.Task.id == work.task_id).first()
-        if task and task.labor_per_unit:
-            total_labor_hours += work.volume * task.labor_per_unit
 
-    executors_with_employees = []
-    for executor in executors:
-        employee = db.query(models.Employee).filter(
-            models.Employee.id == executor.employee_id
-        ).first()
-        if employee:
-            executors_with_employees.append({
-                "id": executor.id,
-                "date": executor.date,
-                "employee_id": executor.employee_id,
-                "hours_worked": executor.hours_worked,
-                "is_responsible": executor.is_responsible,
-                "brigade_id": executor.brigade_id,
-                "created_at": executor.created_at,
-                "employee": employee
-            })
+def _build_timesheet(db: Session, year: int, month: int, project_id: Optional[int]) -> dict:
+    first_day, last_day = periods.month_bounds(year, month)
+    days = last_day.day
+    Executor, Employee = models.DailyExecutor, models.Employee
+    query = db.query(
+        Employee.id, Employee.full_name, Employee.position,
+        Executor.date, func.sum(Executor.hours_worked)
+    ).join(Employee, Employee.id == Executor.employee_id).filter(
+        Executor.date >= first_day,
+        Executor.date <= last_day
+    )
+    if project_id is not None:
+        query = query.filter(Executor.brigade_id.in_(
+            select(models.Brigade.id).where(models.Brigade.project_id == project_id)
+        ))
+    rows = query.group_by(
+        Employee.id, Employee.full_name, Employee.position, Executor.date
+    ).order_by(Employee.full_name, Employee.id).all()
+
+    employees = {}
+    day_totals = [0.0] * days
+    for employee_id, full_name, position, work_date, hours in rows:
+        row = employees.get(employee_id)
+        if row is None:
+            row = employees[employee_id] = {
+                "employee_id": employee_id, "full_name": full_name, "position": position,
+                "hours": [None] * days, "total": 0.0, "days_worked": 0,
+            }
+        row["hours"][work_date.day - 1] = hours
+        row["total"] += hours
+        row["days_worked"] += 1
+        day_totals[work_date.day - 1] += hours
+
+    return {
+        "year": year,
+        "month": month,
+        "project_id": project_id,
+        "days": days,
+        "employees": list(employees.values()),
+        "day_totals": day_totals,
+        "total": sum(day_totals),
+    }
 
-    executors_count = len([e for e in executors if not e.is_responsible])
 
+def _timesheet_xlsx(timesheet: dict) -> io.BytesIO:
+    """Табель в Excel; write_only — строки пишутся потоком, без модели всего листа в памяти."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(f"Табель {timesheet['month']:02d}.{timesheet['year']}")
+    days = timesheet["days"]
+    ws.column_dimensions["A"].width = 35
+    ws.column_dimensions["B"].width = 20
+    for col in range(3, days + 3):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 5
+
+    def bold(values):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True)
+            cells.append(cell)
+        return cells
+
+    ws.append(bold(["Сотрудник", "Должность", *range(1, days + 1), "Дней", "Часов"]))
+    for row in timesheet["employees"]:
+        ws.append([row["full_name"], row["position"], *row["hours"], row["days_worked"], row["total"]])
+    ws.append(bold(["Итого", None, *timesheet["day_totals"], None, timesheet["total"]]))
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def _empty_stats(work_date: date, brigade_id: Optional[int]) -> dict:
     return {
         "date": work_date,
-        "total_hours_worked": total_hours_worked,
-        "total_labor_hours": total_labor_hours,
-        "executors_count": executors_count,
-        "responsible": responsible,
-        "executors": executors_with_employees
+        "brigade_id": brigade_id,
+        "total_hours_worked": 0.0,
+        "total_labor_hours": 0.0,
+        "executors_count": 0,
+        "responsible": None,
+        "executors": []
     }
 
 
+def _add_executor(entry: dict, executor: models.DailyExecutor, employee: Optional[models.Employee]):
+    if executor.is_responsible:
+        if employee and entry["responsible"] is None:
+            entry["responsible"] = employee
+    else:
+        entry["executors_count"] += 1
+        entry["total_hours_worked"] += executor.hours_worked
+    if employee:
+        entry["executors"].append({
+            "id": executor.id,
+            "date": executor.date,
+            "employee_id": executor.employee_id,
+            "hours_worked": executor.hours_worked,
+            "is_responsible": executor.is_responsible,
+            "brigade_id": executor.brigade_id,
+            "created_at": executor.created_at,
+            "employee": employee
+        })
+
+
+def _executor_stats(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    project_id: Optional[int],
+    brigade_ids: Optional[List[int]],
+    by_brigade: bool
+) -> List[dict]:
+    """Исполнители с сотрудниками и трудозатраты по объёмам (labor_per_unit)."""
+    return brigade_stats.collect(
+        db, models.DailyExecutor, models.Employee, models.DailyExecutor.employee_id,
+        models.Task.labor_per_unit, "total_labor_hours", _empty_stats, _add_executor,
+        date_from, date_to, project_id, brigade_ids, by_brigade
+    )
+
+
 @router.post("/", response_model=schemas.DailyExecutor)
 async def create_daily_executor(
     executor: schemas.DailyExecutorCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    employee = db.query(models.Employee).filter(
-        models.Employee.id == executor.employee_id
-    ).first()
+    employee = db.get(models.Employee, executor.employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Сотрудник не найден")
 
-    # Проверяем дубликат в рамках бригады
-    existing = db.query(models.DailyExecutor).filter(
-        models.DailyExecutor.date == executor.date,
-        models.DailyExecutor.employee_id == executor.employee_id,
-        models.DailyExecutor.brigade_id == executor.brigade_id
-    ).first()
-    if existing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Сотрудник '{employee.full_name}' уже добавлен в эту бригаду на эту дату"
-        )
-
-    if executor.is_responsible:
-        # Один ответственный на бригаду
-        existing_responsible = db.query(models.DailyExecutor).filter(
-            models.DailyExecutor.date == executor.date,
-            models.DailyExecutor.brigade_id == executor.brigade_id,
-            models.DailyExecutor.is_responsible == True
-        ).first()
-        if existing_responsible:
-            resp_employee = db.query(models.Employee).filter(
-                models.Employee.id == existing_responsible.employee_id
-            ).first()
-            raise HTTPException(
-                status_code=400,
-                detail=f"В этой бригаде уже есть ответственный: {resp_employee.full_name if resp_employee else 'Неизвестен'}"
-            )
-    else:
-        is_responsible = db.query(models.DailyExecutor).filter(
-            models.DailyExecutor.date == executor.date,
-            models.DailyExecutor.brigade_id == executor.brigade_id,
-            models.DailyExecutor.employee_id == executor.employee_id,
-            models.DailyExecutor.is_responsible == True
-        ).first()
-        if is_responsible:
-            raise HTTPException(
-                status_code=400,
-                detail="Этот сотрудник уже назначен ответственным в этой бригаде"
-            )
-
+    # Повторы и второго ответственного не пропускают уникальные индексы
+    # daily_executors — проверки идут только при ошибке, чтобы подобрать сообщение
     db_executor = models.DailyExecutor(**executor.dict())
     db.add(db_executor)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _executor_conflict(db, executor, employee)
     db.refresh(db_executor)
 
     await manager.broadcast({
@@ -185,6 +267,40 @@ async def create_daily_executor(
     return db_executor
 
 
+def _executor_conflict(
+    db: Session, executor: schemas.DailyExecutorCreate, employee: models.Employee
+) -> HTTPException:
+    """Объяснить, почему вставка исполнителя нарушила уникальные индексы."""
+    same_brigade = (
+        models.DailyExecutor.date == executor.date,
+        models.DailyExecutor.brigade_id == executor.brigade_id,
+    )
+    existing = db.query(models.DailyExecutor).filter(
+        *same_brigade,
+        models.DailyExecutor.employee_id == executor.employee_id
+    ).first()
+    if existing:
+        if existing.is_responsible and not executor.is_responsible:
+            return HTTPException(
+                status_code=400,
+                detail="Этот сотрудник уже назначен ответственным в этой бригаде"
+            )
+        return HTTPException(
+            status_code=400,
+            detail=f"Сотрудник '{employee.full_name}' уже добавлен в эту бригаду на эту дату"
+        )
+
+    resp_employee = db.query(models.Employee).join(
+        models.DailyExecutor, models.DailyExecutor.employee_id == models.Employee.id
+    ).filter(*same_brigade, models.DailyExecutor.is_responsible == True).first()
+    if executor.is_responsible and resp_employee:
+        return HTTPException(
+            status_code=400,
+            detail=f"В этой бригаде уже есть ответственный: {resp_employee.full_name}"
+        )
+    return HTTPException(status_code=400, detail="Не удалось добавить исполнителя")
+
+
 @router.put("/{executor_id}", response_model=schemas.DailyExecutor)
 async def update_daily_executor(
     executor_id: int,
@@ -200,23 +316,18 @@ async def update_daily_executor(
 
     update_data = executor.dict(exclude_unset=True)
 
-    if 'is_responsible' in update_data and update_data['is_responsible']:
-        existing_responsible = db.query(models.DailyExecutor).filter(
-            models.DailyExecutor.date == db_executor.date,
-            models.DailyExecutor.brigade_id == db_executor.brigade_id,
-            models.DailyExecutor.is_responsible == True,
-            models.DailyExecutor.id != executor_id
-        ).first()
-        if existing_responsible:
-            raise HTTPException(
-                status_code=400,
-                detail="В этой бригаде уже есть ответственный"
-            )
-
     for key, value in update_data.items():
         setattr(db_executor, key, value)
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # uq_daily_executors_responsible: второй ответственный в бригаде
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="В этой бригаде уже есть ответственный"
+        )
     db.refresh(db_executor)
 
     await manager.broadcast({
@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, extract
-from datetime import date
+from sqlalchemy import and_, extract, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import date, datetime
 from typing import Optional, List
 import logging
 from ..database import get_db, engine, Base
+from .. import periods
 from ..models import DailyHeadcount, Task
-from ..schemas import DailyHeadcountUpsert, DailyHeadcountRead
+from ..schemas import DailyHeadcountUpsert, DailyHeadcountRead, DailyHeadcountBulk, DailyHeadcountMatrix
 from ..routes.auth import get_current_user
 from ..schemas import UserResponse
+from ..websocket_manager import manager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Ячеек в одном INSERT / DELETE — держимся ниже лимита параметров запроса СУБД
+HEADCOUNT_BULK_CHUNK = 1000
+
+
+_table_ready = False
+
 
 def ensure_table():
-    """Создаём таблицу если не существует (на случай первого запуска)."""
+    """Создаём таблицу если не существует (на случай первого запуска) — один раз на процесс."""
+    global _table_ready
+    if _table_ready:
+        return
     try:
         Base.metadata.create_all(bind=engine, tables=[DailyHeadcount.__table__], checkfirst=True)
+        _table_ready = True
     except Exception as e:
         logger.error(f"Ошибка создания таблицы daily_headcount: {e}")
 
@@ -37,15 +51,56 @@ def get_headcounts(
         if project_id is not None:
             q = q.filter(DailyHeadcount.project_id == project_id)
         if year is not None:
-            q = q.filter(extract('year', DailyHeadcount.date) == int(year))
-        if month is not None:
+            # Диапазон дат, а не extract — так работает индекс (project_id, date)
+            first_day, last_day = _period_bounds(year, month)
+            q = q.filter(DailyHeadcount.date >= first_day, DailyHeadcount.date <= last_day)
+        elif month is not None:
             q = q.filter(extract('month', DailyHeadcount.date) == int(month))
         return q.all()
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка получения headcount: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Ошибка БД: {str(e)}")
 
 
+@router.get("/matrix", response_model=DailyHeadcountMatrix)
+def get_headcount_matrix(
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    project_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Назначения за месяц в виде матрицы, как их рисует МСГ:
+    task_ids[i] — задача, headcount[i][d] — людей на (d+1)-е число (null — пусто).
+    Читаются только три колонки по индексу (project_id, date).
+    """
+    ensure_table()
+    first_day, last_day = periods.month_bounds(year, month)
+    days = last_day.day
+    q = db.query(DailyHeadcount.task_id, DailyHeadcount.date, DailyHeadcount.headcount).filter(
+        DailyHeadcount.date >= first_day,
+        DailyHeadcount.date <= last_day,
+    )
+    if project_id is not None:
+        q = q.filter(DailyHeadcount.project_id == project_id)
+
+    rows = {}
+    for task_id, day, headcount in q.order_by(DailyHeadcount.task_id).all():
+        if task_id not in rows:
+            rows[task_id] = [None] * days
+        rows[task_id][day.day - 1] = headcount
+    return {
+        "year": year,
+        "month": month,
+        "days": days,
+        "task_ids": list(rows),
+        "headcount": list(rows.values()),
+    }
+
+
 @router.post("/upsert", response_model=DailyHeadcountRead)
 def upsert_headcount(
     payload: DailyHeadcountUpsert,
@@ -90,6 +145,101 @@ def upsert_headcount(
         raise HTTPException(status_code=500, detail=f"Ошибка БД: {str(e)}")
 
 
+@router.post("/bulk")
+async def bulk_headcount(
+    payload: DailyHeadcountBulk,
+    db: Session = Depends(get_db),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Записать много ячеек МСГ за раз (вставка из буфера, протяжка вправо).
+    headcount — назначить, null — очистить ячейку. Повторы ячейки в запросе:
+    действует последний. Все ячейки пишутся в одной транзакции: назначения —
+    INSERT ... ON CONFLICT (task_id, date) DO UPDATE, очистка — DELETE; и то и другое порциями.
+    """
+    ensure_table()
+    cells = {(cell.task_id, cell.date): cell.headcount for cell in payload.cells}
+    if not cells:
+        return {"set": 0, "cleared": 0}
+
+    task_ids = {task_id for task_id, _ in cells}
+    projects = dict(db.query(Task.id, Task.project_id).filter(Task.id.in_(task_ids)).all())
+    missing = sorted(task_ids - set(projects))
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Задачи не найдены: {', '.join(str(task_id) for task_id in missing)}"
+        )
+
+    now = datetime.utcnow()
+    rows = [
+        {"task_id": task_id, "date": day, "headcount": headcount,
+         "project_id": projects[task_id], "created_at": now, "updated_at": now}
+        for (task_id, day), headcount in cells.items() if headcount is not None
+    ]
+    cleared = [key for key, headcount in cells.items() if headcount is None]
+    try:
+        for start in range(0, len(rows), HEADCOUNT_BULK_CHUNK):
+            _upsert_rows(db, rows[start:start + HEADCOUNT_BULK_CHUNK])
+        for start in range(0, len(cleared), HEADCOUNT_BULK_CHUNK):
+            db.query(DailyHeadcount).filter(
+                tuple_(DailyHeadcount.task_id, DailyHeadcount.date).in_(
+                    cleared[start:start + HEADCOUNT_BULK_CHUNK]
+                )
+            ).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Ошибка массовой записи headcount: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Ошибка БД: {str(e)}")
+
+    result = {"set": len(rows), "cleared": len(cleared)}
+    await manager.broadcast({
+        "type": "headcount_bulk_updated",
+        "event": "monthly_tasks",
+        "data": {**result, "project_ids": sorted({p for p in projects.values() if p is not None})},
+    }, event_type="monthly_tasks")
+    return result
+
+
+def _period_bounds(year: int, month: Optional[int]):
+    """Границы месяца или (month не задан) всего года."""
+    if month is None:
+        return date(int(year), 1, 1), date(int(year), 12, 31)
+    try:
+        return periods.month_bounds(int(year), int(month))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный месяц")
+
+
+def _upsert_rows(db: Session, rows: List[dict]):
+    """Одна многострочная вставка с обновлением существующих ячеек."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(DailyHeadcount).values(rows)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(DailyHeadcount).values(rows)
+    else:
+        # Без ON CONFLICT: удаляем старые ячейки и вставляем заново
+        db.query(DailyHeadcount).filter(
+            tuple_(DailyHeadcount.task_id, DailyHeadcount.date).in_(
+                [(row["task_id"], row["date"]) for row in rows]
+            )
+        ).delete(synchronize_session=False)
+        db.execute(DailyHeadcount.__table__.insert(), rows)
+        return
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["task_id", "date"],
+        set_={
+            "headcount": stmt.excluded.headcount,
+            "project_id": stmt.excluded.project_id,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
 @router.delete("/one")
 def delete_headcount_one(
     task_id: int,
@@ -127,17 +277,18 @@ def delete_headcounts_by_month(
         raise HTTPException(status_code=400, detail="year и month обязательны")
     ensure_table()
     try:
+        first_day, last_day = _period_bounds(year, month)
         q = db.query(DailyHeadcount).filter(
-            and_(
-                extract('year', DailyHeadcount.date) == int(year),
-                extract('month', DailyHeadcount.date) == int(month),
-            )
+            DailyHeadcount.date >= first_day,
+            DailyHeadcount.date <= last_day,
         )
         if project_id is not None:
             q = q.filter(DailyHeadcount.project_id == project_id)
         deleted = q.delete(synchronize_session=False)
         db.commit()
         return {"deleted": deleted}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Ошибка удаления headcount: {e}", exc_info=True)
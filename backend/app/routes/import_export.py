@@ -6,11 +6,11 @@ from typing import List, Optional
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment
 from io import BytesIO
-from datetime import date, datetime
-from .. import models, schemas
+from datetime import datetime
+from .. import models, schemas, hierarchy, rollups, periods
 from ..database import get_db
 from ..dependencies import get_current_user
-from .projects import touch_project
+from .projects import touch_project, next_revision
 
 router = APIRouter()
 
@@ -84,6 +84,7 @@ async def import_tasks(
     tasks_updated = 0
     errors = []
 
+    revision = next_revision(project_id, db) or 0
     existing_tasks = {}
     if project_id:
         for task in db.query(models.Task).filter(models.Task.project_id == project_id).all():
@@ -149,6 +150,7 @@ async def import_tasks(
                 task = existing_tasks[code]
                 for key, value in update_data.items():
                     setattr(task, key, value)
+                task.revision = revision
                 tasks_updated += 1
             else:
                 new_task = models.Task(
@@ -156,6 +158,7 @@ async def import_tasks(
                     code=code,
                     volume_fact=0.0,
                     sort_order=(row_num - 1) * 10,
+                    revision=revision,
                     **update_data
                 )
                 db.add(new_task)
@@ -174,6 +177,8 @@ async def import_tasks(
         if task.is_section:
             stack.append({'code': task.code, 'level': task.level})
 
+    hierarchy.rebuild_hierarchy(db, project_id)
+    rollups.recompute_project(db, project_id)
     db.commit()
     touch_project(project_id, db)
 
@@ -193,7 +198,7 @@ def export_tasks(
     query = db.query(models.Task)
     if project_id is not None:
         query = query.filter(models.Task.project_id == project_id)
-    tasks = query.order_by(models.Task.sort_order, models.Task.code).all()
+    tasks = query.order_by(models.Task.sort_order, models.Task.rank, models.Task.code).all()
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -254,43 +259,16 @@ def export_msg(
     db: Session = Depends(get_db)
 ):
     """Экспорт МСГ: только работы выбранного месяца + их родительские секции, без колонок дней"""
-    from calendar import monthrange
-
-    month_start = date(year, month, 1)
-    _, days_in_month = monthrange(year, month)
-    month_end = date(year, month, days_in_month)
-
-    all_tasks = db.query(models.Task).filter(
+    has_tasks = db.query(models.Task.id).filter(
         models.Task.project_id == project_id
-    ).order_by(models.Task.sort_order, models.Task.code).all()
-
-    if not all_tasks:
+    ).first()
+    if not has_tasks:
         raise HTTPException(status_code=404, detail="Задачи не найдены")
 
-    work_ids_in_month = set()
-    for task in all_tasks:
-        if task.is_section:
-            continue
-        s = task.start_date_plan
-        e = task.end_date_plan
-        if task.is_custom and not s and not e:
-            work_ids_in_month.add(task.id)
-            continue
-        if s and e and s <= month_end and e >= month_start:
-            work_ids_in_month.add(task.id)
-
-    section_codes_needed = set()
-    for task in all_tasks:
-        if task.id not in work_ids_in_month:
-            continue
-        parts = str(task.code).split('.')
-        for length in range(1, len(parts)):
-            section_codes_needed.add('.'.join(parts[:length]))
-
-    visible_tasks = [
-        t for t in all_tasks
-        if t.id in work_ids_in_month or (t.is_section and t.code in section_codes_needed)
-    ]
+    month_start, month_end = periods.month_bounds(year, month)
+    visible_tasks = db.query(models.Task).filter(
+        periods.window_condition(db, project_id, month_start, month_end)
+    ).order_by(models.Task.sort_order, models.Task.rank, models.Task.code).all()
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -379,6 +357,7 @@ async def import_msg(
         models.Task.project_id == project_id
     ).all()
     task_map = {task.code: task for task in tasks}
+    revision = next_revision(project_id, db) or 0
 
     tasks_updated = 0
     tasks_skipped = 0
@@ -467,11 +446,13 @@ async def import_msg(
             if sp_access is not None:
                 task.status_access = parse_status(sp_access)
 
+            task.revision = revision
             tasks_updated += 1
 
         except Exception as e:
             errors.append(f"Строка {row_num}: {str(e)}")
 
+    rollups.recompute_project(db, project_id)
     db.commit()
     touch_project(project_id, db)
 
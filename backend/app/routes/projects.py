@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from .. import models, schemas
 from ..database import get_db
@@ -88,3 +88,20 @@ def touch_project(project_id: int, db: Session):
             models.Project.id == project_id
         ).update({"updated_at": datetime.utcnow()})
         db.commit()
+
+
+def next_revision(project_id: Optional[int], db: Session) -> Optional[int]:
+    """
+    Увеличить ревизию объекта и вернуть новое значение.
+
+    Вызывать внутри транзакции изменения, до commit: строка объекта остаётся
+    заблокированной до конца транзакции, поэтому ревизии коммитятся по порядку.
+    """
+    if not project_id:
+        return None
+    db.query(models.Project).filter(
+        models.Project.id == project_id
+    ).update({"revision": models.Project.revision + 1}, synchronize_session=False)
+    return db.query(models.Project.revision).filter(
+        models.Project.id == project_id
+    ).scalar()
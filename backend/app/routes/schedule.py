@@ -1,25 +1,351 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select, func, tuple_, case, and_, or_
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from .. import models, schemas
-from ..database import get_db
+import base64
+import json
+from datetime import date
+from .. import models, schemas, hierarchy, rollups, search, periods
+from ..database import get_db, SessionLocal
 from ..dependencies import get_current_user
 from ..websocket_manager import manager
-from .projects import touch_project
+from .projects import touch_project, next_revision
 
 router = APIRouter()
 
 
-@router.get("/tasks", response_model=List[schemas.Task])
+# Колонки, которые можно запросить через fields=; совпадают с полями schemas.Task
+TASK_FIELDS = tuple(schemas.Task.model_fields)
+# id и ключ порядка нужны клиенту для идентификации строки и для курсора
+TASK_KEY_FIELDS = ("id", "sort_order", "rank")
+MAX_PAGE_SIZE = 5000
+
+# Фильтр графика GET /tasks/query: текстовые столбцы (подстрока без учёта регистра),
+# статусы чек-листа (пустой статус считается 'gray') и поля с подсчётом фасетов
+TEXT_FILTER_FIELDS = ("code", "name", "unit", "executor", "notes")
+CHECKLIST_FIELDS = ("status_people", "status_equipment", "status_mtr", "status_access")
+FACET_FIELDS = ("executor",) + CHECKLIST_FIELDS
+
+# Порядок строк графика: sort_order, внутри одинакового sort_order — rank
+TASK_ORDER = (models.Task.sort_order, models.Task.rank, models.Task.id)
+
+# Алфавит ключей rank; сравнение строк из a–z одинаково в Python, PostgreSQL и SQLite
+RANK_DIGITS = "abcdefghijklmnopqrstuvwxyz"
+RANK_DEFAULT = "n"
+# Длиннее — фоновая перенумерация объекта (см. rebalance_ranks)
+RANK_MAX_LENGTH = 32
+
+
+def _task_query(db: Session, fields: Optional[str]):
+    """
+    SELECT запрошенных колонок задачи. Итоги раздела (rollups.ROLLUP_FIELDS)
+    берутся через LEFT JOIN section_rollups и входят в ответ без fields;
+    у работ они null. fields только сокращает набор колонок.
+    """
+    if not fields:
+        names = list(TASK_FIELDS) + list(rollups.ROLLUP_FIELDS)
+    else:
+        names = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in names if f not in TASK_FIELDS and f not in rollups.ROLLUP_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+        names = [f for f in TASK_KEY_FIELDS if f not in names] + names
+    columns = [
+        getattr(models.Task, name) if name in TASK_FIELDS else getattr(models.SectionRollup, name)
+        for name in names
+    ]
+    query = db.query(*columns).select_from(models.Task)
+    if any(name in rollups.ROLLUP_FIELDS for name in names):
+        query = query.outerjoin(
+            models.SectionRollup, models.SectionRollup.section_id == models.Task.id
+        )
+    return query
+
+
+def _encode_cursor(row) -> str:
+    raw = json.dumps([row.sort_order, row.rank, row.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        sort_order, rank, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(sort_order), str(rank), int(task_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def _month_bounds(month: str):
+    """'2026-03' → (date(2026, 3, 1), date(2026, 3, 31))."""
+    try:
+        year, month_num = (int(part) for part in month.split("-"))
+        return periods.month_bounds(year, month_num)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Некорректный месяц, ожидается ГГГГ-ММ")
+
+
+@router.get("/tasks")
 def get_tasks(
     project_id: Optional[int] = Query(None),
+    fields: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Task)
+    """
+    Список задач в порядке (sort_order, rank, id).
+
+    - fields: колонки через запятую (id и sort_order добавляются всегда);
+      без fields возвращаются все поля задачи и итоги разделов (cost_plan,
+      labor_fact, min_start_date_plan, ...; у работ — null)
+    - limit: размер страницы; с limit ответ — {"items": [...], "next_cursor": "..."}
+    - cursor: next_cursor из предыдущей страницы
+
+    Без limit и cursor возвращается весь список, как раньше.
+    """
+    query = _task_query(db, fields)
     if project_id is not None:
         query = query.filter(models.Task.project_id == project_id)
-    return query.order_by(models.Task.sort_order).all()
+    query = query.order_by(*TASK_ORDER)
+
+    if limit is None and cursor is None:
+        return [row._asdict() for row in query.all()]
+
+    if cursor is not None:
+        query = query.filter(
+            tuple_(*TASK_ORDER) > _decode_cursor(cursor)
+        )
+    page_size = limit or MAX_PAGE_SIZE
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return schemas.TaskPage(
+        items=[row._asdict() for row in rows],
+        next_cursor=_encode_cursor(rows[-1]) if has_more else None,
+    )
+
+
+@router.get("/tasks/changes", response_model=schemas.TaskChanges)
+def get_task_changes(
+    project_id: int = Query(...),
+    since: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Изменения графика объекта после ревизии since.
+
+    Возвращает текущую ревизию, строки, созданные или изменённые после since,
+    и id задач, удалённых после since. Клиент хранит revision и при
+    переподключении запрашивает только разницу.
+    """
+    revision = db.query(models.Project.revision).filter(
+        models.Project.id == project_id
+    ).scalar()
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Объект не найден")
+
+    rows = _task_query(db, fields).filter(
+        models.Task.project_id == project_id,
+        models.Task.revision > since,
+        models.Task.revision <= revision
+    ).order_by(*TASK_ORDER).all()
+
+    deleted = db.query(models.TaskTombstone.task_id).filter(
+        models.TaskTombstone.project_id == project_id,
+        models.TaskTombstone.revision > since,
+        models.TaskTombstone.revision <= revision
+    ).all()
+
+    return {
+        "revision": revision,
+        "tasks": [row._asdict() for row in rows],
+        "deleted": [task_id for (task_id,) in deleted],
+    }
+
+
+@router.get("/tasks/query", response_model=schemas.TaskQueryResult)
+def query_tasks(
+    project_id: int = Query(...),
+    code: Optional[str] = Query(None),
+    name: Optional[str] = Query(None),
+    unit: Optional[str] = Query(None),
+    executor: Optional[str] = Query(None),
+    notes: Optional[str] = Query(None),
+    status_people: Optional[str] = Query(None),
+    status_equipment: Optional[str] = Query(None),
+    status_mtr: Optional[str] = Query(None),
+    status_access: Optional[str] = Query(None),
+    month: Optional[str] = Query(None),
+    overdue: bool = Query(False),
+    completion: Optional[str] = Query(None, pattern="^(done|undone)$"),
+    text: Optional[str] = Query(None),
+    include_sections: bool = Query(True),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Фильтр графика на сервере — та же модель, что у фильтров Schedule/MonthlyOrder.
+
+    - code, name, unit, executor, notes: подстрока в столбце без учёта регистра
+    - status_*: точное значение статуса чек-листа (пустой = 'gray')
+    - month: ГГГГ-ММ — плановые сроки пересекают месяц
+    - overdue: плановое окончание прошло, остаток объёма > 0
+    - completion: done / undone — по остатку объёма
+    - text: подстрока в любом из текстовых столбцов
+
+    Фильтруются только работы; с include_sections в ответ добавляются
+    разделы-предки найденных работ. facets — число работ по каждому значению
+    исполнителя и статусов при всех прочих фильтрах (свой фильтр не учитывается).
+    """
+    Task = models.Task
+    remaining = func.coalesce(Task.volume_plan, 0) - func.coalesce(Task.volume_fact, 0)
+    column_values = {"code": code, "name": name, "unit": unit, "executor": executor, "notes": notes}
+    status_values = {
+        "status_people": status_people, "status_equipment": status_equipment,
+        "status_mtr": status_mtr, "status_access": status_access,
+    }
+
+    conditions = {}
+    for field, value in column_values.items():
+        if value and value.strip():
+            conditions[field] = getattr(Task, field).icontains(value.strip(), autoescape=True)
+    for field, value in status_values.items():
+        if value:
+            conditions[field] = func.coalesce(getattr(Task, field), "gray") == value
+    if month:
+        month_start, month_end = _month_bounds(month)
+        conditions["month"] = periods.plan_overlaps(db, month_start, month_end)
+    if overdue:
+        conditions["overdue"] = and_(Task.end_date_plan < date.today(), remaining > 0)
+    if completion:
+        conditions["completion"] = remaining <= 0 if completion == "done" else remaining > 0
+    if text and text.strip():
+        conditions["text"] = or_(*[
+            getattr(Task, field).icontains(text.strip(), autoescape=True)
+            for field in TEXT_FILTER_FIELDS
+        ])
+
+    works = (Task.project_id == project_id, Task.is_section == False)
+    matched = select(Task.id).where(*works, *conditions.values())
+    matched_count = db.query(func.count()).select_from(matched.subquery()).scalar()
+
+    selected = Task.id.in_(matched)
+    if include_sections:
+        sections = select(models.TaskClosure.ancestor_id).where(
+            models.TaskClosure.descendant_id.in_(matched),
+            models.TaskClosure.depth > 0
+        )
+        selected = or_(selected, Task.id.in_(sections))
+    rows = _task_query(db, fields).filter(selected).order_by(*TASK_ORDER).all()
+
+    facets = {}
+    for field in FACET_FIELDS:
+        column = Task.executor if field == "executor" else func.coalesce(getattr(Task, field), "gray")
+        others = [condition for key, condition in conditions.items() if key != field]
+        counts = db.query(column, func.count()).filter(
+            *works, *others
+        ).group_by(column).order_by(func.count().desc(), column).all()
+        facets[field] = [{"value": value, "count": count} for value, count in counts]
+
+    return {
+        "items": [row._asdict() for row in rows],
+        "matched": matched_count,
+        "facets": facets,
+    }
+
+
+@router.get("/tasks/month")
+def get_month_tasks(
+    project_id: int = Query(...),
+    month: str = Query(...),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Строки месячного графика (МСГ) за ГГГГ-ММ: работы, плановые сроки которых
+    пересекают месяц, ручные строки без дат и разделы-предки этих работ.
+    """
+    month_start, month_end = _month_bounds(month)
+    return [
+        row._asdict() for row in _task_query(db, fields).filter(
+            periods.window_condition(db, project_id, month_start, month_end)
+        ).order_by(*TASK_ORDER).all()
+    ]
+
+
+@router.get("/tasks/search", response_model=List[schemas.TaskSearchHit])
+def search_tasks(
+    q: str = Query(..., min_length=1),
+    project_id: Optional[int] = Query(None),
+    section_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    Поиск задач по словам в названии и примечании.
+
+    Результаты упорядочены по релевантности; snippet — фрагмент текста
+    с найденными словами в <b>…</b>. section_id — искать только внутри раздела.
+    """
+    return search.search_tasks(db, q, project_id=project_id, section_id=section_id, limit=limit)
+
+
+@router.get("/tasks/{task_id}/descendants")
+def get_task_descendants(
+    task_id: int,
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Все подчинённые строки раздела (без самого раздела) в порядке графика."""
+    return [
+        row._asdict() for row in _task_query(db, fields).filter(
+            models.Task.id.in_(hierarchy.descendants_query(db, task_id, include_self=False))
+        ).order_by(*TASK_ORDER).all()
+    ]
+
+
+@router.get("/tasks/{task_id}/ancestors")
+def get_task_ancestors(
+    task_id: int,
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Цепочка родительских разделов задачи — от верхнего уровня к ближайшему."""
+    return [
+        row._asdict() for row in _task_query(db, fields).join(
+            models.TaskClosure, models.TaskClosure.ancestor_id == models.Task.id
+        ).filter(
+            models.TaskClosure.descendant_id == task_id,
+            models.TaskClosure.depth > 0
+        ).order_by(models.TaskClosure.depth.desc()).all()
+    ]
+
+
+@router.get("/sections/rollups", response_model=List[schemas.SectionRollup])
+def get_section_rollups(
+    project_id: int = Query(...),
+    db: Session = Depends(get_db)
+):
+    """Итоги всех разделов объекта: стоимость, трудозатраты, машиночасы, сроки."""
+    return db.query(models.SectionRollup).filter(
+        models.SectionRollup.project_id == project_id
+    ).all()
+
+
+@router.get("/sections/counts")
+def get_section_counts(
+    project_id: int = Query(...),
+    db: Session = Depends(get_db)
+):
+    """Число подчинённых строк (всех уровней) в каждом разделе объекта."""
+    return [
+        {"id": section_id, "descendants": count}
+        for section_id, count in hierarchy.subtree_counts(db, project_id)
+    ]
 
 
 # ВАЖНО: /tasks/custom и /tasks/custom/all стоят ДО /tasks/{task_id}
@@ -27,6 +353,7 @@ def get_tasks(
 @router.post("/tasks/custom", response_model=schemas.Task)
 async def create_custom_task(
     body: schemas.CustomTaskCreate,
+    background_tasks: BackgroundTasks,
     project_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
@@ -45,24 +372,26 @@ async def create_custom_task(
         new_number += 1
         new_code = f"С-{new_number}"
 
+    # Ревизия берётся до расчёта позиции: блокировка объекта упорядочивает
+    # конкурентные вставки и фоновую перенумерацию
+    revision = next_revision(project_id, db) or 0
+
+    position = None
     if body.insert_before_task_id:
         anchor = db.query(models.Task).filter(
             models.Task.id == body.insert_before_task_id
         ).first()
         if anchor:
-            new_sort_order = _insert_before(db, project_id, anchor.sort_order)
-        else:
-            new_sort_order = _next_sort_order(db, project_id)
+            position = _insert_before(db, project_id, anchor, revision)
     elif body.insert_after_task_id:
         anchor = db.query(models.Task).filter(
             models.Task.id == body.insert_after_task_id
         ).first()
         if anchor:
-            new_sort_order = _insert_after(db, project_id, anchor.sort_order)
-        else:
-            new_sort_order = _next_sort_order(db, project_id)
-    else:
-        new_sort_order = _next_sort_order(db, project_id)
+            position = _insert_after(db, project_id, anchor, revision)
+    if position is None:
+        position = (_next_sort_order(db, project_id), RANK_DEFAULT, [])
+    new_sort_order, new_rank, respread = position
 
     db_task = models.Task(
         project_id=project_id,
@@ -81,17 +410,30 @@ async def create_custom_task(
         is_section=False,
         is_custom=True,
         sort_order=new_sort_order,
+        rank=new_rank,
+        revision=revision,
     )
     db.add(db_task)
+    db.flush()
+    hierarchy.link_task(db, db_task)
+    rollups.task_added(db, db_task)
     db.commit()
     db.refresh(db_task)
     touch_project(project_id, db)
+    if len(new_rank) > RANK_MAX_LENGTH:
+        background_tasks.add_task(rebalance_ranks, project_id)
 
     await manager.broadcast(
         {"type": "task_created", "event": "tasks",
          "data": {"id": db_task.id, "project_id": project_id, "is_custom": True}},
         event_type="tasks"
     )
+    if respread:
+        await manager.broadcast(
+            {"type": "tasks_moved", "event": "tasks",
+             "data": {"project_id": project_id, "revision": revision, "ids": respread}},
+            event_type="tasks"
+        )
     return db_task
 
 
@@ -112,7 +454,11 @@ async def delete_all_custom_tasks(
         db.query(models.DailyWork).filter(
             models.DailyWork.task_id.in_(ids)
         ).update({"task_id": None}, synchronize_session=False)
+        hierarchy.unlink_tasks(db, ids)
+        _add_tombstones(db, project_id, ids)
     query.delete(synchronize_session=False)
+    if ids:
+        rollups.recompute_project(db, project_id)
     db.commit()
     touch_project(project_id, db)
     await manager.broadcast(
@@ -142,7 +488,13 @@ async def create_task(
         task_data['sort_order'] = _next_sort_order(db, project_id)
 
     db_task = models.Task(**task_data, project_id=project_id)
+    db_task.revision = next_revision(project_id, db) or 0
     db.add(db_task)
+    db.flush()
+    if hierarchy.creates_cycle(db, db_task):
+        raise HTTPException(status_code=400, detail="Нельзя переместить раздел внутрь самого себя")
+    hierarchy.link_task(db, db_task)
+    rollups.task_added(db, db_task)
     db.commit()
     db.refresh(db_task)
     touch_project(project_id, db)
@@ -155,6 +507,79 @@ async def create_task(
     return db_task
 
 
+@router.patch("/tasks/batch", response_model=schemas.TaskBatchResult)
+async def batch_update_tasks(
+    body: schemas.TaskBatchUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Пакетное изменение задач (вставка из Excel, правка нескольких ячеек).
+
+    Все изменения применяются одной транзакцией; задачи загружаются одним
+    запросом. Несуществующие id возвращаются в results с ошибкой, остальные
+    применяются. По итогу — одно сообщение tasks_batch_updated со списком
+    изменённых полей.
+    """
+    ids = {item.id for item in body.items}
+    tasks = {
+        t.id: t for t in db.query(models.Task).filter(models.Task.id.in_(ids)).all()
+    }
+
+    results = []
+    changed = {}
+    before = {}
+    for item in body.items:
+        db_task = tasks.get(item.id)
+        if not db_task:
+            results.append({"id": item.id, "ok": False, "error": "Задача не найдена"})
+            continue
+        changes = item.changes.dict(exclude_unset=True)
+        if item.id not in before:
+            before[item.id] = rollups.snapshot(db_task)
+        for key, value in changes.items():
+            setattr(db_task, key, value)
+        changed.setdefault(item.id, {}).update(changes)
+        results.append({"id": item.id, "ok": True})
+
+    project_ids = {tasks[task_id].project_id for task_id in changed}
+    try:
+        db.flush()
+        _sync_hierarchy(db, [(tasks[task_id], changes) for task_id, changes in changed.items()], before)
+        # Одна ревизия на каждый затронутый объект
+        revisions = {pid: next_revision(pid, db) for pid in project_ids}
+        for task_id in changed:
+            db_task = tasks[task_id]
+            db_task.revision = revisions[db_task.project_id] or db_task.revision
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Изменения нарушают уникальность кода задачи")
+    for project_id in project_ids:
+        touch_project(project_id, db)
+
+    if changed:
+        await manager.broadcast(
+            {
+                "type": "tasks_batch_updated",
+                "event": "tasks",
+                "data": {
+                    "items": [
+                        {
+                            "id": task_id,
+                            "project_id": tasks[task_id].project_id,
+                            "revision": tasks[task_id].revision,
+                            "changes": jsonable_encoder(changes),
+                        }
+                        for task_id, changes in changed.items()
+                    ]
+                }
+            },
+            event_type="tasks"
+        )
+    return {"updated": len(changed), "results": results}
+
+
 @router.put("/tasks/{task_id}", response_model=schemas.Task)
 async def update_task(
     task_id: int,
@@ -166,8 +591,12 @@ async def update_task(
     if not db_task:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    for key, value in task.dict(exclude_unset=True).items():
+    changes = task.dict(exclude_unset=True)
+    before = {db_task.id: rollups.snapshot(db_task)}
+    for key, value in changes.items():
         setattr(db_task, key, value)
+    _sync_hierarchy(db, [(db_task, changes)], before)
+    db_task.revision = next_revision(db_task.project_id, db) or db_task.revision
     db.commit()
     db.refresh(db_task)
     touch_project(db_task.project_id, db)
@@ -203,6 +632,7 @@ async def update_task(
                 "notes": db_task.notes,
                 "level": db_task.level,
                 "parent_code": db_task.parent_code,
+                "revision": db_task.revision,
             }
         },
         event_type="tasks"
@@ -210,6 +640,108 @@ async def update_task(
     return db_task
 
 
+@router.post("/tasks/{task_id}/move", response_model=schemas.TaskMoveResult)
+async def move_task(
+    task_id: int,
+    body: schemas.TaskMove,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Переместить задачу (раздел — вместе со всеми подчинёнными строками)
+    перед before_task_id или после after_task_id.
+
+    Блок получает новые ключи порядка одним UPDATE, относительный порядок
+    строк внутри блока сохраняется. Если передан parent_code — задача
+    переносится в другой раздел, level поддерева пересчитывается.
+    """
+    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    if not db_task:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    anchor_id = body.before_task_id or body.after_task_id
+    if not anchor_id:
+        raise HTTPException(status_code=400, detail="Укажите before_task_id или after_task_id")
+    project_id = db_task.project_id
+
+    revision = next_revision(project_id, db) or 0
+
+    anchor = db.query(models.Task).filter(
+        models.Task.id == anchor_id,
+        models.Task.project_id == project_id
+    ).first()
+    if not anchor:
+        raise HTTPException(status_code=404, detail="Задача-ориентир не найдена")
+
+    subtree = db.query(models.Task.id).filter(
+        models.Task.id.in_(hierarchy.descendants_query(db, db_task.id))
+    ).order_by(*TASK_ORDER).all()
+    subtree_ids = [row.id for row in subtree]
+    if anchor.id in subtree_ids:
+        raise HTTPException(status_code=400, detail="Нельзя переместить раздел внутрь самого себя")
+
+    values = {"revision": revision}
+    if "parent_code" in body.model_fields_set:
+        parent = None
+        if body.parent_code is not None:
+            parent = db.query(models.Task).filter(
+                models.Task.project_id == project_id,
+                models.Task.code == body.parent_code
+            ).first()
+            if not parent:
+                raise HTTPException(status_code=404, detail="Родительский раздел не найден")
+            if parent.id in subtree_ids:
+                raise HTTPException(status_code=400, detail="Нельзя переместить раздел внутрь самого себя")
+        level_delta = (parent.level + 1 if parent else 0) - (db_task.level or 0)
+        values["parent_code"] = case(
+            (models.Task.id == db_task.id, body.parent_code),
+            else_=models.Task.parent_code
+        )
+        values["level"] = models.Task.level + level_delta
+
+    if body.before_task_id:
+        prev = _neighbor(db, anchor, before=True, exclude_ids=subtree_ids)
+        next_task = anchor
+    else:
+        prev = anchor
+        next_task = _neighbor(db, anchor, before=False, exclude_ids=subtree_ids)
+    sort_order, ranks, respread = _positions_between(db, project_id, prev, next_task, revision, len(subtree))
+
+    values["sort_order"] = sort_order
+    values["rank"] = case(
+        {row.id: rank for row, rank in zip(subtree, ranks)},
+        value=models.Task.id
+    )
+    db.query(models.Task).filter(
+        models.Task.id.in_(subtree_ids)
+    ).update(values, synchronize_session=False)
+    if "parent_code" in values:
+        old_sections = rollups.ancestor_section_ids(db, [db_task.id])
+        db.refresh(db_task)
+        hierarchy.relink_task(db, db_task)
+        rollups.recompute_sections(db, old_sections | rollups.ancestor_section_ids(db, [db_task.id]))
+    db.commit()
+    touch_project(project_id, db)
+    if max(len(rank) for rank in ranks) > RANK_MAX_LENGTH:
+        background_tasks.add_task(rebalance_ranks, project_id)
+
+    moved = db.query(
+        models.Task.id, models.Task.sort_order, models.Task.rank,
+        models.Task.parent_code, models.Task.level
+    ).filter(models.Task.id.in_(subtree_ids)).order_by(*TASK_ORDER).all()
+
+    await manager.broadcast(
+        {"type": "tasks_moved", "event": "tasks",
+         "data": {"project_id": project_id, "revision": revision, "ids": subtree_ids + [i for i in respread if i not in subtree_ids]}},
+        event_type="tasks"
+    )
+    return {
+        "moved": len(moved),
+        "revision": revision,
+        "tasks": [row._asdict() for row in moved],
+    }
+
+
 @router.delete("/tasks/{task_id}")
 async def delete_task(
     task_id: int,
@@ -224,7 +756,12 @@ async def delete_task(
     db.query(models.DailyWork).filter(
         models.DailyWork.task_id == task_id
     ).update({"task_id": None}, synchronize_session=False)
+    sections = rollups.ancestor_section_ids(db, [task_id])
+    hierarchy.unlink_tasks(db, [task_id])
+    _add_tombstones(db, project_id, [task_id])
     db.delete(db_task)
+    # Итоги разделов, в которые входила строка; строка итогов самого раздела удаляется
+    rollups.recompute_sections(db, sections)
     db.commit()
     touch_project(project_id, db)
     await manager.broadcast(
@@ -254,6 +791,14 @@ async def delete_all_tasks(
         db.query(models.MonthlyTask).filter(
             models.MonthlyTask.task_id.in_(task_ids)
         ).delete(synchronize_session=False)
+        # Удаляется весь объект — связи иерархии чистим одним запросом
+        db.query(models.TaskClosure).filter(
+            models.TaskClosure.descendant_id.in_(task_ids)
+        ).delete(synchronize_session=False)
+        db.query(models.SectionRollup).filter(
+            models.SectionRollup.section_id.in_(task_ids)
+        ).delete(synchronize_session=False)
+        _add_tombstones(db, project_id, task_ids)
     count = query.delete(synchronize_session=False)
     db.commit()
     touch_project(project_id, db)
@@ -264,6 +809,46 @@ async def delete_all_tasks(
     return {"message": f"Удалено {count} задач"}
 
 
+def _add_tombstones(db: Session, project_id: Optional[int], task_ids: List[int]):
+    """Записать удаление задач в ленту изменений объекта (одна ревизия на операцию)."""
+    revision = next_revision(project_id, db)
+    if revision is None:
+        return
+    db.bulk_insert_mappings(models.TaskTombstone, [
+        {"project_id": project_id, "task_id": task_id, "revision": revision}
+        for task_id in task_ids
+    ])
+
+
+def _sync_hierarchy(db: Session, changed, before):
+    """
+    Обновить task_closure и итоги разделов после правки задач.
+    changed — [(task, changes), ...], before — {task_id: rollups.snapshot} до правки.
+    Смена code/parent_code перевешивает только затронутые поддеревья, итоги
+    пересчитываются у старых и новых предков — без пересборки всего объекта.
+    Правка, после которой раздел оказывается внутри самого себя, — 400, как в move_task.
+    """
+    structural = [task for task, changes in changed if {"code", "parent_code"} & changes.keys()]
+    if structural:
+        db.flush()
+        if any(hierarchy.creates_cycle(db, task) for task in structural):
+            raise HTTPException(status_code=400, detail="Нельзя переместить раздел внутрь самого себя")
+    for task, changes in changed:
+        if not rollups.STRUCTURE_FIELDS & changes.keys():
+            rollups.apply_delta(db, task, before[task.id])
+            continue
+        # Смена кода меняет родителя у строк, ссылающихся на старый и новый код
+        dependents = hierarchy.code_dependents(db, task) if "code" in changes else []
+        affected = [task.id] + [dependent.id for dependent in dependents]
+        sections = rollups.ancestor_section_ids(db, affected)
+        if "parent_code" in changes:
+            hierarchy.relink_task(db, task)
+        for dependent in dependents:
+            hierarchy.relink_task(db, dependent)
+        sections |= rollups.ancestor_section_ids(db, affected)
+        rollups.recompute_sections(db, sections)
+
+
 def _next_sort_order(db: Session, project_id: Optional[int]) -> int:
     max_order = db.query(func.max(models.Task.sort_order)).filter(
         models.Task.project_id == project_id
@@ -271,54 +856,152 @@ def _next_sort_order(db: Session, project_id: Optional[int]) -> int:
     return (max_order or 0) + 10
 
 
-def _renumber(db: Session, project_id: Optional[int]):
-    tasks = db.query(models.Task).filter(
-        models.Task.project_id == project_id
-    ).order_by(models.Task.sort_order).all()
-    for i, t in enumerate(tasks):
-        t.sort_order = (i + 1) * 10
-    db.flush()
-
-
-def _insert_before(db: Session, project_id: Optional[int], anchor_sort_order: int) -> int:
-    prev = db.query(models.Task).filter(
-        models.Task.project_id == project_id,
-        models.Task.sort_order < anchor_sort_order
-    ).order_by(models.Task.sort_order.desc()).first()
-
-    prev_order = prev.sort_order if prev else 0
-    gap = anchor_sort_order - prev_order
-
-    if gap > 1:
-        return prev_order + gap // 2
+def _rank_between(lo: str, hi: Optional[str]) -> str:
+    """
+    Ключ строго между lo и hi (hi=None — без верхней границы).
+    Ключ никогда не оканчивается на 'a', поэтому место есть между любыми двумя ключами.
+    """
+    if hi is not None and lo >= hi:
+        raise ValueError(f"rank: '{lo}' >= '{hi}'")
+    result = []
+    i = 0
+    while True:
+        lo_d = RANK_DIGITS.index(lo[i]) if i < len(lo) else 0
+        hi_d = RANK_DIGITS.index(hi[i]) if hi is not None and i < len(hi) else len(RANK_DIGITS)
+        if hi_d - lo_d > 1:
+            result.append(RANK_DIGITS[(lo_d + hi_d) // 2])
+            return "".join(result)
+        result.append(RANK_DIGITS[lo_d])
+        if hi_d > lo_d:
+            # Префикс уже меньше hi — дальше верхней границы нет
+            hi = None
+        i += 1
+
+
+def _neighbor(db: Session, anchor: models.Task, before: bool,
+              exclude_ids: Optional[List[int]] = None) -> Optional[models.Task]:
+    """Соседняя строка графика (предыдущая или следующая) в порядке TASK_ORDER."""
+    key = tuple_(*TASK_ORDER)
+    anchor_key = (anchor.sort_order, anchor.rank, anchor.id)
+    query = db.query(models.Task).filter(models.Task.project_id == anchor.project_id)
+    if exclude_ids:
+        query = query.filter(~models.Task.id.in_(exclude_ids))
+    if before:
+        query = query.filter(key < anchor_key).order_by(*[c.desc() for c in TASK_ORDER])
     else:
-        _renumber(db, project_id)
-        anchor_new = db.query(models.Task).filter(
-            models.Task.project_id == project_id,
-            models.Task.sort_order >= anchor_sort_order
-        ).order_by(models.Task.sort_order).first()
-        if anchor_new:
-            return _insert_before(db, project_id, anchor_new.sort_order)
-        return _next_sort_order(db, project_id)
-
-
-def _insert_after(db: Session, project_id: Optional[int], anchor_sort_order: int) -> int:
-    next_task = db.query(models.Task).filter(
+        query = query.filter(key > anchor_key).order_by(*TASK_ORDER)
+    return query.first()
+
+
+def _ranks_between(lo: str, hi: Optional[str], count: int) -> List[str]:
+    """count возрастающих ключей между lo и hi; делим пополам, чтобы ключи оставались короткими."""
+    if count == 0:
+        return []
+    mid = _rank_between(lo, hi)
+    left = (count - 1) // 2
+    return _ranks_between(lo, mid, left) + [mid] + _ranks_between(mid, hi, count - 1 - left)
+
+
+def _spread_ranks(db: Session, project_id: Optional[int], sort_order: int,
+                  revision: Optional[int]) -> List[int]:
+    """
+    Развести совпадающие ранги внутри группы sort_order (старые данные).
+    Первая строка каждой серии дублей сохраняет ключ, остальные получают ключи
+    до следующего ранга группы; прочие строки не меняются. Изменённые строки
+    получают ревизию revision — их id возвращаются для рассылки tasks_moved.
+    """
+    group = db.query(models.Task).filter(
         models.Task.project_id == project_id,
-        models.Task.sort_order > anchor_sort_order
-    ).order_by(models.Task.sort_order).first()
+        models.Task.sort_order == sort_order
+    ).order_by(models.Task.rank, models.Task.id).all()
+    touched = []
+    start = 0
+    while start < len(group):
+        end = start
+        while end + 1 < len(group) and group[end + 1].rank == group[start].rank:
+            end += 1
+        if end > start:
+            hi = group[end + 1].rank if end + 1 < len(group) else None
+            for t, rank in zip(group[start + 1:end + 1], _ranks_between(group[start].rank, hi, end - start)):
+                t.rank = rank
+                t.revision = revision or t.revision
+                touched.append(t.id)
+        start = end + 1
+    db.flush()
+    return touched
+
+
+def _positions_between(db: Session, project_id: Optional[int],
+                       prev: Optional[models.Task], next_task: Optional[models.Task],
+                       revision: Optional[int], count: int = 1):
+    """
+    (sort_order, [rank, ...], [id, ...]) для count новых строк подряд между prev и next_task.
+    Меняются только сами строки; соседей трогаем лишь при совпадающих ключах —
+    их id в третьем элементе, ревизия у них уже revision.
+    """
+    if next_task is None:
+        return (prev.sort_order if prev else 0) + 10, _ranks_between("", None, count), []
+    if prev is None:
+        return next_task.sort_order, _ranks_between("", next_task.rank, count), []
+
+    gap = next_task.sort_order - prev.sort_order
+    if gap > 1:
+        return prev.sort_order + gap // 2, _ranks_between("", None, count), []
+    if gap == 1:
+        return prev.sort_order, _ranks_between(prev.rank, None, count), []
+    respread = []
+    if prev.rank >= next_task.rank:
+        respread = _spread_ranks(db, project_id, prev.sort_order, revision)
+    return prev.sort_order, _ranks_between(prev.rank, next_task.rank, count), respread
+
+
+def _insert_before(db: Session, project_id: Optional[int], anchor: models.Task, revision: Optional[int]):
+    sort_order, ranks, respread = _positions_between(
+        db, project_id, _neighbor(db, anchor, before=True), anchor, revision
+    )
+    return sort_order, ranks[0], respread
 
-    next_order = next_task.sort_order if next_task else anchor_sort_order + 20
-    gap = next_order - anchor_sort_order
 
-    if gap > 1:
-        return anchor_sort_order + gap // 2
-    else:
-        _renumber(db, project_id)
-        prev_new = db.query(models.Task).filter(
-            models.Task.project_id == project_id,
-            models.Task.sort_order <= anchor_sort_order
-        ).order_by(models.Task.sort_order.desc()).first()
-        if prev_new:
-            return _insert_after(db, project_id, prev_new.sort_order)
-        return _next_sort_order(db, project_id)
+def _insert_after(db: Session, project_id: Optional[int], anchor: models.Task, revision: Optional[int]):
+    sort_order, ranks, respread = _positions_between(
+        db, project_id, anchor, _neighbor(db, anchor, before=False), revision
+    )
+    return sort_order, ranks[0], respread
+
+
+async def rebalance_ranks(project_id: Optional[int]):
+    """
+    Фоновая перенумерация объекта: sort_order = 10, 20, ..., rank сбрасывается.
+    Запускается только когда ключи rank стали длиннее RANK_MAX_LENGTH.
+    Изменённые строки получают новую ревизию, клиентам уходит tasks_moved —
+    иначе курсоры keyset-пагинации и лента изменений не узнали бы о новом порядке.
+    """
+    db = SessionLocal()
+    try:
+        revision = next_revision(project_id, db)
+        rows = db.query(*TASK_ORDER).filter(
+            models.Task.project_id == project_id
+        ).order_by(*TASK_ORDER).all()
+        changes = [
+            {"id": row.id, "sort_order": (i + 1) * 10, "rank": RANK_DEFAULT}
+            for i, row in enumerate(rows)
+            if (row.sort_order, row.rank) != ((i + 1) * 10, RANK_DEFAULT)
+        ]
+        if not changes:
+            db.rollback()
+            return
+        if revision is not None:
+            for change in changes:
+                change["revision"] = revision
+        db.bulk_update_mappings(models.Task, changes)
+        db.commit()
+        touch_project(project_id, db)
+    finally:
+        db.close()
+
+    await manager.broadcast(
+        {"type": "tasks_moved", "event": "tasks",
+         "data": {"project_id": project_id, "revision": revision,
+                  "ids": [change["id"] for change in changes], "rebalanced": True}},
+        event_type="tasks"
+    )
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional, List
+from datetime import date as date_type
+from typing import Optional, List, Any, Dict
 
 
 # ─── Project ────────────────────────────────────────────────────────────────
@@ -86,9 +87,80 @@ class TaskUpdate(BaseModel):
 class Task(TaskBase):
     id: int
     project_id: Optional[int] = None
+    rank: str = 'n'
+    revision: int = 0
     class Config:
         from_attributes = True
 
+class TaskPage(BaseModel):
+    """Страница списка задач (keyset-пагинация). next_cursor = None — страниц больше нет."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+class TaskChanges(BaseModel):
+    """Изменения графика после ревизии since: изменённые строки и id удалённых."""
+    revision: int
+    tasks: List[Dict[str, Any]]
+    deleted: List[int]
+
+
+# ─── Batch update ───────────────────────────────────────────────────────────
+
+class TaskBatchItem(BaseModel):
+    id: int
+    changes: TaskUpdate
+
+class TaskBatchUpdate(BaseModel):
+    items: List[TaskBatchItem] = Field(..., min_length=1, max_length=5000)
+
+class TaskBatchItemResult(BaseModel):
+    id: int
+    ok: bool
+    error: Optional[str] = None
+
+class TaskBatchResult(BaseModel):
+    updated: int
+    results: List[TaskBatchItemResult]
+
+
+# ─── Move ───────────────────────────────────────────────────────────────────
+
+class TaskMove(BaseModel):
+    """Перемещение задачи вместе с подчинёнными строками.
+    Указывается before_task_id или after_task_id; parent_code — только если нужно
+    сменить родителя (None — на верхний уровень)."""
+    before_task_id: Optional[int] = None
+    after_task_id: Optional[int] = None
+    parent_code: Optional[str] = None
+
+class TaskMoveResult(BaseModel):
+    moved: int
+    revision: int
+    tasks: List[Dict[str, Any]]
+
+
+# ─── Фильтр графика ─────────────────────────────────────────────────────────
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+
+class TaskQueryResult(BaseModel):
+    items: List[Dict[str, Any]]
+    matched: int
+    facets: Dict[str, List[FacetCount]]
+
+
+class TaskSearchHit(BaseModel):
+    id: int
+    project_id: Optional[int] = None
+    code: Optional[str] = None
+    name: str
+    is_section: bool = False
+    score: float = 0
+    snippet: Optional[str] = None
+
 
 # ─── CustomTaskCreate ───────────────────────────────────────────────────────
 
@@ -157,6 +229,14 @@ class DailyWorkBase(BaseModel):
 class DailyWorkCreate(DailyWorkBase):
     pass
 
+class DailyWorkUpdate(BaseModel):
+    task_id: Optional[int] = None
+    # date_type: поле называется так же, как тип
+    date: Optional[date_type] = None
+    volume: Optional[float] = None
+    description: Optional[str] = None
+    brigade_id: Optional[int] = None
+
 class DailyWork(DailyWorkBase):
     id: int
     class Config:
@@ -168,6 +248,44 @@ class DailyWorkWithTask(DailyWork):
     unit: str
 
 
+# ─── Дневной отчёт бригады ──────────────────────────────────────────────────
+
+class DailyReportWork(BaseModel):
+    task_id: int
+    volume: float = Field(..., gt=0)
+    description: Optional[str] = None
+
+class DailyReportAncillaryWork(BaseModel):
+    volume: float = Field(..., gt=0)
+    description: Optional[str] = None
+
+class DailyReportExecutor(BaseModel):
+    employee_id: int = Field(..., gt=0)
+    hours_worked: float = Field(default=10.0, gt=0, le=24)
+    is_responsible: bool = False
+
+class DailyReportEquipment(BaseModel):
+    equipment_id: int = Field(..., gt=0)
+    machine_hours: float = Field(default=8.0, gt=0, le=24)
+
+class DailyReportCreate(BaseModel):
+    brigade_id: int
+    works: List[DailyReportWork] = []
+    ancillary_works: List[DailyReportAncillaryWork] = []
+    executors: List[DailyReportExecutor] = []
+    equipment: List[DailyReportEquipment] = []
+
+class DailyReportResult(BaseModel):
+    brigade_id: int
+    project_id: Optional[int] = None
+    date: date
+    works: int
+    ancillary_works: int
+    executors: int
+    equipment: int
+    tasks: List[Dict[str, Any]]
+
+
 # ─── Analytics ──────────────────────────────────────────────────────────────
 
 class Analytics(BaseModel):
@@ -184,6 +302,22 @@ class Analytics(BaseModel):
     cost_remaining: float
 
 
+class SectionRollup(BaseModel):
+    section_id: int
+    project_id: Optional[int] = None
+    cost_plan: float = 0
+    cost_fact: float = 0
+    labor_plan: float = 0
+    labor_fact: float = 0
+    machine_hours_plan: float = 0
+    machine_hours_fact: float = 0
+    min_start_date_plan: Optional[date] = None
+    max_end_date_plan: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ─── Auth / Users ───────────────────────────────────────────────────────────
 
 class UserBase(BaseModel):
@@ -283,12 +417,30 @@ class DailyExecutorWithEmployee(DailyExecutor):
 
 class DailyExecutorStats(BaseModel):
     date: date
+    brigade_id: Optional[int] = None
     total_hours_worked: float
     total_labor_hours: float
     executors_count: int
     responsible: Optional[Employee] = None
     executors: List[DailyExecutorWithEmployee]
 
+class TimesheetRow(BaseModel):
+    employee_id: int
+    full_name: str
+    position: Optional[str] = None
+    hours: List[Optional[float]]  # hours[0] — 1-е число месяца
+    total: float
+    days_worked: int
+
+class Timesheet(BaseModel):
+    year: int
+    month: int
+    project_id: Optional[int] = None
+    days: int
+    employees: List[TimesheetRow]
+    day_totals: List[float]
+    total: float
+
 
 # ─── Equipment ──────────────────────────────────────────────────────────────
 
@@ -297,6 +449,7 @@ class EquipmentBase(BaseModel):
     model: str = Field(..., min_length=1)
     registration_number: str = Field(..., min_length=1)
     is_active: bool = Field(default=True)
+    service_interval_hours: Optional[float] = Field(default=None, gt=0)
 
 class EquipmentCreate(EquipmentBase):
     pass
@@ -306,15 +459,39 @@ class EquipmentUpdate(BaseModel):
     model: Optional[str] = Field(default=None, min_length=1)
     registration_number: Optional[str] = Field(default=None, min_length=1)
     is_active: Optional[bool] = Field(default=None)
+    service_interval_hours: Optional[float] = Field(default=None, gt=0)
 
 class Equipment(EquipmentBase):
     id: int
+    total_machine_hours: float = 0.0
+    hours_since_service: float = 0.0
+    hours_until_service: Optional[float] = None
+    last_service_date: Optional[date] = None
     created_at: datetime
     updated_at: datetime
     class Config:
         from_attributes = True
 
 
+class EquipmentCalendarRow(BaseModel):
+    equipment_id: int
+    equipment_type: str
+    model: str
+    registration_number: str
+    hours: List[float]  # hours[0] — date_from
+    booked: str         # '1' — техника занята в этот день, '0' — свободна
+    booked_days: int
+    total_hours: float
+    utilization: float
+
+class EquipmentCalendar(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+    project_id: Optional[int] = None
+    equipment: List[EquipmentCalendarRow]
+
+
 # ─── DailyEquipmentUsage ────────────────────────────────────────────────────
 
 class DailyEquipmentUsageBase(BaseModel):
@@ -340,6 +517,7 @@ class DailyEquipmentUsageWithEquipment(DailyEquipmentUsage):
 
 class DailyEquipmentStats(BaseModel):
     date: date
+    brigade_id: Optional[int] = None
     total_machine_hours: float
     total_work_machine_hours: float
     equipment_count: int
@@ -362,6 +540,25 @@ class BrigadeStats(BaseModel):
     ancillary_works: List[dict]
     total_ancillary_hours: float
 
+class BrigadeCloneConflict(BaseModel):
+    brigade: str
+    kind: str
+    name: str
+    reason: str
+
+class BrigadeCloneResult(BaseModel):
+    brigades: List[Brigade]
+    executors: int
+    equipment: int
+    works: int
+    conflicts: List[BrigadeCloneConflict]
+
+class BrigadeDay(BaseModel):
+    date: date
+    project_id: Optional[int] = None
+    brigades: List[BrigadeStats]
+    totals: Dict[str, float]
+
 
 # ─── DailyHeadcount ─────────────────────────────────────────────────────────
 
@@ -371,6 +568,15 @@ class DailyHeadcountUpsert(BaseModel):
     # float позволяет вводить 0.5, 1.5 и т.д. (полчеловека на нескольких работах)
     headcount: float = Field(..., gt=0)
 
+class DailyHeadcountCell(BaseModel):
+    task_id: int
+    date: date
+    # None — очистить ячейку
+    headcount: Optional[float] = Field(default=None, gt=0)
+
+class DailyHeadcountBulk(BaseModel):
+    cells: List[DailyHeadcountCell] = Field(..., max_length=20000)
+
 class DailyHeadcountRead(BaseModel):
     id: int
     task_id: int
@@ -379,3 +585,11 @@ class DailyHeadcountRead(BaseModel):
     project_id: Optional[int] = None
     class Config:
         from_attributes = True
+
+class DailyHeadcountMatrix(BaseModel):
+    year: int
+    month: int
+    days: int
+    task_ids: List[int]
+    # headcount[i][d] — задача task_ids[i], (d+1)-е число месяца
+    headcount: List[List[Optional[float]]]
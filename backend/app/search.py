@@ -0,0 +1,158 @@
+"""
+Полнотекстовый поиск по названиям и примечаниям задач.
+
+PostgreSQL: GIN-индекс по to_tsvector('russian', name + notes) — русская
+морфология, ранжирование ts_rank, подсветка ts_headline; дополнительно
+триграммный индекс по name (pg_trgm) находит строки с опечатками.
+
+SQLite: внешняя FTS5-таблица tasks_fts, синхронизируемая триггерами.
+Русского стеммера в FTS5 нет, поэтому слова запроса ищутся по префиксу
+с отброшенным окончанием. Ранжирование — bm25, подсветка — snippet().
+
+Индексы создаёт migrations/add_task_search.py (create_index). Если в PostgreSQL
+не установлен pg_trgm — полнотекстовый поиск с ts_rank без поиска опечаток,
+дополненный ILIKE. Если в SQLite нет tasks_fts или СУБД другая — поиск
+работает через LIKE, без ранжирования.
+"""
+import re
+from sqlalchemy.orm import Session
+from sqlalchemy import text, func, or_, literal, literal_column, table, column
+from typing import Optional
+from . import models, hierarchy
+
+# Выражение должно совпадать с индексом ix_tasks_search, иначе PostgreSQL его не использует
+PG_DOCUMENT = "to_tsvector('russian', coalesce(tasks.name, '') || ' ' || coalesce(tasks.notes, ''))"
+PG_CONFIG = "'russian'"
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<b>", "</b>"
+
+fts = table("tasks_fts", column("rowid"))
+
+
+def create_index(conn):
+    """Создать поисковые индексы для текущей СУБД (повторный вызов безопасен)."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks "
+            "USING GIN (to_tsvector('russian', coalesce(name, '') || ' ' || coalesce(notes, '')))"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_name_trgm ON tasks USING GIN (name gin_trgm_ops)"
+        ))
+    elif dialect == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+            "name, notes, content='tasks', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+            "INSERT INTO tasks_fts(rowid, name, notes) VALUES (new.id, new.name, new.notes); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, name, notes) "
+            "VALUES ('delete', old.id, old.name, old.notes); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF name, notes ON tasks BEGIN "
+            "INSERT INTO tasks_fts(tasks_fts, rowid, name, notes) "
+            "VALUES ('delete', old.id, old.name, old.notes); "
+            "INSERT INTO tasks_fts(rowid, name, notes) VALUES (new.id, new.name, new.notes); END"
+        ))
+        conn.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+    else:
+        return False
+    return True
+
+
+def _fts5_query(query: str) -> str:
+    """Слова запроса → префиксные термы FTS5: «бетонирования плит» → "бетонирован"* "пли"*."""
+    terms = []
+    for word in re.findall(r"\w+", query.lower()):
+        stem = word[:max(3, len(word) - 2)] if len(word) > 4 else word
+        terms.append(f'"{stem}"*')
+    return " ".join(terms)
+
+
+_pg_trgm = {}
+
+
+def _has_pg_trgm(db: Session) -> bool:
+    """Установлено ли расширение pg_trgm (проверяется один раз на базу)."""
+    url = str(db.get_bind().url)
+    if url not in _pg_trgm:
+        _pg_trgm[url] = db.execute(text(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        )).first() is not None
+    return _pg_trgm[url]
+
+
+def _has_fts5(db: Session) -> bool:
+    return db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+    )).first() is not None
+
+
+def search_tasks(
+    db: Session,
+    query: str,
+    project_id: Optional[int] = None,
+    section_id: Optional[int] = None,
+    limit: int = 50,
+):
+    """
+    Найти задачи по словам в name/notes. section_id ограничивает поиск поддеревом раздела.
+    Возвращает [{id, project_id, code, name, is_section, score, snippet}, ...] по убыванию score.
+    """
+    Task = models.Task
+    dialect = db.get_bind().dialect.name
+    columns = (Task.id, Task.project_id, Task.code, Task.name, Task.is_section)
+
+    if dialect == "postgresql":
+        document = literal_column(PG_DOCUMENT)
+        tsquery = func.websearch_to_tsquery(literal_column(PG_CONFIG), query)
+        snippet = func.ts_headline(
+            literal_column(PG_CONFIG),
+            func.coalesce(Task.name, "") + " — " + func.coalesce(Task.notes, ""),
+            tsquery,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2",
+        )
+        if _has_pg_trgm(db):
+            score = func.ts_rank(document, tsquery) + func.similarity(Task.name, query)
+            fuzzy = Task.name.op("%")(query)
+        else:
+            # Без pg_trgm опечатки не ищутся — подстрока через ILIKE
+            score = func.ts_rank(document, tsquery)
+            fuzzy = Task.name.icontains(query.strip(), autoescape=True)
+        q = db.query(*columns, score.label("score"), snippet.label("snippet")).filter(
+            or_(document.op("@@")(tsquery), fuzzy)
+        )
+    elif dialect == "sqlite" and _has_fts5(db):
+        terms = _fts5_query(query)
+        if not terms:
+            return []
+        fts_table = literal_column("tasks_fts")
+        q = db.query(
+            *columns,
+            (-func.bm25(fts_table)).label("score"),
+            func.snippet(fts_table, -1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", 12).label("snippet"),
+        ).select_from(Task).join(fts, fts.c.rowid == Task.id).filter(
+            fts_table.op("MATCH")(terms)
+        )
+    else:
+        pattern = query.strip()
+        q = db.query(*columns, literal(0.0).label("score"), literal(None).label("snippet")).filter(
+            or_(
+                Task.name.icontains(pattern, autoescape=True),
+                Task.notes.icontains(pattern, autoescape=True),
+            )
+        )
+
+    if project_id is not None:
+        q = q.filter(Task.project_id == project_id)
+    if section_id is not None:
+        q = q.filter(Task.id.in_(hierarchy.descendants_query(db, section_id)))
+    rows = q.order_by(literal_column("score").desc(), Task.id).limit(limit).all()
+    return [row._asdict() for row in rows]
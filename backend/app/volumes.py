@@ -0,0 +1,103 @@
+"""
+Сверка Task.volume_fact с журналом выполненных работ (daily_works).
+
+Обычно volume_fact меняется на разницу при каждой записи (routes/daily.py).
+Сверка нужна после ручных правок БД, сбоев и старых данных: правильный факт
+считается одним сгруппированным запросом на порцию задач объекта,
+записываются только расхождения. Каждая порция — отдельная короткая
+транзакция, поэтому длинных блокировок на большой базе нет.
+
+Сопутствующие работы (is_ancillary) в факт не входят — как и при вводе.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_
+from typing import Optional
+from . import models, rollups
+from .routes.projects import next_revision
+
+RECONCILE_CHUNK = 5000
+# Расхождения меньше — погрешность float, не ошибка
+VOLUME_EPSILON = 1e-9
+
+
+def _totals(db: Session, project_id: Optional[int]):
+    """Задачи объекта с фактическими суммами по журналу (без сопутствующих работ)."""
+    Task, DailyWork = models.Task, models.DailyWork
+    return db.query(
+        Task.id, Task.code, Task.name, Task.volume_fact,
+        func.coalesce(func.sum(DailyWork.volume), 0).label("total")
+    ).outerjoin(
+        DailyWork, and_(DailyWork.task_id == Task.id, DailyWork.is_ancillary == False)
+    ).filter(
+        Task.project_id == project_id
+    ).group_by(Task.id, Task.code, Task.name, Task.volume_fact)
+
+
+def _differs(row) -> bool:
+    return row.volume_fact is None or abs(row.volume_fact - row.total) > VOLUME_EPSILON
+
+
+def reconcile_project(db: Session, project_id: Optional[int], dry_run: bool = False,
+                      chunk_size: int = RECONCILE_CHUNK):
+    """
+    Сверить факт по всем задачам объекта.
+    dry_run — только вернуть расхождения, ничего не записывая.
+    Возвращает (число проверенных задач, [{id, code, name, old_fact, new_fact}, ...]).
+    """
+    checked = 0
+    diffs = []
+    after_id = 0
+    while True:
+        rows = _totals(db, project_id).filter(
+            models.Task.id > after_id
+        ).order_by(models.Task.id).limit(chunk_size).all()
+        if not rows:
+            break
+        checked += len(rows)
+        after_id = rows[-1].id
+        stale = [row for row in rows if _differs(row)]
+        if stale and not dry_run:
+            # Ввод работ блокирует объект через ревизию; под той же блокировкой
+            # перепроверяем расхождения, чтобы не затереть параллельную запись
+            revision = next_revision(project_id, db)
+            stale = [
+                row for row in _totals(db, project_id).filter(
+                    models.Task.id.in_([row.id for row in stale])
+                ).all()
+                if _differs(row)
+            ]
+            db.bulk_update_mappings(models.Task, [
+                {"id": row.id, "volume_fact": row.total,
+                 **({"revision": revision} if revision is not None else {})}
+                for row in stale
+            ])
+            db.commit()
+        diffs.extend(
+            {"id": row.id, "code": row.code, "name": row.name,
+             "old_fact": row.volume_fact, "new_fact": row.total}
+            for row in stale
+        )
+        if len(rows) < chunk_size:
+            break
+
+    if diffs and not dry_run:
+        # Итоги разделов после массовой правки проще пересчитать целиком
+        rollups.recompute_project(db, project_id)
+        db.commit()
+    return checked, diffs
+
+
+def reconcile_volume_facts(db: Session, project_id: Optional[int] = None, dry_run: bool = False,
+                           all_projects: bool = False, chunk_size: int = RECONCILE_CHUNK):
+    """Сверка одного объекта или (all_projects=True) всех объектов по очереди."""
+    if all_projects:
+        project_ids = [pid for (pid,) in db.query(models.Task.project_id).distinct().all()]
+    else:
+        project_ids = [project_id]
+    checked = 0
+    diffs = []
+    for pid in project_ids:
+        project_checked, project_diffs = reconcile_project(db, pid, dry_run=dry_run, chunk_size=chunk_size)
+        checked += project_checked
+        diffs.extend(project_diffs)
+    return checked, diffs
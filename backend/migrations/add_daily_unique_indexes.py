@@ -0,0 +1,66 @@
+"""
+Миграция: уникальные индексы исполнителей и техники за день
+
+Что делает:
+1. uq_daily_executors_employee — сотрудник один раз в бригаде на дату
+2. uq_daily_executors_responsible — один ответственный на бригаду и дату
+3. uq_daily_equipment_usage_date_equipment — единица техники один раз на дату
+
+Раньше эти правила проверялись SELECT-ами перед вставкой, и параллельные
+запросы могли их обойти. Если в базе уже есть повторы, индекс не создаётся —
+миграция выводит повторы, их нужно удалить вручную и запустить её снова.
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_daily_unique_indexes.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+INDEXES = (
+    (
+        "uq_daily_executors_employee",
+        "daily_executors (date, coalesce(brigade_id, 0), employee_id)",
+        "SELECT date, brigade_id, employee_id, count(*) FROM daily_executors "
+        "GROUP BY date, coalesce(brigade_id, 0), brigade_id, employee_id HAVING count(*) > 1",
+    ),
+    (
+        "uq_daily_executors_responsible",
+        "daily_executors (date, coalesce(brigade_id, 0)) WHERE is_responsible",
+        "SELECT date, brigade_id, count(*) FROM daily_executors WHERE is_responsible "
+        "GROUP BY date, coalesce(brigade_id, 0), brigade_id HAVING count(*) > 1",
+    ),
+    (
+        "uq_daily_equipment_usage_date_equipment",
+        "daily_equipment_usage (date, equipment_id)",
+        "SELECT date, equipment_id, count(*) FROM daily_equipment_usage "
+        "GROUP BY date, equipment_id HAVING count(*) > 1",
+    ),
+)
+
+def run_migration():
+    failed = False
+    with engine.connect() as conn:
+        for name, definition, duplicates_sql in INDEXES:
+            duplicates = conn.execute(text(duplicates_sql)).fetchall()
+            if duplicates:
+                failed = True
+                print(f"⚠️  {name} не создан — повторяющиеся записи:")
+                for row in duplicates:
+                    print(f"    {tuple(row)}")
+                continue
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {definition};"))
+            print(f"✅ Индекс {name} создан (или уже существует)")
+        conn.commit()
+
+    if failed:
+        print("\n⚠️  Миграция выполнена частично: удалите повторы и запустите её снова")
+    else:
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,29 @@
+"""
+Миграция: индекс daily_works (date)
+
+Нужен для журнала работ за день и за период (GET /daily/works,
+GET /daily/works/details): записи читаются по индексу, а не всей таблицей.
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_daily_works_date_index.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_daily_works_date "
+            "ON daily_works (date);"
+        ))
+        print("✅ Индекс ix_daily_works_date создан (или уже существует)")
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
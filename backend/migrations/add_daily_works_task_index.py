@@ -0,0 +1,30 @@
+"""
+Миграция: индекс daily_works (task_id, is_ancillary)
+
+Нужен для сверки volume_fact (POST /admin/recalculate-volumes): сумма
+выполненных объёмов по задачам считается по индексу, без полного чтения
+журнала. PostgreSQL не создаёт индексы для внешних ключей сам.
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_daily_works_task_index.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_daily_works_task "
+            "ON daily_works (task_id, is_ancillary);"
+        ))
+        print("✅ Индекс ix_daily_works_task создан (или уже существует)")
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,68 @@
+"""
+Миграция: счётчики машиночасов и межсервисный интервал техники
+
+Что делает:
+1. Добавляет в equipment колонки total_machine_hours, hours_since_service,
+   service_interval_hours, last_service_date
+2. Заполняет счётчики по журналу daily_equipment_usage (одним UPDATE)
+3. Создаёт индекс ix_equipment_service_remaining для GET /equipment/due-for-service
+
+Дальше счётчики меняются на разницу при каждой записи использования техники.
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_equipment_meters.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+COLUMNS = (
+    ("total_machine_hours", "FLOAT NOT NULL DEFAULT 0"),
+    ("hours_since_service", "FLOAT NOT NULL DEFAULT 0"),
+    ("service_interval_hours", "FLOAT"),
+    ("last_service_date", "DATE"),
+)
+
+def run_migration():
+    with engine.connect() as conn:
+        # 1. Колонки
+        for name, definition in COLUMNS:
+            try:
+                conn.execute(text(f"ALTER TABLE equipment ADD COLUMN {name} {definition};"))
+                conn.commit()
+                print(f"✅ Колонка equipment.{name} добавлена")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  equipment.{name}: {e} (возможно уже существует)")
+
+        # 2. Начальные значения счётчиков
+        conn.execute(text("""
+            UPDATE equipment SET
+                total_machine_hours = coalesce((
+                    SELECT sum(u.machine_hours) FROM daily_equipment_usage u
+                    WHERE u.equipment_id = equipment.id
+                ), 0),
+                hours_since_service = coalesce((
+                    SELECT sum(u.machine_hours) FROM daily_equipment_usage u
+                    WHERE u.equipment_id = equipment.id
+                      AND (equipment.last_service_date IS NULL OR u.date > equipment.last_service_date)
+                ), 0);
+        """))
+        print("✅ Счётчики машиночасов заполнены по журналу")
+
+        # 3. Индекс остатка до ТО
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_equipment_service_remaining "
+            "ON equipment ((service_interval_hours - hours_since_service));"
+        ))
+        print("✅ Индекс ix_equipment_service_remaining создан (или уже существует)")
+
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
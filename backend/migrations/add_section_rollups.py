@@ -0,0 +1,39 @@
+"""
+Миграция: итоги разделов графика section_rollups
+
+Что делает:
+1. Создаёт таблицу section_rollups
+2. Считает итоги всех разделов каждого объекта
+
+Требует task_closure (migrations/add_task_closure.py).
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_section_rollups.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, SessionLocal, Base
+from app import models
+from app.rollups import recompute_project
+
+def run_migration():
+    Base.metadata.create_all(bind=engine, tables=[models.SectionRollup.__table__], checkfirst=True)
+    print("✅ Таблица section_rollups создана (или уже существует)")
+
+    db = SessionLocal()
+    try:
+        project_ids = [pid for (pid,) in db.query(models.Task.project_id).distinct().all()]
+        for project_id in project_ids:
+            recompute_project(db, project_id)
+            db.commit()
+            print(f"✅ Итоги разделов объекта id={project_id} посчитаны")
+    finally:
+        db.close()
+
+    print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,37 @@
+"""
+Миграция: таблица иерархии задач task_closure (closure table)
+
+Что делает:
+1. Создаёт таблицу task_closure и индекс по (descendant_id, depth)
+2. Заполняет её по parent_code для всех объектов
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_closure.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, SessionLocal, Base
+from app import models
+from app.hierarchy import rebuild_hierarchy
+
+def run_migration():
+    Base.metadata.create_all(bind=engine, tables=[models.TaskClosure.__table__], checkfirst=True)
+    print("✅ Таблица task_closure создана (или уже существует)")
+
+    db = SessionLocal()
+    try:
+        project_ids = [pid for (pid,) in db.query(models.Task.project_id).distinct().all()]
+        for project_id in project_ids:
+            rebuild_hierarchy(db, project_id)
+            db.commit()
+            print(f"✅ Иерархия объекта id={project_id} построена")
+    finally:
+        db.close()
+
+    print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,35 @@
+"""
+Миграция: индексы для серверного фильтра графика GET /schedule/tasks/query
+
+Что делает:
+1. Индекс (project_id, executor) — фильтр и фасет по исполнителю
+2. Индекс (project_id, end_date_plan) — пресет «просрочено»
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_filter_indexes.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_executor "
+            "ON tasks (project_id, executor);"
+        ))
+        print("✅ Индекс ix_tasks_project_executor создан (или уже существует)")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_end_plan "
+            "ON tasks (project_id, end_date_plan);"
+        ))
+        print("✅ Индекс ix_tasks_project_end_plan создан (или уже существует)")
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
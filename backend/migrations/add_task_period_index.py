@@ -0,0 +1,43 @@
+"""
+Миграция: индексы для выборки «работы, активные в периоде» (app/periods.py)
+
+Что делает:
+1. B-tree индекс (project_id, start_date_plan, end_date_plan) — для всех СУБД
+2. PostgreSQL: расширение btree_gist и GiST-индекс
+   (project_id, daterange(least(start, end), greatest(start, end), '[]'))
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_period_index.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_plan_dates "
+            "ON tasks (project_id, start_date_plan, end_date_plan);"
+        ))
+        print("✅ Индекс ix_tasks_project_plan_dates создан (или уже существует)")
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist;"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_tasks_plan_period ON tasks USING GIST ("
+                "project_id, daterange(least(start_date_plan, end_date_plan), "
+                "greatest(start_date_plan, end_date_plan), '[]'));"
+            ))
+            print("✅ GiST-индекс ix_tasks_plan_period создан (или уже существует)")
+        else:
+            print(f"⚠️  {conn.dialect.name}: GiST недоступен, используется B-tree индекс")
+
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,41 @@
+"""
+Миграция: дробный ключ порядка tasks.rank
+
+Что делает:
+1. Добавляет tasks.rank ('n' для существующих строк — порядок не меняется)
+2. Пересоздаёт индекс ix_tasks_project_sort по (project_id, sort_order, rank, id)
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_ranks.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        # 1. Колонка rank
+        try:
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN rank VARCHAR NOT NULL DEFAULT 'n';"))
+            conn.commit()
+            print("✅ Колонка rank добавлена в tasks")
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  tasks.rank: {e} (возможно уже существует)")
+
+        # 2. Индекс порядка строк
+        conn.execute(text("DROP INDEX IF EXISTS ix_tasks_project_sort;"))
+        conn.execute(text(
+            "CREATE INDEX ix_tasks_project_sort ON tasks (project_id, sort_order, rank, id);"
+        ))
+        print("✅ Индекс ix_tasks_project_sort пересоздан с rank")
+
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
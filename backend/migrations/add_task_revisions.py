@@ -0,0 +1,61 @@
+"""
+Миграция: ревизии графика для ленты изменений GET /schedule/tasks/changes
+
+Что делает:
+1. Добавляет projects.revision и tasks.revision (0 для существующих строк)
+2. Создаёт таблицу task_tombstones — отметки об удалённых задачах
+3. Создаёт индексы (project_id, revision)
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_revisions.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        # 1. Колонки revision
+        for table in ("projects", "tasks"):
+            try:
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;"
+                ))
+                conn.commit()
+                print(f"✅ Колонка revision добавлена в {table}")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  {table}.revision: {e} (возможно уже существует)")
+
+        # 2. Таблица task_tombstones
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS task_tombstones (
+                id SERIAL PRIMARY KEY,
+                project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+                task_id INTEGER NOT NULL,
+                revision INTEGER NOT NULL,
+                deleted_at TIMESTAMP DEFAULT NOW()
+            );
+        """))
+        print("✅ Таблица task_tombstones создана (или уже существует)")
+
+        # 3. Индексы
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_revision ON tasks (project_id, revision);"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_task_tombstones_project_revision "
+            "ON task_tombstones (project_id, revision);"
+        ))
+        print("✅ Индексы по (project_id, revision) созданы")
+
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+        print("ℹ️  Клиенты с since=0 получат весь график один раз, дальше — только изменения")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,30 @@
+"""
+Миграция: полнотекстовый поиск по задачам (GET /schedule/tasks/search)
+
+Что делает:
+- PostgreSQL: расширение pg_trgm, GIN-индекс по to_tsvector('russian', name + notes)
+  и триграммный GIN-индекс по name
+- SQLite: FTS5-таблица tasks_fts, триггеры синхронизации и первичное заполнение
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_search.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.search import create_index
+
+def run_migration():
+    with engine.connect() as conn:
+        if create_index(conn):
+            conn.commit()
+            print(f"✅ Поисковые индексы созданы ({conn.dialect.name})")
+        else:
+            print(f"⚠️  {conn.dialect.name}: полнотекстовый индекс не поддерживается, поиск будет работать через LIKE")
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
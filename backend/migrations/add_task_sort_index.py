@@ -0,0 +1,29 @@
+"""
+Миграция: составной индекс (project_id, sort_order, id) для списка задач.
+
+Нужен для постраничной выдачи GET /schedule/tasks?limit=&cursor= —
+каждая страница читается по индексу, без сортировки всего проекта.
+
+Запуск на VPS:
+    cd /opt/construction-manager/backend
+    python migrations/add_task_sort_index.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from sqlalchemy import text
+
+def run_migration():
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_project_sort "
+            "ON tasks (project_id, sort_order, id);"
+        ))
+        print("✅ Индекс ix_tasks_project_sort создан (или уже существует)")
+        conn.commit()
+        print("\n✅ Миграция завершена успешно!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,131 @@
+"""
+Общие фикстуры тестов: приложение на временной SQLite-базе, TestClient,
+авторизованный пользователь и объект (project_id).
+
+Каждый тест получает чистую схему (drop_all / create_all). Фабрики make_*
+создают справочники и бригады; count_statements считает SQL-запросы вызова.
+"""
+import os
+import sys
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from sqlalchemy import event
+
+from app.main import app
+from app.database import Base, SessionLocal, engine
+from app import models
+from app.auth import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth(db):
+    db.add(models.User(username="admin", email="admin@example.com", full_name="Admin",
+                       hashed_password="x", role="admin"))
+    db.commit()
+    return {"Authorization": "Bearer " + create_access_token({"sub": "admin"})}
+
+
+@pytest.fixture
+def project_id(db):
+    project = models.Project(name="Объект")
+    db.add(project)
+    db.commit()
+    return project.id
+
+
+@pytest.fixture
+def make_task(client, auth, project_id):
+    """Создать задачу через API: make_task("1.1", parent_code="1", volume_plan=10)."""
+    def make(code, **fields):
+        response = client.post(
+            f"/schedule/tasks?project_id={project_id}",
+            json={"code": code, "name": fields.pop("name", f"Работа {code}"), **fields},
+            headers=auth,
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return make
+
+
+@pytest.fixture
+def make_employee(db):
+    """Создать сотрудника: make_employee("Иванов", is_active=False) → id."""
+    def make(full_name, **fields):
+        employee = models.Employee(full_name=full_name, position=fields.pop("position", "Монтажник"), **fields)
+        db.add(employee)
+        db.commit()
+        return employee.id
+    return make
+
+
+@pytest.fixture
+def make_equipment(db):
+    """Создать единицу техники: make_equipment("Кран", "K", service_interval_hours=10) → id."""
+    def make(equipment_type, model, **fields):
+        number = db.query(models.Equipment).count() + 1
+        unit = models.Equipment(equipment_type=equipment_type, model=model,
+                                registration_number=str(number), **fields)
+        db.add(unit)
+        db.commit()
+        return unit.id
+    return make
+
+
+@pytest.fixture
+def make_brigade(client, auth, project_id):
+    """
+    Создать бригаду объекта на дату; с аргументами — сразу сдать по ней отчёт:
+    make_brigade("2026-03-02", works=[...], executors=[...]) → id.
+    """
+    def make(work_date, **report):
+        response = client.post("/brigades/", json={"date": work_date, "project_id": project_id}, headers=auth)
+        assert response.status_code == 200, response.text
+        brigade_id = response.json()["id"]
+        if report:
+            response = client.post("/daily/reports", json={"brigade_id": brigade_id, **report}, headers=auth)
+            assert response.status_code == 200, response.text
+        return brigade_id
+    return make
+
+
+@pytest.fixture
+def count_statements():
+    """count_statements(call) → (результат call(), число выполненных SQL-запросов)."""
+    def count(call):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            result = call()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return result, len(statements)
+    return count
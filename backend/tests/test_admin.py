@@ -0,0 +1,26 @@
+from datetime import date
+
+from app import models
+
+
+def test_recalculate_volumes_fixes_drift_per_project(client, auth, db, make_task, project_id):
+    other = models.Project(name="Другой объект")
+    db.add(other)
+    db.commit()
+    task = make_task("1", volume_plan=10)
+    client.post("/daily/works", json={"task_id": task, "date": "2026-03-01", "volume": 3}, headers=auth)
+    db.add(models.DailyWork(task_id=task, date=date(2026, 3, 1), volume=100, is_ancillary=True))
+    db.query(models.Task).filter(models.Task.id == task).update({"volume_fact": 99})
+    db.commit()
+
+    dry = client.post("/admin/recalculate-volumes", params={"dry_run": True}, headers=auth).json()
+    assert dry["updated_tasks"] == 0 and len(dry["details"]) == 1
+
+    scoped = client.post("/admin/recalculate-volumes", params={"project_id": other.id}, headers=auth).json()
+    assert scoped["total_tasks"] == 0
+
+    result = client.post("/admin/recalculate-volumes", headers=auth).json()
+    assert result["updated_tasks"] == 1
+    db.expire_all()
+    assert db.get(models.Task, task).volume_fact == 3
+    assert client.post("/admin/recalculate-volumes", headers=auth).json()["updated_tasks"] == 0
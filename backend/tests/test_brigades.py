@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from app import models
+
+
+@pytest.fixture
+def crew(make_employee, make_equipment):
+    """Двое монтажников и кран: ((ivanov, petrov), crane)."""
+    return (make_employee("Иванов"), make_employee("Петров")), make_equipment("Кран", "K")
+
+
+def test_day_bundle_query_count_does_not_grow_with_brigades(client, crew, make_task, make_brigade,
+                                                            count_statements, project_id):
+    (ivanov, petrov), crane = crew
+    task = make_task("1", volume_plan=10)
+    make_brigade("2026-03-02", works=[{"task_id": task, "volume": 2}], ancillary_works=[{"volume": 6}],
+                 executors=[{"employee_id": ivanov, "is_responsible": True}],
+                 equipment=[{"equipment_id": crane}])
+    params = {"work_date": "2026-03-02", "project_id": project_id}
+    _, one_brigade = count_statements(lambda: client.get("/brigades/day", params=params))
+
+    make_brigade("2026-03-02", works=[{"task_id": task, "volume": 1}], executors=[{"employee_id": petrov}])
+    day, two_brigades = count_statements(lambda: client.get("/brigades/day", params=params).json())
+
+    assert two_brigades == one_brigade
+    # Ответственный в executors_count не входит — как в /brigades/stats
+    assert [(b["executors_count"], len(b["works"]), b["equipment_count"]) for b in day["brigades"]] == [
+        (0, 1, 1), (1, 1, 0),
+    ]
+    assert day["brigades"][0]["responsible"]["full_name"] == "Иванов"
+    assert day["totals"]["executors_count"] == 1
+    assert day["totals"]["total_ancillary_hours"] == 6
+
+
+def test_clone_day_copies_crew_and_volumes_and_reports_conflicts(client, auth, db, crew, make_task, make_brigade,
+                                                                 project_id):
+    (ivanov, petrov), crane = crew
+    task = make_task("1", volume_plan=10)
+    make_brigade("2026-03-02", works=[{"task_id": task, "volume": 2}],
+                 executors=[{"employee_id": ivanov, "is_responsible": True}, {"employee_id": petrov}],
+                 equipment=[{"equipment_id": crane}])
+    client.post("/executors/", json={"date": "2026-03-03", "employee_id": petrov}, headers=auth)
+
+    response = client.post("/brigades/clone", params={
+        "from": "2026-03-02", "to": "2026-03-03", "project_id": project_id, "include_volumes": True,
+    }, headers=auth)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (len(result["brigades"]), result["executors"], result["equipment"], result["works"]) == (1, 1, 1, 1)
+    assert [(c["kind"], c["name"]) for c in result["conflicts"]] == [("executor", "Петров")]
+    volume_fact = client.get("/schedule/tasks", params={"project_id": project_id}).json()[0]["volume_fact"]
+    assert volume_fact == 4
+
+    repeated = client.post("/brigades/clone", params={
+        "from": "2026-03-02", "to": "2026-03-03", "project_id": project_id, "include_volumes": True,
+    }, headers=auth)
+    assert repeated.status_code == 409
+    assert db.query(models.Brigade).filter(models.Brigade.date == date(2026, 3, 3)).count() == 1
+
+    response = client.post("/brigades/clone", params={
+        "from": "2026-03-09", "to": "2026-03-03", "project_id": project_id,
+    }, headers=auth)
+    assert response.status_code == 404
+
+
+def test_clone_skips_brigade_whose_whole_crew_conflicts(client, auth, db, crew, make_brigade, project_id):
+    (ivanov, petrov), crane = crew
+    brigade = make_brigade("2026-03-02", executors=[{"employee_id": ivanov}])
+    client.put(f"/brigades/{brigade}", json={"name": "Монтажники"}, headers=auth)
+    make_brigade("2026-03-02", executors=[{"employee_id": petrov}], equipment=[{"equipment_id": crane}])
+    client.post("/executors/", json={"date": "2026-03-03", "employee_id": ivanov}, headers=auth)
+
+    result = client.post("/brigades/clone", params={
+        "from": "2026-03-02", "to": "2026-03-03", "project_id": project_id,
+    }, headers=auth).json()
+    assert [b["name"] for b in result["brigades"]] == ["Бригада"]
+    assert [(c["brigade"], c["name"]) for c in result["conflicts"]] == [("Монтажники", "Иванов")]
+    assert db.query(models.Brigade).filter(models.Brigade.date == date(2026, 3, 3)).count() == 1
+
+
+def test_productivity_report_groups_by_period(client, crew, make_task, make_brigade, project_id):
+    (ivanov, petrov), crane = crew
+    task = make_task("1", volume_plan=100, unit="м3", labor_per_unit=2)
+    # 2026-03-02 и 2026-03-04 — одна неделя
+    for work_date, volume in (("2026-03-02", 3), ("2026-03-04", 5)):
+        make_brigade(work_date, works=[{"task_id": task, "volume": volume}], ancillary_works=[{"volume": 1}],
+                     executors=[{"employee_id": petrov, "hours_worked": 8}])
+
+    params = {"from": "2026-03-01", "to": "2026-03-31", "project_id": project_id}
+    days = client.get("/brigades/report", params={**params, "group_by": "day"}).json()["rows"]
+    assert [(r["group"], r["hours_worked"], r["labor_hours"], r["ancillary_hours"]) for r in days] == [
+        ("2026-03-02", 8, 6, 1), ("2026-03-04", 8, 10, 1),
+    ]
+    weeks = client.get("/brigades/report", params={**params, "group_by": "week"}).json()["rows"]
+    assert [(r["group"], r["hours_worked"], r["tasks"][0]["volume"]) for r in weeks] == [("2026-03-02", 16, 8)]
+
+    csv_text = client.get("/brigades/report", params={**params, "group_by": "week", "format": "csv"}).text
+    assert "2026-03-02;1;Работа 1;м3;8.0" in csv_text.splitlines()
@@ -0,0 +1,110 @@
+def _volume_fact(client, project_id):
+    return [t["volume_fact"] for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()]
+
+
+def test_daily_work_edits_adjust_volume_fact(client, auth, make_task, project_id):
+    first = make_task("1", volume_plan=10)
+    second = make_task("2", volume_plan=10)
+    work = client.post("/daily/works", json={"task_id": first, "date": "2026-03-01", "volume": 3},
+                       headers=auth).json()["id"]
+    other = client.post("/daily/works", json={"task_id": first, "date": "2026-03-02", "volume": 2},
+                        headers=auth).json()["id"]
+    assert _volume_fact(client, project_id) == [5, 0]
+
+    assert client.put(f"/daily/works/{work}", json={"volume": 6}, headers=auth).status_code == 200
+    assert _volume_fact(client, project_id) == [8, 0]
+
+    assert client.put(f"/daily/works/{work}", json={"task_id": second}, headers=auth).status_code == 200
+    assert _volume_fact(client, project_id) == [2, 6]
+
+    assert client.delete(f"/daily/works/{other}", headers=auth).status_code == 200
+    assert _volume_fact(client, project_id) == [0, 6]
+
+
+def test_description_edit_leaves_schedule_revision_alone(client, auth, make_task, project_id):
+    task = make_task("1", volume_plan=10)
+    work = client.post("/daily/works", json={"task_id": task, "date": "2026-03-01", "volume": 3},
+                       headers=auth).json()["id"]
+    since = client.get("/schedule/tasks/changes", params={"project_id": project_id}).json()["revision"]
+
+    response = client.put(f"/daily/works/{work}", json={"description": "Уточнено", "date": "2026-03-02"},
+                          headers=auth)
+    assert response.status_code == 200
+    assert client.get("/schedule/tasks/changes", params={"project_id": project_id}).json()["revision"] == since
+
+
+def test_work_of_deleted_task_can_still_be_edited(client, auth, make_task):
+    task = make_task("1", volume_plan=10)
+    work = client.post("/daily/works", json={"task_id": task, "date": "2026-03-01", "volume": 3},
+                       headers=auth).json()["id"]
+    client.delete(f"/schedule/tasks/{task}", headers=auth)
+
+    response = client.put(f"/daily/works/{work}", json={"volume": 4}, headers=auth)
+    assert response.status_code == 200
+    assert (response.json()["task_id"], response.json()["volume"]) == (None, 4)
+
+
+def test_brigade_delete_rolls_back_volume_fact(client, auth, make_task, make_brigade, project_id):
+    make_task("1", is_section=True)
+    task = make_task("1.1", parent_code="1", volume_plan=10, unit_price=2)
+    brigade = make_brigade("2026-03-02", works=[{"task_id": task, "volume": 4}],
+                           ancillary_works=[{"volume": 3}])
+    assert _volume_fact(client, project_id) == [0, 4]
+
+    assert client.delete(f"/brigades/{brigade}", headers=auth).status_code == 200
+    assert _volume_fact(client, project_id) == [0, 0]
+    rollup = client.get("/schedule/sections/rollups", params={"project_id": project_id}).json()
+    assert rollup[0]["cost_fact"] == 0
+
+
+def test_daily_report_is_applied_atomically(client, auth, make_task, make_brigade, make_employee,
+                                            make_equipment, project_id):
+    ivanov, petrov = make_employee("Иванов"), make_employee("Петров")
+    crane = make_equipment("Кран", "K")
+    idle = make_equipment("Экскаватор", "E", is_active=False)
+    first = make_task("1", volume_plan=10)
+    second = make_task("2", volume_plan=10)
+    brigade = make_brigade("2026-03-02")
+    report = {
+        "brigade_id": brigade,
+        "works": [{"task_id": first, "volume": 2}, {"task_id": first, "volume": 1},
+                  {"task_id": second, "volume": 4}],
+        "ancillary_works": [{"volume": 6}],
+        "executors": [{"employee_id": ivanov, "is_responsible": True},
+                      {"employee_id": petrov, "hours_worked": 8}],
+        "equipment": [{"equipment_id": crane}],
+    }
+
+    response = client.post("/daily/reports", json=report, headers=auth)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["works"], body["executors"], body["equipment"]) == (3, 2, 1)
+    assert [t["volume_fact"] for t in body["tasks"]] == [3, 4]
+
+    response = client.post("/daily/reports", json={
+        **report, "works": [{"task_id": first, "volume": 1}], "executors": [],
+        "equipment": [{"equipment_id": idle}],
+    }, headers=auth)
+    assert response.status_code == 400
+    assert "неактивна" in response.json()["detail"]
+    assert _volume_fact(client, project_id) == [3, 4]
+
+
+def test_works_details_is_one_query_for_the_period(client, auth, make_task, make_brigade, count_statements,
+                                                   project_id):
+    task = make_task("1", volume_plan=10)
+    make_brigade("2026-03-02", works=[{"task_id": task, "volume": 2}, {"task_id": task, "volume": 1}],
+                 ancillary_works=[{"volume": 6}])
+    client.post("/daily/works", json={"task_id": task, "date": "2026-03-05", "volume": 1}, headers=auth)
+
+    rows, statements = count_statements(lambda: client.get("/daily/works/details", params={
+        "project_id": project_id, "date_from": "2026-03-01", "date_to": "2026-03-05",
+    }).json())
+
+    assert statements == 1
+    assert [(row["date"], row["name"], row["brigade_name"]) for row in rows] == [
+        ("2026-03-02", "Работа 1", "Бригада"),
+        ("2026-03-02", "Работа 1", "Бригада"),
+        ("2026-03-02", "Сопутствующие работы", "Бригада"),
+        ("2026-03-05", "Работа 1", None),
+    ]
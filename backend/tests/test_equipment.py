@@ -0,0 +1,70 @@
+def _use(client, auth, work_date, equipment_id, machine_hours=5, brigade_id=None):
+    response = client.post("/equipment-usage/", json={
+        "date": work_date, "equipment_id": equipment_id,
+        "machine_hours": machine_hours, "brigade_id": brigade_id,
+    }, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_calendar_shows_bookings_and_filters_free_units(client, auth, make_equipment, make_brigade, project_id):
+    first, second = make_equipment("Экскаватор", "E1"), make_equipment("Экскаватор", "E2")
+    make_equipment("Кран", "K")
+    brigade = make_brigade("2026-03-02")
+    _use(client, auth, "2026-03-02", first, brigade_id=brigade)
+    _use(client, auth, "2026-03-04", first)
+    _use(client, auth, "2026-03-03", second, brigade_id=brigade)
+
+    period = {"date_from": "2026-03-01", "date_to": "2026-03-07"}
+    calendar = {e["model"]: e for e in client.get("/equipment/calendar", params=period).json()["equipment"]}
+    assert {model: e["booked"] for model, e in calendar.items()} == {
+        "E1": "0101000", "E2": "0010000", "K": "0000000",
+    }
+    assert calendar["E1"]["hours"][:4] == [0, 5, 0, 5]
+
+    free = client.get("/equipment/calendar", params={
+        **period, "equipment_type": "Экскаватор", "free_on": "2026-03-03", "project_id": project_id,
+    }).json()["equipment"]
+    # Занятость — по всем объектам, машиночасы — только по project_id
+    assert [(e["model"], e["booked"], e["hours"][3]) for e in free] == [("E1", "0101000", 0)]
+
+    too_long = client.get("/equipment/calendar", params={"date_from": "2026-03-01", "date_to": "2026-12-07"})
+    assert too_long.status_code == 400
+
+
+def test_usage_stats_sum_machine_hours_from_usage_and_work_norms(client, auth, make_task, make_equipment,
+                                                                  make_brigade):
+    # Группировку по (дата, бригада) и отбор по объекту проверяет тест /executors/stats/bulk —
+    # оба отчёта собирает brigade_stats.collect; здесь — только машиночасы
+    excavator = make_equipment("Экскаватор", "E1")
+    brigade = make_brigade("2026-03-02")
+    _use(client, auth, "2026-03-02", excavator, machine_hours=7, brigade_id=brigade)
+    task = make_task("1", volume_plan=10, machine_hours_per_unit=2, labor_per_unit=5)
+    client.post("/daily/works", json={"task_id": task, "date": "2026-03-02", "volume": 3, "brigade_id": brigade},
+                headers=auth)
+
+    stats, = client.get("/equipment-usage/stats/bulk", params={"date_from": "2026-03-02", "date_to": "2026-03-02"}).json()
+    assert (stats["equipment_count"], stats["total_machine_hours"], stats["total_work_machine_hours"]) == (1, 7, 6)
+    assert [u["equipment"]["model"] for u in stats["equipment_usage"]] == ["E1"]
+
+
+def test_machine_hour_meter_follows_usage_and_service(client, auth, make_equipment):
+    excavator = make_equipment("Экскаватор", "E1", service_interval_hours=10)
+
+    def meter():
+        unit = next(e for e in client.get("/equipment/").json() if e["id"] == excavator)
+        return unit["total_machine_hours"], unit["hours_since_service"], unit["hours_until_service"]
+
+    first = _use(client, auth, "2026-03-02", excavator, machine_hours=5)
+    second = _use(client, auth, "2026-03-03", excavator, machine_hours=4)
+    assert meter() == (9, 9, 1)
+
+    client.put(f"/equipment-usage/{first}", json={"machine_hours": 7}, headers=auth)
+    assert meter() == (11, 11, -1)
+    assert [e["id"] for e in client.get("/equipment/due-for-service").json()] == [excavator]
+
+    client.post(f"/equipment/{excavator}/service", params={"service_date": "2026-03-02"}, headers=auth)
+    assert meter() == (11, 4, 6)
+
+    client.delete(f"/equipment-usage/{second}", headers=auth)
+    assert meter() == (7, 0, 10)
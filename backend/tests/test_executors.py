@@ -0,0 +1,81 @@
+import io
+
+import openpyxl
+
+from app import models
+
+
+def _assign(client, auth, **fields):
+    return client.post("/executors/", json=fields, headers=auth)
+
+
+def test_bulk_stats_are_grouped_by_date_and_brigade(client, auth, make_employee, make_brigade, project_id):
+    ivanov, petrov, sidorov = map(make_employee, ("Иванов", "Петров", "Сидоров"))
+    first, second = make_brigade("2026-03-02"), make_brigade("2026-03-03")
+    _assign(client, auth, date="2026-03-02", employee_id=ivanov, brigade_id=first, is_responsible=True)
+    _assign(client, auth, date="2026-03-02", employee_id=petrov, brigade_id=first, hours_worked=8)
+    _assign(client, auth, date="2026-03-03", employee_id=sidorov, brigade_id=second, hours_worked=6)
+    _assign(client, auth, date="2026-03-03", employee_id=petrov, hours_worked=4)
+
+    scoped = client.get("/executors/stats/bulk", params={
+        "date_from": "2026-03-01", "date_to": "2026-03-05", "project_id": project_id,
+    }).json()
+    assert [(s["date"], s["brigade_id"], s["executors_count"], s["total_hours_worked"]) for s in scoped] == [
+        ("2026-03-02", first, 1, 8), ("2026-03-03", second, 1, 6),
+    ]
+
+    everything = client.get("/executors/stats/bulk", params={
+        "date_from": "2026-03-01", "date_to": "2026-03-05",
+    }).json()
+    assert [(s["brigade_id"], s["total_hours_worked"]) for s in everything][-1] == (None, 4)
+
+
+def test_duplicate_assignments_are_rejected_by_unique_indexes(client, auth, make_employee, make_equipment,
+                                                             make_brigade):
+    ivanov, petrov = make_employee("Иванов"), make_employee("Петров")
+    crane = make_equipment("Кран", "K")
+    brigade = make_brigade("2026-03-02")
+
+    assert _assign(client, auth, date="2026-03-02", employee_id=ivanov, brigade_id=brigade,
+                   is_responsible=True).status_code == 200
+    response = _assign(client, auth, date="2026-03-02", employee_id=petrov, brigade_id=brigade,
+                       is_responsible=True)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "В этой бригаде уже есть ответственный: Иванов"
+
+    assert _assign(client, auth, date="2026-03-02", employee_id=petrov).status_code == 200
+    response = _assign(client, auth, date="2026-03-02", employee_id=petrov)
+    assert response.status_code == 400
+    assert "уже добавлен" in response.json()["detail"]
+
+    usage = {"date": "2026-03-02", "equipment_id": crane}
+    assert client.post("/equipment-usage/", json=usage, headers=auth).status_code == 200
+    assert client.post("/equipment-usage/", json=usage, headers=auth).status_code == 400
+
+
+def test_unknown_employee_is_rejected_before_insert(client, auth, db):
+    response = _assign(client, auth, date="2026-03-02", employee_id=9999)
+    assert response.status_code == 404
+    assert db.query(models.DailyExecutor).count() == 0
+
+
+def test_monthly_timesheet_pivots_hours_by_day(client, auth, make_employee, make_brigade, project_id):
+    ivanov, petrov = make_employee("Иванов"), make_employee("Петров")
+    brigade = make_brigade("2026-03-02")
+    _assign(client, auth, date="2026-03-02", employee_id=ivanov, brigade_id=brigade, hours_worked=10)
+    _assign(client, auth, date="2026-03-02", employee_id=petrov, brigade_id=brigade, hours_worked=8)
+    _assign(client, auth, date="2026-03-05", employee_id=petrov, hours_worked=7)
+
+    sheet = client.get("/executors/timesheet", params={"year": 2026, "month": 3}).json()
+    assert sheet["days"] == 31 and sheet["total"] == 25
+    assert [(e["full_name"], e["hours"][1], e["hours"][4], e["total"], e["days_worked"])
+            for e in sheet["employees"]] == [("Иванов", 10, None, 10, 1), ("Петров", 8, 7, 15, 2)]
+    assert sheet["day_totals"][:5] == [0, 18, 0, 0, 7]
+
+    scoped = client.get("/executors/timesheet", params={"year": 2026, "month": 3, "project_id": project_id}).json()
+    assert scoped["total"] == 18
+
+    response = client.get("/executors/timesheet", params={"year": 2026, "month": 3, "format": "xlsx"})
+    assert response.status_code == 200
+    sheet = openpyxl.load_workbook(io.BytesIO(response.content)).active
+    assert [cell.value for cell in sheet[sheet.max_row]][:4] == ["Итого", None, 0, 18]
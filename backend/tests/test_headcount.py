@@ -0,0 +1,68 @@
+from app import models
+
+
+def _month_cells(task_ids, headcount=2):
+    return [{"task_id": task_id, "date": f"2026-03-{day:02d}", "headcount": headcount}
+            for task_id in task_ids for day in range(1, 31)]
+
+
+def _headcount(client, auth, project_id):
+    rows = client.get("/headcount/", params={"project_id": project_id, "year": 2026, "month": 3}, headers=auth).json()
+    return {(row["task_id"], row["date"]): row["headcount"] for row in rows}
+
+
+def test_bulk_upsert_sets_and_clears_cells_across_chunks(client, auth, make_task, project_id):
+    # 40 задач × 30 дней — больше HEADCOUNT_BULK_CHUNK ячеек
+    task_ids = [make_task(str(i)) for i in range(1, 41)]
+
+    response = client.post("/headcount/bulk", json={"cells": _month_cells(task_ids)}, headers=auth)
+    assert response.json() == {"set": 1200, "cleared": 0}
+
+    response = client.post("/headcount/bulk", json={"cells": [
+        {"task_id": task_ids[0], "date": "2026-03-01", "headcount": 5},
+        {"task_id": task_ids[0], "date": "2026-03-02"},
+    ]}, headers=auth)
+    assert response.json() == {"set": 1, "cleared": 1}
+    cells = _headcount(client, auth, project_id)
+    assert cells[(task_ids[0], "2026-03-01")] == 5
+    assert (task_ids[0], "2026-03-02") not in cells
+
+    cleared = [{"task_id": cell["task_id"], "date": cell["date"]} for cell in _month_cells(task_ids)]
+    assert client.post("/headcount/bulk", json={"cells": cleared}, headers=auth).json() == {"set": 0, "cleared": 1200}
+    assert _headcount(client, auth, project_id) == {}
+
+
+def test_bulk_upsert_rejects_unknown_tasks(client, auth, project_id):
+    response = client.post("/headcount/bulk", json={"cells": [
+        {"task_id": 9999, "date": "2026-03-01", "headcount": 1},
+    ]}, headers=auth)
+    assert response.status_code == 404
+    assert "9999" in response.json()["detail"]
+
+
+def test_month_matrix_and_period_listing_are_scoped(client, auth, db, make_task, project_id):
+    other = models.Project(name="Другой объект")
+    db.add(other)
+    db.commit()
+    first, second = make_task("1"), make_task("2")
+    foreign = client.post(f"/schedule/tasks?project_id={other.id}", json={"code": "1", "name": "Чужая"},
+                          headers=auth).json()["id"]
+    client.post("/headcount/bulk", json={"cells": [
+        {"task_id": first, "date": "2026-03-01", "headcount": 5},
+        {"task_id": first, "date": "2026-03-03", "headcount": 2},
+        {"task_id": second, "date": "2026-03-31", "headcount": 1},
+        {"task_id": second, "date": "2026-04-01", "headcount": 4},
+        {"task_id": foreign, "date": "2026-03-01", "headcount": 9},
+    ]}, headers=auth)
+
+    matrix = client.get("/headcount/matrix", params={"project_id": project_id, "year": 2026, "month": 3},
+                        headers=auth).json()
+    assert matrix["days"] == 31
+    assert matrix["task_ids"] == [first, second]
+    assert matrix["headcount"][0][:4] == [5, None, 2, None]
+    assert matrix["headcount"][1][-1] == 1
+
+    year = client.get("/headcount/", params={"project_id": project_id, "year": 2026}, headers=auth).json()
+    assert len(year) == 4
+    bad = client.get("/headcount/", params={"year": 2026, "month": 13}, headers=auth)
+    assert bad.status_code == 400
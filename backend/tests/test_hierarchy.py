@@ -0,0 +1,61 @@
+from app import hierarchy, models, rollups
+
+
+def _closure(db):
+    db.expire_all()
+    return sorted(db.query(models.TaskClosure.ancestor_id, models.TaskClosure.descendant_id,
+                           models.TaskClosure.depth).all())
+
+
+def test_ancestors_and_descendants_follow_parent_code(client, make_task):
+    ids = {}
+    for code, parent in [("1", None), ("1.1", "1"), ("1.1.1", "1.1"), ("2", None)]:
+        ids[code] = make_task(code, parent_code=parent, is_section=code in ("1", "1.1", "2"))
+
+    descendants = client.get(f"/schedule/tasks/{ids['1']}/descendants", params={"fields": "code"}).json()
+    assert [t["code"] for t in descendants] == ["1.1", "1.1.1"]
+    ancestors = client.get(f"/schedule/tasks/{ids['1.1.1']}/ancestors", params={"fields": "code"}).json()
+    assert [t["code"] for t in ancestors] == ["1", "1.1"]
+
+
+def test_code_change_relinks_like_full_rebuild(client, auth, db, make_task, project_id):
+    section = make_task("1", is_section=True)
+    make_task("1.1", parent_code="1", volume_plan=5, unit_price=1)
+    make_task("3.1", parent_code="3", volume_plan=11, unit_price=1)
+
+    assert client.put(f"/schedule/tasks/{section}", json={"code": "3"}, headers=auth).status_code == 200
+
+    incremental = _closure(db)
+    hierarchy.rebuild_hierarchy(db, project_id)
+    rollups.recompute_project(db, project_id)
+    db.commit()
+    assert incremental == _closure(db)
+    descendants = client.get(f"/schedule/tasks/{section}/descendants", params={"fields": "code"}).json()
+    assert [t["code"] for t in descendants] == ["3.1"]
+
+
+def test_parent_code_inside_own_subtree_is_rejected(client, auth, db, make_task, project_id):
+    section = make_task("1", is_section=True)
+    sub = make_task("1.1", parent_code="1", is_section=True)
+    make_task("1.1.1", parent_code="1.1")
+    closure = _closure(db)
+
+    response = client.put(f"/schedule/tasks/{section}", json={"parent_code": "1.1.1"}, headers=auth)
+    assert response.status_code == 400
+    # Новый код раздела совпадает с parent_code его же предка — тоже цикл
+    response = client.patch("/schedule/tasks/batch", json={"items": [
+        {"id": section, "changes": {"parent_code": "9"}},
+        {"id": sub, "changes": {"code": "9"}},
+    ]}, headers=auth)
+    assert response.status_code == 400
+    response = client.post(f"/schedule/tasks?project_id={project_id}",
+                           json={"code": "2", "name": "Раздел", "parent_code": "2.1"}, headers=auth)
+    assert response.status_code == 200
+    response = client.post(f"/schedule/tasks?project_id={project_id}",
+                           json={"code": "2.1", "name": "Работа", "parent_code": "2"}, headers=auth)
+    assert response.status_code == 400
+
+    db.expire_all()
+    assert db.get(models.Task, section).parent_code is None
+    assert [row for row in _closure(db) if row[0] in (section, sub)] == \
+        [row for row in closure if row[0] in (section, sub)]
@@ -0,0 +1,33 @@
+from app import rollups
+
+
+def _rollups(client, project_id):
+    return {r["section_id"]: r for r in client.get(
+        "/schedule/sections/rollups", params={"project_id": project_id}).json()}
+
+
+def test_section_rollups_follow_task_and_daily_changes(client, auth, db, make_task, project_id):
+    section = make_task("1", is_section=True)
+    sub = make_task("1.1", parent_code="1", is_section=True)
+    task = make_task("1.1.1", parent_code="1.1", volume_plan=10, unit_price=2, labor_per_unit=1,
+                     start_date_plan="2026-03-01", end_date_plan="2026-03-10")
+    make_task("1.2", parent_code="1", volume_plan=5, unit_price=1)
+
+    assert _rollups(client, project_id)[section]["cost_plan"] == 25
+    assert _rollups(client, project_id)[sub]["labor_plan"] == 10
+
+    client.put(f"/schedule/tasks/{task}", json={"volume_plan": 20, "end_date_plan": "2026-04-01"}, headers=auth)
+    client.post("/daily/works", json={"task_id": task, "date": "2026-03-02", "volume": 4}, headers=auth)
+
+    current = _rollups(client, project_id)
+    assert current[section]["cost_plan"] == 45
+    assert current[section]["cost_fact"] == 8
+    assert current[sub]["max_end_date_plan"] == "2026-04-01"
+
+    tasks = {t["id"]: t for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()}
+    assert (tasks[section]["cost_plan"], tasks[section]["cost_fact"]) == (45, 8)
+    assert tasks[task]["cost_plan"] is None
+
+    rollups.recompute_project(db, project_id)
+    db.commit()
+    assert _rollups(client, project_id) == current
@@ -0,0 +1,143 @@
+import asyncio
+
+from app import models
+from app.routes.schedule import rebalance_ranks
+
+
+def test_keyset_pages_cover_all_tasks_once(client, make_task, project_id):
+    ids = [make_task(str(i)) for i in range(1, 8)]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"project_id": project_id, "limit": 3, "fields": "code"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/schedule/tasks", params=params).json()
+        seen += [item["id"] for item in page["items"]]
+        assert "code" in page["items"][0] and "name" not in page["items"][0]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == ids
+
+
+def test_changes_feed_returns_only_newer_rows_and_tombstones(client, auth, make_task, project_id):
+    ids = [make_task(f"1.{i}") for i in range(3)]
+    since = client.get("/schedule/tasks/changes", params={"project_id": project_id}).json()["revision"]
+
+    assert client.put(f"/schedule/tasks/{ids[0]}", json={"name": "Новое имя"}, headers=auth).status_code == 200
+    assert client.delete(f"/schedule/tasks/{ids[1]}", headers=auth).status_code == 200
+
+    feed = client.get("/schedule/tasks/changes",
+                      params={"project_id": project_id, "since": since, "fields": "name"}).json()
+    assert feed["revision"] > since
+    assert [(t["id"], t["name"]) for t in feed["tasks"]] == [(ids[0], "Новое имя")]
+    assert feed["deleted"] == [ids[1]]
+
+
+def test_batch_update_applies_valid_items_and_reports_missing(client, auth, make_task, project_id):
+    first, second = make_task("1"), make_task("2")
+
+    response = client.patch("/schedule/tasks/batch", json={"items": [
+        {"id": first, "changes": {"name": "А"}},
+        {"id": second, "changes": {"volume_plan": 5}},
+        {"id": 999, "changes": {"name": "Нет"}},
+    ]}, headers=auth)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated"] == 2
+    assert [r["ok"] for r in body["results"]] == [True, True, False]
+
+    tasks = {t["id"]: t for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()}
+    assert tasks[first]["name"] == "А"
+    assert tasks[second]["volume_plan"] == 5
+
+
+def test_batch_update_rejects_duplicate_code(client, auth, make_task):
+    first = make_task("1")
+    make_task("2")
+    response = client.patch("/schedule/tasks/batch",
+                            json={"items": [{"id": first, "changes": {"code": "2"}}]}, headers=auth)
+    assert response.status_code == 400
+
+
+def _order(client, project_id):
+    return [t["id"] for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()]
+
+
+def test_insert_between_rows_does_not_renumber_neighbours(client, auth, make_task, project_id):
+    order = [make_task(str(i)) for i in range(1, 4)]
+    untouched = {t["id"]: (t["sort_order"], t["revision"])
+                 for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()}
+
+    anchor = order[1]
+    for _ in range(30):
+        response = client.post(f"/schedule/tasks/custom?project_id={project_id}",
+                               json={"name": "Вставка", "insert_before_task_id": anchor}, headers=auth)
+        assert response.status_code == 200, response.text
+        order.insert(order.index(anchor), response.json()["id"])
+
+    assert _order(client, project_id) == order
+    after = {t["id"]: (t["sort_order"], t["revision"])
+             for t in client.get("/schedule/tasks", params={"project_id": project_id}).json()}
+    assert all(after[task_id] == key for task_id, key in untouched.items())
+
+
+def test_insert_between_legacy_duplicates_publishes_respread_rows(client, auth, db, make_task, project_id):
+    # Старые данные: три строки с одинаковыми (sort_order, rank)
+    order = [make_task(str(i)) for i in range(1, 5)]
+    db.query(models.Task).filter(models.Task.id.in_(order[:3])).update({"sort_order": 10, "rank": "n"})
+    db.commit()
+    since = client.get("/schedule/tasks/changes", params={"project_id": project_id}).json()["revision"]
+
+    response = client.post(f"/schedule/tasks/custom?project_id={project_id}",
+                           json={"name": "Вставка", "insert_after_task_id": order[0]}, headers=auth)
+    assert response.status_code == 200, response.text
+    order.insert(1, response.json()["id"])
+
+    assert _order(client, project_id) == order
+    feed = client.get("/schedule/tasks/changes",
+                      params={"project_id": project_id, "since": since, "fields": "rank"}).json()
+    # Первая строка серии и строка другой группы не переписаны
+    assert sorted(t["id"] for t in feed["tasks"]) == sorted([order[1], order[2], order[3]])
+
+
+def test_rebalance_ranks_keeps_order_and_bumps_revision(client, auth, make_task, project_id):
+    order = [make_task(str(i)) for i in range(1, 4)]
+    response = client.post(f"/schedule/tasks/custom?project_id={project_id}",
+                           json={"name": "Вставка", "insert_after_task_id": order[0]}, headers=auth)
+    order.insert(1, response.json()["id"])
+    since = client.get("/schedule/tasks/changes", params={"project_id": project_id}).json()["revision"]
+
+    asyncio.run(rebalance_ranks(project_id))
+
+    tasks = client.get("/schedule/tasks", params={"project_id": project_id}).json()
+    assert [t["id"] for t in tasks] == order
+    assert [t["sort_order"] for t in tasks] == [10, 20, 30, 40]
+    feed = client.get("/schedule/tasks/changes", params={"project_id": project_id, "since": since}).json()
+    assert feed["revision"] == since + 1 and feed["tasks"]
+
+
+def test_move_section_carries_subtree_and_reparents(client, auth, make_task, project_id):
+    ids = {}
+    for code, parent, level in [("1", None, 0), ("1.1", "1", 1), ("1.2", "1", 1),
+                                ("1.2.1", "1.2", 2), ("2", None, 0), ("2.1", "2", 1)]:
+        ids[code] = make_task(code, parent_code=parent, level=level,
+                              is_section=code in ("1", "1.2", "2"))
+
+    response = client.post(f"/schedule/tasks/{ids['1.2']}/move",
+                           json={"after_task_id": ids["2.1"], "parent_code": "2"}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.json()["moved"] == 2
+
+    tasks = client.get("/schedule/tasks", params={"project_id": project_id}).json()
+    assert [t["code"] for t in tasks] == ["1", "1.1", "2", "2.1", "1.2", "1.2.1"]
+    by_code = {t["code"]: t for t in tasks}
+    assert by_code["1.2"]["parent_code"] == "2"
+    assert by_code["1.2.1"]["level"] == 2
+
+    response = client.post(f"/schedule/tasks/{ids['2']}/move",
+                           json={"after_task_id": ids["1.2.1"]}, headers=auth)
+    assert response.status_code == 400
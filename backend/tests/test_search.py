@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import text
+
+from app import models, search
+from app.database import engine
+
+
+@pytest.fixture
+def fts_index():
+    with engine.begin() as conn:
+        search.create_index(conn)
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS tasks_fts"))
+
+
+def _seed(make_task):
+    return [
+        make_task("1", name="Бетонирование плиты перекрытия"),
+        make_task("2", name="Монтаж опалубки", notes="под бетонирование"),
+        make_task("3", name="Кладка стен"),
+    ]
+
+
+def test_search_without_index_matches_name_and_notes(client, make_task, project_id):
+    # Без tasks_fts поиск идёт через LIKE — в SQLite он не сворачивает регистр кириллицы
+    slab = _seed(make_task)[0]
+    rebar = make_task("4", name="Армирование", notes="плиты перекрытия")
+    hits = client.get("/schedule/tasks/search", params={"q": "перекрыт", "project_id": project_id}).json()
+    assert {hit["id"] for hit in hits} == {slab, rebar}
+
+
+def test_search_with_fts_index_tracks_updates(client, auth, make_task, project_id, fts_index):
+    slab, formwork, masonry = _seed(make_task)
+    client.put(f"/schedule/tasks/{masonry}", json={"name": "Кладка бетонных блоков"}, headers=auth)
+
+    hits = client.get("/schedule/tasks/search", params={"q": "бетон", "project_id": project_id}).json()
+    assert {hit["id"] for hit in hits} == {slab, formwork, masonry}
+    assert all("<b>" in hit["snippet"] for hit in hits)
+
+    client.delete(f"/schedule/tasks/{slab}", headers=auth)
+    hits = client.get("/schedule/tasks/search", params={"q": "бетон", "project_id": project_id}).json()
+    assert slab not in {hit["id"] for hit in hits}
+
+
+def test_search_returns_rows_without_code(client, db, project_id):
+    db.add(models.Task(project_id=project_id, code=None, name="Армирование плит", is_section=False))
+    db.commit()
+    response = client.get("/schedule/tasks/search", params={"q": "плит", "project_id": project_id})
+    assert response.status_code == 200
+    assert [hit["code"] for hit in response.json()] == [None]
@@ -0,0 +1,57 @@
+def _seed(make_task):
+    make_task("1", is_section=True)
+    make_task("1.1", parent_code="1", executor="Иванов", volume_plan=10,
+              start_date_plan="2026-01-01", end_date_plan="2026-03-05")
+    make_task("1.2", parent_code="1", executor="Петров", volume_plan=10,
+              start_date_plan="2026-04-01", end_date_plan="2026-05-01")
+    make_task("2", is_section=True)
+    make_task("2.1", parent_code="2", executor="Иванов 50%", volume_plan=10,
+              start_date_plan="2026-01-01", end_date_plan="2026-01-10")
+
+
+def _query(client, project_id, **params):
+    return client.get("/schedule/tasks/query",
+                      params={"project_id": project_id, "fields": "code", **params}).json()
+
+
+def test_query_filters_works_and_adds_parent_sections(client, make_task, project_id):
+    _seed(make_task)
+
+    result = _query(client, project_id, executor="Иванов")
+    assert [t["code"] for t in result["items"]] == ["1", "1.1", "2", "2.1"]
+    assert result["matched"] == 2
+
+    result = _query(client, project_id, month="2026-04", include_sections=False)
+    assert [t["code"] for t in result["items"]] == ["1.2"]
+
+    result = _query(client, project_id, executor="50%")
+    assert [t["code"] for t in result["items"]] == ["2", "2.1"]
+
+
+def test_query_facets_ignore_own_filter(client, make_task, project_id):
+    _seed(make_task)
+
+    facets = _query(client, project_id, executor="Петров")["facets"]
+    assert {f["value"]: f["count"] for f in facets["executor"]} == {
+        "Иванов": 1, "Петров": 1, "Иванов 50%": 1,
+    }
+    assert facets["status_people"] == [{"value": "gray", "count": 1}]
+
+
+def test_query_rejects_bad_month(client, project_id):
+    response = client.get("/schedule/tasks/query", params={"project_id": project_id, "month": "2026-13"})
+    assert response.status_code == 400
+
+
+def test_month_window_returns_overlapping_works_undated_rows_and_sections(client, auth, make_task, project_id):
+    first = make_task("1", is_section=True)
+    crossing = make_task("1.1", parent_code="1", start_date_plan="2026-02-20", end_date_plan="2026-03-05")
+    make_task("1.2", parent_code="1", start_date_plan="2026-05-01", end_date_plan="2026-05-10")
+    second = make_task("2", is_section=True)
+    make_task("2.1", parent_code="2", start_date_plan="2026-01-01", end_date_plan="2026-01-10")
+    manual = client.post(f"/schedule/tasks/custom?project_id={project_id}",
+                         json={"name": "Ручная строка", "parent_code": "2"}, headers=auth).json()["id"]
+
+    rows = client.get("/schedule/tasks/month",
+                      params={"project_id": project_id, "month": "2026-03", "fields": "code"}).json()
+    assert [row["id"] for row in rows] == [first, crossing, second, manual]
@@ -59,11 +59,11 @@ function DailyOrders({ onShowColumnSettings }) {
   const loadAll = useCallback(async () => {
     try {
       const [brigRes, tasksRes, empRes] = await Promise.all([
-        brigadesAPI.getStats(selectedDate),
+        brigadesAPI.getDay(selectedDate),
         scheduleAPI.getTasks(),
         employeesAPI.getAll({ active_only: true }),
       ]);
-      setBrigadesStats(brigRes.data);
+      setBrigadesStats(brigRes.data.brigades);
       setAllTasks(tasksRes.data);
       setTasks(tasksRes.data.filter(t => !t.is_section));
       setEmployees(empRes.data);
@@ -77,10 +77,11 @@ function DailyOrders({ onShowColumnSettings }) {
     websocketService.connect();
     const reload = () => loadAll();
     const events = [
-      'daily_work_created', 'task_updated',
+      'daily_work_created', 'daily_work_updated', 'daily_work_deleted',
+      'daily_report_submitted', 'task_updated',
       'executor_added', 'executor_updated', 'executor_deleted',
       'equipment_usage_added', 'equipment_usage_updated', 'equipment_usage_deleted',
-      'brigade_created', 'brigade_updated', 'brigade_deleted',
+      'brigade_created', 'brigade_updated', 'brigade_deleted', 'brigades_cloned',
     ];
     events.forEach(e => websocketService.on(e, reload));
     return () => events.forEach(e => websocketService.off(e, reload));
@@ -93,6 +93,14 @@ function getParentIds(task, allTasks) {
   return ids;
 }
 
+// Порядок строк как на сервере: (sort_order, rank, id)
+function sortByOrder(tasks) {
+  return [...tasks].sort((a, b) =>
+    (a.sort_order ?? 0) - (b.sort_order ?? 0)
+    || ((a.rank ?? '') < (b.rank ?? '') ? -1 : (a.rank ?? '') > (b.rank ?? '') ? 1 : 0)
+    || a.id - b.id);
+}
+
 const STANDARD_EDITABLE = ['start_date_plan', 'end_date_plan', 'executor', 'notes'];
 const CUSTOM_EDITABLE = [
   'name', 'unit', 'volume_plan',
@@ -362,11 +370,15 @@ function MonthlyOrder({ showGantt, onShowColumnSettings, onShowFilters, onShowPr
   const loadHeadcount = useCallback(async () => {
     try {
       const [year, month] = selectedMonth.split('-').map(Number);
-      const r = await headcountAPI.getByMonth(year, month);
+      const { data } = await headcountAPI.getMatrix(year, month);
+      const prefix = `${year}-${String(month).padStart(2, '0')}-`;
       const map = {};
-      r.data.forEach(item => {
-        if (!map[item.task_id]) map[item.task_id] = {};
-        map[item.task_id][item.date] = item.headcount;
+      data.task_ids.forEach((taskId, i) => {
+        const cells = {};
+        data.headcount[i].forEach((count, d) => {
+          if (count != null) cells[prefix + String(d + 1).padStart(2, '0')] = count;
+        });
+        map[taskId] = cells;
       });
       setHeadcountData(map);
     } catch (e) { console.error(e); }
@@ -374,6 +386,13 @@ function MonthlyOrder({ showGantt, onShowColumnSettings, onShowFilters, onShowPr
 
   useEffect(() => { loadHeadcount(); }, [loadHeadcount]);
 
+  useEffect(() => {
+    // Массовая запись ячеек (в том числе из другой вкладки)
+    const onHeadcountBulk = () => loadHeadcount();
+    websocketService.on('headcount_bulk_updated', onHeadcountBulk);
+    return () => websocketService.off('headcount_bulk_updated', onHeadcountBulk);
+  }, [loadHeadcount]);
+
   const handleHeadcountSave = useCallback(async (taskId, dateStr, count) => {
     try {
       if (count === null) {
@@ -448,11 +467,15 @@ function MonthlyOrder({ showGantt, onShowColumnSettings, onShowFilters, onShowPr
       setTasks(prev => prev.map(t => t.id === msg.data.id ? { ...t, ...msg.data } : t));
     };
     const onCleared = () => { setTasks([]); setFilteredTasks([]); setTimeout(loadTasks, 100); };
+    // Перемещение строк (в том числе в другой вкладке) и перебалансировка рангов
+    const onMoved = () => { if (!isDraggingRef.current) loadTasks(); };
     websocketService.on('task_updated', onUpdated);
     websocketService.on('schedule_cleared', onCleared);
+    websocketService.on('tasks_moved', onMoved);
     return () => {
       websocketService.off('task_updated', onUpdated);
       websocketService.off('schedule_cleared', onCleared);
+      websocketService.off('tasks_moved', onMoved);
     };
   }, [selectedMonth]);
 
@@ -460,24 +483,9 @@ function MonthlyOrder({ showGantt, onShowColumnSettings, onShowFilters, onShowPr
 
   const loadTasks = async () => {
     try {
-      const r = await scheduleAPI.getTasks();
-      const all = r.data;
-      const [year, month] = selectedMonth.split('-').map(Number);
-      const mStart = new Date(year, month - 1, 1);
-      const mEnd   = new Date(year, month, 0, 23, 59, 59);
-      const filtered = all.filter(task => {
-        if (task.is_section) return true;
-        const s = task.start_date_plan ? new Date(task.start_date_plan) : null;
-        const e = task.end_date_plan   ? new Date(task.end_date_plan)   : null;
-        if (task.is_custom && !s && !e) return true;
-        if (!s || !e) return false;
-        return s <= mEnd && e >= mStart;
-      });
-      const hasWork = (sectionCode) =>
-        filtered.some(t => !t.is_section && String(t.code).startsWith(sectionCode + '.')) ||
-        filtered.some(t => t.is_section && String(t.code).startsWith(sectionCode + '.') && hasWork(t.code));
-      const visible = filtered.filter(t => !t.is_section || hasWork(t.code));
-      setTasks(visible);
+      // Работы месяца и их разделы отбирает сервер
+      const r = await scheduleAPI.getMonthTasks(selectedMonth);
+      setTasks(r.data);
     } catch (e) { console.error(e); }
   };
 
@@ -570,16 +578,17 @@ function MonthlyOrder({ showGantt, onShowColumnSettings, onShowFilters, onShowPr
     const withoutDragged = currentTasks.filter(t => t.id !== draggedId);
     const targetIdx = withoutDragged.findIndex(t => t.id === targetTask.id);
     const insertIdx = insertBefore ? targetIdx : targetIdx + 1;
-    const prev = withoutDragged[insertIdx - 1];
-    const next = withoutDragged[insertIdx];
-    const prevOrder = prev ? prev.sort_order : 0;
-    const nextOrder = next ? next.sort_order : (prevOrder + 20);
-    const newSortOrder = Math.floor((prevOrder + nextOrder) / 2);
-    const updatedDragged = { ...dragged, sort_order: newSortOrder };
-    withoutDragged.splice(insertIdx, 0, updatedDragged);
+    withoutDragged.splice(insertIdx, 0, dragged);
     setTasks(withoutDragged);
     isDraggingRef.current = true;
-    try { await scheduleAPI.updateTask(draggedId, { sort_order: newSortOrder }); }
+    try {
+      const r = await scheduleAPI.moveTask(draggedId, insertBefore
+        ? { before_task_id: targetTask.id }
+        : { after_task_id: targetTask.id });
+      // Переносится всё поддерево раздела — порядок строк берём из ответа сервера
+      const moved = Object.fromEntries(r.data.tasks.map(t => [t.id, t]));
+      setTasks(prev => sortByOrder(prev.map(t => moved[t.id] ? { ...t, ...moved[t.id] } : t)));
+    }
     catch (err) { console.error(err); loadTasks(); }
     finally { setTimeout(() => { isDraggingRef.current = false; }, 500); }
   }, [isAdmin]);
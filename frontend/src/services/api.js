@@ -79,12 +79,35 @@ export const importExportAPI = {
 // ─── Schedule ────────────────────────────────────────────────────────────────
 export const scheduleAPI = {
   getTasks: () => api.get('/schedule/tasks', { params: projectParams() }),
+  // Постранично: { fields: 'code,name', limit: 1000, cursor } → { items, next_cursor }
+  getTasksPage: (params = {}) =>
+    api.get('/schedule/tasks', { params: projectParams(params) }),
+  // Только изменения после ревизии since → { revision, tasks, deleted }
+  getChanges: (since) =>
+    api.get('/schedule/tasks/changes', { params: projectParams({ since }) }),
+  // Фильтр на сервере: { executor, status_people, month: 'ГГГГ-ММ', overdue, completion, text, ... }
+  // → { items, matched, facets }
+  queryTasks: (filters = {}) =>
+    api.get('/schedule/tasks/query', { params: projectParams(filters) }),
+  // Строки МСГ за месяц 'ГГГГ-ММ': работы месяца, ручные строки без дат и их разделы
+  getMonthTasks: (month) =>
+    api.get('/schedule/tasks/month', { params: projectParams({ month }) }),
+  // Поиск по названию и примечанию → [{ id, code, name, score, snippet }]
+  searchTasks: (q, params = {}) =>
+    api.get('/schedule/tasks/search', { params: projectParams({ q, ...params }) }),
   createTask: (task) =>
     api.post('/schedule/tasks', task, { params: projectParams() }),
   createCustomTask: (data) =>
     api.post('/schedule/tasks/custom', data, { params: projectParams() }),
   updateTask: (id, task) => api.put(`/schedule/tasks/${id}`, task),
+  // Несколько изменений одним запросом: [{ id, changes: { field: value } }]
+  batchUpdate: (items) => api.patch('/schedule/tasks/batch', { items }),
+  // Переместить строку (раздел — вместе с подчинёнными): { before_task_id | after_task_id, parent_code? }
+  moveTask: (id, position) => api.post(`/schedule/tasks/${id}/move`, position),
   deleteTask: (id) => api.delete(`/schedule/tasks/${id}`),
+  // Итоги разделов: [{ section_id, cost_plan, cost_fact, labor_plan, ..., max_end_date_plan }]
+  getSectionRollups: () =>
+    api.get('/schedule/sections/rollups', { params: projectParams() }),
   deleteAllCustomTasks: () =>
     api.delete('/schedule/tasks/custom/all', { params: projectParams() }),
   clearAll: () =>
@@ -104,13 +127,20 @@ export const monthlyAPI = {
 export const dailyAPI = {
   getWorks: (date) =>
     api.get('/daily/works', { params: projectParams({ work_date: date }) }),
+  // Работы объекта за период с задачей и бригадой: dateTo по умолчанию = dateFrom
+  getWorksDetails: (dateFrom, dateTo) =>
+    api.get('/daily/works/details', { params: projectParams({ date_from: dateFrom, date_to: dateTo }) }),
   createWork: (work) => api.post('/daily/works', work),
+  updateWork: (id, changes) => api.put(`/daily/works/${id}`, changes),
+  // Весь день бригады одним запросом: { brigade_id, works, ancillary_works, executors, equipment }
+  submitReport: (report) => api.post('/daily/reports', report),
   deleteWork: (id) => api.delete(`/daily/works/${id}`),
 };
 
 // ─── Analytics ───────────────────────────────────────────────────────────────
 export const analyticsAPI = {
-  getData: () => api.get('/analytics/', { params: projectParams() }),
+  // params: { date_from, date_to } — только работы, активные в периоде
+  getData: (params = {}) => api.get('/analytics/', { params: projectParams(params) }),
 };
 
 // ─── Employees (global) ──────────────────────────────────────────────────────
@@ -130,7 +160,19 @@ export const executorsAPI = {
     api.get('/executors/', { params: { work_date: date } }),
   getStats: (date, brigadeId) =>
     api.get('/executors/stats', {
-      params: { work_date: date, ...(brigadeId != null ? { brigade_id: brigadeId } : {}) },
+      params: projectParams({ work_date: date, ...(brigadeId != null ? { brigade_id: brigadeId } : {}) }),
+    }),
+  // Статистика за период по каждой паре (дата, бригада); brigadeIds — необязательный фильтр
+  getStatsBulk: (dateFrom, dateTo, brigadeIds = null) =>
+    api.get('/executors/stats/bulk', {
+      params: projectParams({ date_from: dateFrom, date_to: dateTo, ...(brigadeIds ? { brigade_id: brigadeIds } : {}) }),
+      paramsSerializer: { indexes: null },
+    }),
+  // Табель за месяц (сотрудник × день); allProjects — по всем объектам, format 'xlsx' → файл
+  getTimesheet: (year, month, { allProjects = false, format = 'json' } = {}) =>
+    api.get('/executors/timesheet', {
+      params: allProjects ? { year, month, format } : projectParams({ year, month, format }),
+      ...(format === 'json' ? {} : { responseType: 'blob' }),
     }),
   create: (executor) => api.post('/executors/', executor),
   update: (id, executor) => api.put(`/executors/${id}`, executor),
@@ -141,9 +183,20 @@ export const executorsAPI = {
 export const equipmentAPI = {
   getAll: (params = {}) => api.get('/equipment/', { params }),
   getById: (id) => api.get(`/equipment/${id}`),
+  // Загрузка техники × день: { equipment: [{ hours, booked: '0110…' }] }; params: equipment_type, free_on[], project_id
+  getCalendar: (dateFrom, dateTo, params = {}) =>
+    api.get('/equipment/calendar', {
+      params: { date_from: dateFrom, date_to: dateTo, ...params },
+      paramsSerializer: { indexes: null },
+    }),
   create: (equipment) => api.post('/equipment/', equipment),
   update: (id, equipment) => api.put(`/equipment/${id}`, equipment),
   delete: (id) => api.delete(`/equipment/${id}`),
+  // Техника, которой до ТО осталось не больше withinHours машиночасов
+  getDueForService: (withinHours = 0) =>
+    api.get('/equipment/due-for-service', { params: { within_hours: withinHours } }),
+  recordService: (id, serviceDate = null) =>
+    api.post(`/equipment/${id}/service`, null, { params: serviceDate ? { service_date: serviceDate } : {} }),
   deactivate: (id) => api.patch(`/equipment/${id}/deactivate`),
   activate: (id) => api.patch(`/equipment/${id}/activate`),
 };
@@ -154,7 +207,13 @@ export const equipmentUsageAPI = {
     api.get('/equipment-usage/', { params: { work_date: date } }),
   getStats: (date, brigadeId) =>
     api.get('/equipment-usage/stats', {
-      params: { work_date: date, ...(brigadeId != null ? { brigade_id: brigadeId } : {}) },
+      params: projectParams({ work_date: date, ...(brigadeId != null ? { brigade_id: brigadeId } : {}) }),
+    }),
+  // Статистика за период по каждой паре (дата, бригада); brigadeIds — необязательный фильтр
+  getStatsBulk: (dateFrom, dateTo, brigadeIds = null) =>
+    api.get('/equipment-usage/stats/bulk', {
+      params: projectParams({ date_from: dateFrom, date_to: dateTo, ...(brigadeIds ? { brigade_id: brigadeIds } : {}) }),
+      paramsSerializer: { indexes: null },
     }),
   create: (usage) => api.post('/equipment-usage/', usage),
   update: (id, usage) => api.put(`/equipment-usage/${id}`, usage),
@@ -167,7 +226,21 @@ export const brigadesAPI = {
     api.get('/brigades/', { params: projectParams({ work_date: date }) }),
   getStats: (date) =>
     api.get('/brigades/stats', { params: projectParams({ work_date: date }) }),
+  // Бригады дня со статистикой и итогами дня → { date, brigades, totals }
+  getDay: (date) =>
+    api.get('/brigades/day', { params: projectParams({ work_date: date }) }),
   create: (brigade) => api.post('/brigades/', { ...projectParams(), ...brigade }),
+  // Скопировать бригады с даты fromDate на toDate → { brigades, executors, equipment, works, conflicts }
+  clone: (fromDate, toDate, includeVolumes = false) =>
+    api.post('/brigades/clone', null, {
+      params: projectParams({ from: fromDate, to: toDate, include_volumes: includeVolumes }),
+    }),
+  // Выработка за период: groupBy = day|week|month|brigade; format csv|xlsx → файл
+  getReport: (fromDate, toDate, groupBy = 'day', format = 'json') =>
+    api.get('/brigades/report', {
+      params: projectParams({ from: fromDate, to: toDate, group_by: groupBy, format }),
+      ...(format === 'json' ? {} : { responseType: 'blob' }),
+    }),
   update: (id, brigade) => api.put(`/brigades/${id}`, brigade),
   delete: (id) => api.delete(`/brigades/${id}`),
 };
@@ -178,8 +251,13 @@ export const headcountAPI = {
     const p = JSON.parse(localStorage.getItem('currentProject') || 'null');
     return api.get('/headcount/', { params: { year, month, ...(p ? { project_id: p.id } : {}) } });
   },
+  // Месяц матрицей: { days, task_ids, headcount: [[людей на 1-е, 2-е, …]] }
+  getMatrix: (year, month) =>
+    api.get('/headcount/matrix', { params: projectParams({ year, month }) }),
   upsert: (taskId, date, headcount) =>
     api.post('/headcount/upsert', { task_id: taskId, date, headcount }),
+  // Много ячеек за раз: cells = [{ task_id, date, headcount }], headcount: null — очистить
+  bulk: (cells) => api.post('/headcount/bulk', { cells }),
   // Удалить назначение для конкретной задачи и даты (очистка одной ячейки)
   deleteOne: (taskId, date) =>
     api.delete('/headcount/one', { params: { task_id: taskId, date } }),